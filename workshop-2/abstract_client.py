@@ -22,6 +22,7 @@ along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
 """
 
 from abc import ABC, abstractmethod
+from typing import Optional
 
 
 class AbstractProductManager(ABC):
@@ -40,6 +41,8 @@ class AbstractProductManager(ABC):
                         To be implemented by subclasses.
         edit_product: Abstract method for editing a product's details.
                       To be implemented by subclasses.
+        set_stock: Abstract method for setting a product's stock level.
+                   To be implemented by subclasses.
 
     Usage:
         This class cannot be instantiated directly. It should be subclassed by
@@ -97,3 +100,19 @@ class AbstractProductManager(ABC):
         Returns:
             None
         """
+
+    @abstractmethod
+    def set_stock(self, product_id: str, stock: Optional[int]):
+        """
+        Sets the number of units in stock of a product.
+
+        This method should be implemented in subclasses to handle the logic for
+        restocking a product, or for starting or stopping tracking its stock.
+
+        Args:
+            product_id (str): The unique identifier of the product.
+            stock (Optional[int]): The new units in stock, or None to stop tracking stock.
+
+        Returns:
+            None
+        """
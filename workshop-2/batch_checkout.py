@@ -0,0 +1,232 @@
+"""
+This module contains the BatchCheckout class which places the orders
+listed in a JSON-lines file without any user interaction, using a
+pool of worker threads, and reports the throughput achieved.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, TextIO, Tuple
+from checkout import Checkout
+from order_ledger import OrderLedger
+from shopping_cart import ShoppingCart
+
+# The number of orders handed to the pool at a time, per worker.
+CHUNK_PER_WORKER = 256
+
+
+class BatchCheckout:
+    """
+    Places orders read from JSON lines through Checkout.place_order.
+
+    Each input line is one order:
+
+        {"customer": {"name": ..., "direction": ..., "country": ..., "email": ...},
+         "items": [{"id": "1", "quantity": 2}, ...]}
+
+    Orders are parsed, priced, reserved against the stock and placed by a
+    thread pool, a chunk at a time so memory does not grow with the size of
+    the file, and the results are written by the calling thread, in input
+    order, as one JSON line each:
+    {"line", "status": "accepted", "order"} or {"line", "status": "rejected",
+    "error"}.
+
+    Attributes:
+        product_repo (ProductRepository): The repository the products are read from.
+        workers (int): The number of worker threads.
+        ledger (Optional[OrderLedger]): The ledger that records placed orders.
+
+    Methods:
+        place_order: Places the order described by one input line.
+        process: Places a stream of orders and writes the results.
+        process_file: Places the orders of a file and writes the results to another.
+    """
+
+    def __init__(
+        self, product_repo, workers: int = 4, ledger: Optional[OrderLedger] = None
+    ):
+        """
+        Initializes the BatchCheckout.
+
+        Args:
+            product_repo (ProductRepository): The repository the products are read from.
+            workers (int): The number of worker threads.
+            ledger (Optional[OrderLedger]): The ledger that records placed orders.
+        """
+        self.product_repo = product_repo
+        self.workers = max(workers, 1)
+        self.ledger = ledger
+
+    def place_order(self, line: str) -> Dict:
+        """
+        Places the order described by one input line.
+
+        Args:
+            line (str): The JSON order.
+
+        Returns:
+            Dict: The order record returned by Checkout.place_order.
+
+        Raises:
+            ValueError: If the order is malformed, names an unknown product, or asks for
+                more units than are in stock.
+        """
+        try:
+            request = json.loads(line)
+            customer = request["customer"]
+            cart = ShoppingCart(verbose=False)
+            for item in request["items"]:
+                product = self.product_repo.get_by_id(str(item["id"]))
+                if product is None:
+                    raise ValueError(f"No product found with ID: {item['id']}")
+                cart.add_product(product, int(item.get("quantity", 1)))
+            return Checkout(cart, self.ledger, self.product_repo).place_order(
+                customer["name"],
+                customer.get("direction", ""),
+                customer.get("country", ""),
+                customer.get("email", ""),
+            )
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Malformed order: {e!r}") from None
+
+    def _result(self, numbered_line: Tuple[int, str]) -> Dict:
+        """
+        Places one numbered order and turns the outcome into a result record.
+
+        Any error is reported in the order's own result, so one failing order never
+        stops the batch.
+
+        Args:
+            numbered_line (Tuple[int, str]): The line number and the JSON order.
+
+        Returns:
+            Dict: The result record written to the output.
+        """
+        number, line = numbered_line
+        try:
+            return {"line": number, "status": "accepted", "order": self.place_order(line)}
+        except ValueError as e:
+            return {"line": number, "status": "rejected", "error": str(e)}
+        except Exception as e:
+            # A ledger or journal error fails this order only; raised out of
+            # executor.map it would end the batch without results for placed orders.
+            return {"line": number, "status": "rejected", "error": f"{type(e).__name__}: {e}"}
+
+    def process(self, lines: Iterable[str], output: TextIO) -> Dict:
+        """
+        Places a stream of orders and writes one result per order to output.
+
+        Blank lines are skipped but still counted, so result line numbers match the
+        input file.
+
+        Args:
+            lines (Iterable[str]): The JSON orders.
+            output (TextIO): The stream the results are written to.
+
+        Returns:
+            Dict: The throughput statistics: orders, accepted, rejected, total_cents,
+                workers, elapsed_seconds and orders_per_second.
+        """
+        stats = {"orders": 0, "accepted": 0, "rejected": 0, "total_cents": 0}
+        numbered = (
+            (number, line) for number, line in enumerate(lines, 1) if line.strip()
+        )
+        start = time.perf_counter()
+        with ThreadPoolExecutor(self.workers) as executor:
+            while True:
+                chunk = list(islice(numbered, self.workers * CHUNK_PER_WORKER))
+                if not chunk:
+                    break
+                results: List[str] = []
+                for result in executor.map(self._result, chunk):
+                    stats["orders"] += 1
+                    stats[result["status"]] += 1
+                    if result["status"] == "accepted":
+                        stats["total_cents"] += result["order"]["total_cents"]
+                    results.append(json.dumps(result, separators=(",", ":")) + "\n")
+                output.write("".join(results))
+        elapsed = time.perf_counter() - start
+        stats["workers"] = self.workers
+        stats["elapsed_seconds"] = elapsed
+        stats["orders_per_second"] = stats["orders"] / elapsed if elapsed else 0.0
+        return stats
+
+    def process_file(self, input_path: str, output_path: str) -> Dict:
+        """
+        Places the orders of a JSON-lines file and writes the results to another file.
+
+        Args:
+            input_path (str): The orders file, or "-" for standard input.
+            output_path (str): The results file.
+
+        Returns:
+            Dict: The throughput statistics returned by process.
+        """
+        with open(output_path, "w", encoding="utf-8") as output:
+            if input_path == "-":
+                return self.process(sys.stdin, output)
+            with open(input_path, encoding="utf-8") as orders:
+                return self.process(orders, output)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Places the orders of a JSON-lines file from the command line.
+
+    Args:
+        argv (Optional[List[str]]): The command-line arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        None
+    """
+    # Imported here so that importing this module does not pull in the menu.
+    from main import add_storage_arguments, dump_metrics, open_repository
+
+    parser = argparse.ArgumentParser(description="Place the orders of a JSON-lines file.")
+    parser.add_argument("orders", help="the orders file, one JSON order per line, or -")
+    parser.add_argument(
+        "--output", default="placed_orders.jsonl", help="the results file"
+    )
+    parser.add_argument("--stats", help="write the statistics to this JSON file")
+    parser.add_argument("--workers", type=int, default=4, help="the number of threads")
+    add_storage_arguments(parser)
+    options = parser.parse_args(argv)
+
+    product_repo = open_repository(options)
+    ledger = OrderLedger(options.ledger)
+    try:
+        stats = BatchCheckout(product_repo, options.workers, ledger).process_file(
+            options.orders, options.output
+        )
+    finally:
+        ledger.close()
+        dump_metrics(options)
+    report = json.dumps(stats, indent=2)
+    if options.stats:
+        with open(options.stats, "w", encoding="utf-8") as stats_file:
+            stats_file.write(report + "\n")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
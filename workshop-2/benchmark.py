@@ -0,0 +1,484 @@
+"""
+This module contains the Benchmark class which times the core catalog,
+cart and manager operations on synthetic catalogs of increasing size
+and records the results, with the environment they were measured in,
+as JSON that later runs can be compared against.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+from catalog_generator import CatalogGenerator, parse_count
+from catalog_snapshot import default_snapshot_path
+from change_journal import default_journal_path
+from manager import Manager
+from product_repository import ProductRepository
+from shopping_cart import ShoppingCart
+
+# Operations slower than the baseline by more than this share are reported.
+DEFAULT_TOLERANCE = 0.10
+
+
+def environment() -> Dict:
+    """Describes the machine and software the benchmark runs on.
+
+    Returns:
+        Dict: The Python version and implementation, platform, processor, CPU count,
+            optional libraries, git commit and the time of the run.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    try:
+        import numpy
+
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy_version,
+        "git_commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def summarize(samples: List[float], operations: int = 1) -> Dict:
+    """Summarizes the timings of repeated runs of an operation.
+
+    Args:
+        samples (List[float]): The seconds taken by each run.
+        operations (int): The number of operations each run performed.
+
+    Returns:
+        Dict: The minimum, median and mean seconds per run, the number of runs and
+            operations per run, and the median microseconds per operation.
+    """
+    median = statistics.median(samples)
+    return {
+        "min_seconds": min(samples),
+        "median_seconds": median,
+        "mean_seconds": statistics.fmean(samples),
+        "runs": len(samples),
+        "operations": operations,
+        "median_us_per_operation": median / operations * 1e6,
+    }
+
+
+def compare(baseline: Dict, current: Dict, tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """Lists the operations that got slower than in a baseline run.
+
+    Operations are compared by their median time per operation, for every catalog
+    size and operation measured in both runs.
+
+    Args:
+        baseline (Dict): The results of the earlier run.
+        current (Dict): The results of the later run.
+        tolerance (float): The slowdown, as a share of the baseline, that is allowed.
+
+    Returns:
+        List[str]: One line per regression, empty if there are none.
+    """
+    regressions = []
+    for size, operations in current["results"].items():
+        for name, timing in operations.items():
+            before = baseline["results"].get(size, {}).get(name)
+            if before is None or not before["median_us_per_operation"]:
+                continue
+            ratio = timing["median_us_per_operation"] / before["median_us_per_operation"]
+            if ratio > 1 + tolerance:
+                regressions.append(
+                    f"{name} at {size} rows: {before['median_us_per_operation']:.2f} -> "
+                    f"{timing['median_us_per_operation']:.2f} us/op ({ratio:.2f}x)"
+                )
+    return regressions
+
+
+class Benchmark:
+    """
+    Times the core operations on synthetic catalogs.
+
+    For each catalog size, a catalog is generated with CatalogGenerator (or reused
+    from an earlier run with the same parameters) and copied to a scratch file that
+    the manager operations are free to change. Each operation is then run several
+    times and the timings are summarized with summarize:
+
+        load                      ProductRepository from the CSV file
+        load_snapshot             ProductRepository from an up-to-date binary snapshot
+        list_all_products
+        list_products_by_category the largest and the smallest category
+        get_by_id                 random existing IDs
+        calculate_total           a cart with up to `operations` lines
+        add_product, edit_product, remove_product   through a journaling Manager
+        save_products             Manager._save_products, a full atomic CSV rewrite
+
+    Queries run on a repository without a query cache, so repeated runs measure the
+    work of the query rather than a cache hit. The garbage collector is paused while
+    an operation is timed, as timeit does.
+
+    Attributes:
+        sizes (List[int]): The catalog sizes, in rows.
+        categories (int): The number of categories of each catalog.
+        skew (float): The Zipf exponent of the category sizes.
+        seed (int): The seed of the catalogs and of the sampled IDs.
+        repeat (int): The number of timed runs of each operation.
+        operations (int): The number of lookups, cart lines and manager changes per run.
+        directory (str): Where the catalogs are generated and changed.
+
+    Methods:
+        run_size: Times every operation on one catalog size.
+        run: Times every operation on every catalog size.
+    """
+
+    def __init__(
+        self,
+        sizes: List[int],
+        categories: int = 20,
+        skew: float = 1.0,
+        seed: int = 0,
+        repeat: int = 3,
+        operations: int = 1000,
+        directory: str = "benchmarks",
+    ):
+        """
+        Initializes the Benchmark.
+
+        Args:
+            sizes (List[int]): The catalog sizes, in rows.
+            categories (int): The number of categories of each catalog.
+            skew (float): The Zipf exponent of the category sizes.
+            seed (int): The seed of the catalogs and of the sampled IDs.
+            repeat (int): The number of timed runs of each operation.
+            operations (int): The number of lookups, cart lines and manager changes
+                per run.
+            directory (str): Where the catalogs are generated and changed.
+        """
+        self.sizes = sizes
+        self.categories = categories
+        self.skew = skew
+        self.seed = seed
+        self.repeat = max(repeat, 1)
+        self.operations = max(operations, 1)
+        self.directory = directory
+
+    @staticmethod
+    def _time(function: Callable[[], object]) -> float:
+        """
+        Times one call of a function with the garbage collector paused.
+
+        Args:
+            function (Callable[[], object]): The function to call.
+
+        Returns:
+            float: The seconds the call took.
+        """
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            function()
+            return time.perf_counter() - start
+        finally:
+            gc.enable()
+
+    def _repeat(self, function: Callable[[], object], operations: int = 1) -> Dict:
+        """
+        Times repeated calls of a function and summarizes them.
+
+        Args:
+            function (Callable[[], object]): The function to call.
+            operations (int): The number of operations each call performs.
+
+        Returns:
+            Dict: The summary returned by summarize.
+        """
+        return summarize([self._time(function) for _ in range(self.repeat)], operations)
+
+    def _catalog(self, size: int) -> CatalogGenerator:
+        """
+        Generates the catalog of a size, unless an earlier run already did, and copies
+        it to a scratch file.
+
+        Args:
+            size (int): The number of rows.
+
+        Returns:
+            CatalogGenerator: The generator of the catalog, which names its categories.
+        """
+        generator = CatalogGenerator(size, self.categories, self.skew, self.seed)
+        os.makedirs(self.directory, exist_ok=True)
+        catalog = self._path(f"catalog-{size}-{self.categories}-{self.skew:g}-{self.seed}.csv")
+        if not os.path.exists(catalog):
+            generator.write(catalog)
+        scratch = self._path("scratch.csv")
+        for leftover in (default_journal_path(scratch), default_snapshot_path(scratch)):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        shutil.copyfile(catalog, scratch)
+        return generator
+
+    def _path(self, name: str) -> str:
+        """
+        Returns the path of a file in the benchmark directory.
+
+        Args:
+            name (str): The file name.
+
+        Returns:
+            str: The path.
+        """
+        return os.path.join(self.directory, name)
+
+    def _load(self, use_snapshot: bool) -> Dict:
+        """
+        Times loading the scratch catalog.
+
+        Args:
+            use_snapshot (bool): Whether to load from the binary snapshot.
+
+        Returns:
+            Dict: The summary returned by summarize.
+        """
+        samples = []
+        for _ in range(self.repeat):
+            repositories = []
+            samples.append(
+                self._time(
+                    lambda: repositories.append(
+                        ProductRepository(self._path("scratch.csv"), use_snapshot=use_snapshot)
+                    )
+                )
+            )
+            repositories[0].close()
+        return summarize(samples)
+
+    def _manager_operations(self, manager: Manager, ids: List[str]) -> Dict[str, Dict]:
+        """
+        Times adding, editing and removing products through a Manager.
+
+        Each run adds `operations` new products, edits as many existing ones and then
+        removes the products it added, so every run starts from the same catalog.
+
+        Args:
+            manager (Manager): The manager, journaling changes.
+            ids (List[str]): Existing IDs to edit.
+
+        Returns:
+            Dict[str, Dict]: The summaries of add_product, edit_product and remove_product.
+        """
+        samples: Dict[str, List[float]] = {
+            "add_product": [],
+            "edit_product": [],
+            "remove_product": [],
+        }
+        for run in range(self.repeat):
+            added = [f"bench-{run}-{index}" for index in range(self.operations)]
+            samples["add_product"].append(
+                self._time(
+                    lambda: [
+                        manager.add_product(product_id, "Bench Product", "Bench", 9.99)
+                        for product_id in added
+                    ]
+                )
+            )
+            samples["edit_product"].append(
+                self._time(
+                    lambda: [
+                        manager.edit_product(product_id, f"Edited {run}", "Bench", 19.99)
+                        for product_id in ids
+                    ]
+                )
+            )
+            samples["remove_product"].append(
+                self._time(lambda: [manager.remove_product(product_id) for product_id in added])
+            )
+        return {name: summarize(timings, self.operations) for name, timings in samples.items()}
+
+    def run_size(self, size: int) -> Dict[str, Dict]:
+        """
+        Times every operation on a catalog of one size.
+
+        Args:
+            size (int): The number of rows.
+
+        Returns:
+            Dict[str, Dict]: The summary of each operation, by name.
+        """
+        generator = self._catalog(size)
+        results = {"load": self._load(use_snapshot=False)}
+        # The first load writes the snapshot; only loads of an up-to-date one are timed.
+        ProductRepository(self._path("scratch.csv"), use_snapshot=True).close()
+        results["load_snapshot"] = self._load(use_snapshot=True)
+
+        product_repo = ProductRepository(self._path("scratch.csv"), cache_size=0)
+        results["list_all_products"] = self._repeat(product_repo.list_all_products)
+        for label, category in (
+            ("largest", generator.categories[0]),
+            ("smallest", generator.categories[-1]),
+        ):
+            results[f"list_products_by_category_{label}"] = self._repeat(
+                lambda: product_repo.list_products_by_category(category)
+            )
+
+        sample = random.Random(self.seed)
+        ids = [str(sample.randint(1, size)) for _ in range(self.operations)]
+        get_by_id = product_repo.get_by_id
+        results["get_by_id"] = self._repeat(
+            lambda: [get_by_id(product_id) for product_id in ids], self.operations
+        )
+
+        cart = ShoppingCart(verbose=False)
+        for product_id in ids:
+            cart.add_product(get_by_id(product_id))
+        results["calculate_total"] = self._repeat(
+            lambda: [cart.calculate_total() for _ in range(self.operations)], self.operations
+        )
+
+        manager = Manager(product_repo, compact_threshold=sys.maxsize)
+        results.update(self._manager_operations(manager, ids))
+        results["save_products"] = self._repeat(manager._save_products)
+        return results
+
+    def run(self, progress: Optional[Callable[[str], None]] = None) -> Dict:
+        """
+        Times every operation on every catalog size.
+
+        Args:
+            progress (Optional[Callable[[str], None]]): Called with a line of text as
+                each size and operation completes.
+
+        Returns:
+            Dict: The environment, the parameters and the results by catalog size.
+        """
+        results = {}
+        for size in self.sizes:
+            results[str(size)] = self.run_size(size)
+            if progress is not None:
+                for name, timing in results[str(size)].items():
+                    progress(
+                        f"{size:>10} {name:<36} {timing['median_seconds'] * 1000:>12.3f} ms"
+                        f" {timing['median_us_per_operation']:>14.3f} us/op"
+                    )
+        return {
+            "environment": environment(),
+            "parameters": {
+                "sizes": self.sizes,
+                "categories": self.categories,
+                "skew": self.skew,
+                "seed": self.seed,
+                "repeat": self.repeat,
+                "operations": self.operations,
+            },
+            "results": results,
+        }
+
+
+def main(argv: Optional[List[str]] = None):
+    """Runs the benchmark from the command line.
+
+    Args:
+        argv (Optional[List[str]]): The command-line arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        None: The process exits with status 1 if --compare finds a regression.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the core shop operations.")
+    parser.add_argument(
+        "--sizes",
+        type=lambda text: [parse_count(size) for size in text.split(",")],
+        default=[1000, 10000, 100000],
+        help="comma-separated catalog sizes, from 1e3 to 1e7 (default: 1e3,1e4,1e5)",
+    )
+    parser.add_argument("--categories", type=int, default=20, help="the number of categories")
+    parser.add_argument(
+        "--skew", type=float, default=1.0, help="the Zipf exponent of the category sizes"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="the random seed")
+    parser.add_argument("--repeat", type=int, default=3, help="the timed runs per operation")
+    parser.add_argument(
+        "--operations",
+        type=int,
+        default=1000,
+        help="the lookups, cart lines and manager changes per run (default: 1000)",
+    )
+    parser.add_argument(
+        "--directory", default="benchmarks", help="where the catalogs are generated"
+    )
+    parser.add_argument(
+        "--output", default="benchmark_results.json", help="the JSON results file"
+    )
+    parser.add_argument("--compare", help="a results file of an earlier run to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="the slowdown allowed by --compare, as a share (default: 0.10)",
+    )
+    options = parser.parse_args(argv)
+
+    benchmark = Benchmark(
+        options.sizes,
+        options.categories,
+        options.skew,
+        options.seed,
+        options.repeat,
+        options.operations,
+        options.directory,
+    )
+    report = benchmark.run(progress=print)
+    with open(options.output, "w", encoding="utf-8") as output:
+        json.dump(report, output, indent=2)
+        output.write("\n")
+    print(f"Results written to {options.output}")
+
+    if options.compare:
+        with open(options.compare, encoding="utf-8") as baseline_file:
+            regressions = compare(json.load(baseline_file), report, options.tolerance)
+        for line in regressions:
+            print(f"Regression: {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {options.compare}")
+
+
+if __name__ == "__main__":
+    main()
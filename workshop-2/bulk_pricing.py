@@ -0,0 +1,180 @@
+"""
+This module contains the CartBatch class which encodes many shopping
+carts as flat arrays so that all of them can be priced against a
+catalog in one pass over its price column.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from array import array
+from typing import Dict, Iterable, List, Tuple
+from product_repository import ProductRepository
+from shopping_cart import ShoppingCart, to_cents
+
+try:
+    import numpy
+except ImportError:
+    # Without NumPy the same arrays are priced by a plain Python loop.
+    numpy = None
+
+
+class CartBatch:
+    """
+    Many shopping carts encoded as (cart_index, product_index, quantity) arrays.
+
+    Each distinct product ID gets a product index, so pricing the batch against
+    a catalog looks up every product once, however many carts hold it. The
+    unit prices are then gathered from the catalog's price column and every
+    cart total is summed in a single pass over the lines, with NumPy when it is
+    installed. Totals are in integer cents and match ShoppingCart.total_cents
+    for carts priced at the catalog's current prices. Products missing from a
+    catalog are priced at 0.
+
+    Attributes:
+        product_ids (List[str]): The product ID of each product index.
+        cart_index (array): The cart of each line.
+        product_index (array): The product of each line.
+        quantities (array): The quantity of each line.
+        cart_count (int): The number of carts in the batch.
+
+    Methods:
+        from_carts: Encodes a sequence of shopping carts.
+        add_cart: Appends one cart, given as (product_id, quantity) pairs.
+        totals_cents: Prices every cart against a catalog.
+        deltas_cents: Returns how much every cart changes between two catalogs.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty CartBatch.
+        """
+        self.product_ids: List[str] = []
+        self._product_codes: Dict[str, int] = {}
+        self.cart_index = array("q")
+        self.product_index = array("q")
+        self.quantities = array("q")
+        self.cart_count = 0
+
+    @classmethod
+    def from_carts(cls, carts: Iterable[ShoppingCart]) -> "CartBatch":
+        """
+        Encodes a sequence of shopping carts; cart i of the batch is the i-th cart.
+
+        Args:
+            carts (Iterable[ShoppingCart]): The carts to encode.
+
+        Returns:
+            CartBatch: The encoded carts.
+        """
+        batch = cls()
+        for cart in carts:
+            batch.add_cart(
+                (product_id, quantity)
+                for product_id, (_, quantity) in cart.cart_items.items()
+            )
+        return batch
+
+    def add_cart(self, lines: Iterable[Tuple[str, int]]) -> int:
+        """
+        Appends one cart to the batch.
+
+        Args:
+            lines (Iterable[Tuple[str, int]]): The (product_id, quantity) pairs of the cart.
+
+        Returns:
+            int: The index of the cart in the batch.
+        """
+        cart = self.cart_count
+        codes = self._product_codes
+        for product_id, quantity in lines:
+            code = codes.get(product_id)
+            if code is None:
+                code = codes[product_id] = len(self.product_ids)
+                self.product_ids.append(product_id)
+            self.cart_index.append(cart)
+            self.product_index.append(code)
+            self.quantities.append(quantity)
+        self.cart_count += 1
+        return cart
+
+    def totals_cents(self, catalog: ProductRepository) -> array:
+        """
+        Prices every cart of the batch against a catalog.
+
+        Args:
+            catalog (ProductRepository): The catalog whose current prices are used.
+
+        Returns:
+            array: The total of each cart, in cents, indexed like the carts.
+        """
+        rows = catalog.rows_of(self.product_ids)
+        prices = catalog.price_column()
+        if numpy is not None:
+            return self._totals_numpy(rows, prices)
+        unit_cents = [to_cents(prices[row]) if row >= 0 else 0 for row in rows]
+        totals = [0] * self.cart_count
+        for cart, product, quantity in zip(
+            self.cart_index, self.product_index, self.quantities
+        ):
+            totals[cart] += unit_cents[product] * quantity
+        return array("q", totals)
+
+    def _totals_numpy(self, rows: array, prices: array) -> array:
+        """
+        Prices every cart with NumPy, without copying the price column.
+
+        Args:
+            rows (array): The catalog row of each product index, -1 if missing.
+            prices (array): The catalog's price column.
+
+        Returns:
+            array: The total of each cart, in cents.
+        """
+        rows = numpy.frombuffer(rows, dtype=numpy.int64)
+        prices = numpy.frombuffer(prices, dtype=numpy.float64)
+        found = rows >= 0
+        unit_cents = numpy.zeros(len(rows), dtype=numpy.int64)
+        # numpy.rint rounds halves to even, like round() in to_cents.
+        unit_cents[found] = numpy.rint(prices[rows[found]] * 100)
+        line_cents = unit_cents[numpy.frombuffer(self.product_index, dtype=numpy.int64)]
+        line_cents *= numpy.frombuffer(self.quantities, dtype=numpy.int64)
+        totals = numpy.zeros(self.cart_count, dtype=numpy.int64)
+        numpy.add.at(totals, numpy.frombuffer(self.cart_index, dtype=numpy.int64), line_cents)
+        return array("q", totals.tobytes())
+
+    def deltas_cents(
+        self, old_catalog: ProductRepository, new_catalog: ProductRepository
+    ) -> array:
+        """
+        Returns how much the total of every cart changes from one catalog to another.
+
+        Args:
+            old_catalog (ProductRepository): The catalog the carts were priced with.
+            new_catalog (ProductRepository): The catalog to compare against.
+
+        Returns:
+            array: The new total minus the old total of each cart, in cents.
+        """
+        old = self.totals_cents(old_catalog)
+        new = self.totals_cents(new_catalog)
+        if numpy is not None:
+            deltas = numpy.frombuffer(new, dtype=numpy.int64) - numpy.frombuffer(
+                old, dtype=numpy.int64
+            )
+            return array("q", deltas.tobytes())
+        return array("q", [after - before for before, after in zip(old, new)])
@@ -0,0 +1,320 @@
+"""
+This module contains the CartStore class which keeps the shopping
+carts of many sessions, serialized in memory up to a size limit and
+spilled to disk when they go idle.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+from shopping_cart import ShoppingCart
+
+# The memory budget of the in-memory carts, in bytes.
+MAX_MEMORY_BYTES = 64 * 1024 * 1024
+
+
+class CartStore:
+    """
+    Shopping carts keyed by session ID.
+
+    Carts are held as the bytes produced by ShoppingCart.to_bytes, in least
+    recently used order. Whenever the carts in memory take more than
+    max_memory_bytes, or a cart has not been used for ttl seconds, the least
+    recently used carts are written to one file each in directory and dropped
+    from memory. A cart on disk is read back, and its file removed, the next
+    time its session is used, so memory stays bounded however many sessions
+    exist.
+
+    Spilled carts are written atomically but not fsynced: a crash may lose
+    carts, never corrupt them.
+
+    Attributes:
+        product_repo (ProductRepository): The repository products are read from.
+        directory (str): The directory that holds the spilled carts.
+        max_memory_bytes (int): The memory budget of the in-memory carts.
+        ttl (Optional[float]): Seconds of inactivity after which a cart is spilled.
+
+    Methods:
+        load: Returns the cart of a session.
+        save: Stores the cart of a session.
+        delete: Forgets the cart of a session.
+        session: Loads a cart and saves it back when the block ends.
+        stats: Returns the store counters.
+        close: Spills every cart in memory to disk.
+    """
+
+    def __init__(
+        self,
+        product_repo,
+        directory: str,
+        max_memory_bytes: int = MAX_MEMORY_BYTES,
+        ttl: Optional[float] = None,
+    ):
+        """
+        Initializes the CartStore, creating the spill directory if needed.
+
+        Args:
+            product_repo (ProductRepository): The repository products are read from.
+            directory (str): The directory that holds the spilled carts.
+            max_memory_bytes (int): The memory budget of the in-memory carts.
+            ttl (Optional[float]): Seconds of inactivity after which a cart is spilled;
+                None spills carts only to respect the memory budget.
+        """
+        self.product_repo = product_repo
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # session ID -> (serialized cart, time of last use)
+        self._carts: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._memory_bytes = 0
+        self.spills = 0
+        self.restores = 0
+
+    @staticmethod
+    def _size(session_id: str, data: bytes) -> int:
+        """
+        Returns the memory charged to a cart held in memory.
+
+        Args:
+            session_id (str): The session ID.
+            data (bytes): The serialized cart.
+
+        Returns:
+            int: The size of the key and the value, in bytes.
+        """
+        return sys.getsizeof(session_id) + sys.getsizeof(data)
+
+    def _path(self, session_id: str) -> str:
+        """
+        Returns the file a session's cart is spilled to.
+
+        The session ID is hashed, so any string is a valid session ID.
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            str: The path of the cart file.
+        """
+        digest = hashlib.sha256(session_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest + ".cart")
+
+    def _remember(self, session_id: str, data: bytes, now: float):
+        """
+        Stores a serialized cart in memory as the most recently used one.
+
+        Args:
+            session_id (str): The session ID.
+            data (bytes): The serialized cart.
+            now (float): The current time.
+
+        Returns:
+            None
+        """
+        self._forget(session_id)
+        self._carts[session_id] = (data, now)
+        self._memory_bytes += self._size(session_id, data)
+
+    def _forget(self, session_id: str) -> Optional[bytes]:
+        """
+        Drops a cart from memory.
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            Optional[bytes]: The serialized cart, or None if it was not in memory.
+        """
+        entry = self._carts.pop(session_id, None)
+        if entry is None:
+            return None
+        self._memory_bytes -= self._size(session_id, entry[0])
+        return entry[0]
+
+    def _spill(self, session_id: str):
+        """
+        Writes a cart held in memory to its file and drops it from memory.
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            None
+        """
+        data = self._forget(session_id)
+        path = self._path(session_id)
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as cart_file:
+                cart_file.write(data)
+            os.replace(temporary, path)
+        except BaseException:
+            os.remove(temporary)
+            raise
+        self.spills += 1
+
+    def _evict(self, now: float):
+        """
+        Spills the least recently used carts that are idle or over the memory budget.
+
+        Args:
+            now (float): The current time.
+
+        Returns:
+            None
+        """
+        while self._carts:
+            session_id, (_, last_used) = next(iter(self._carts.items()))
+            expired = self.ttl is not None and now - last_used > self.ttl
+            if not expired and self._memory_bytes <= self.max_memory_bytes:
+                return
+            self._spill(session_id)
+
+    def _restore(self, session_id: str) -> Optional[bytes]:
+        """
+        Reads a spilled cart back and removes its file.
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            Optional[bytes]: The serialized cart, or None if it was not spilled.
+        """
+        path = self._path(session_id)
+        try:
+            with open(path, "rb") as cart_file:
+                data = cart_file.read()
+        except FileNotFoundError:
+            return None
+        os.remove(path)
+        self.restores += 1
+        return data
+
+    def load(self, session_id: str) -> ShoppingCart:
+        """
+        Returns the cart of a session, restoring it from disk if it was spilled.
+
+        The cart returned is a copy: changes to it are kept only once it is saved.
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            ShoppingCart: The session's cart, or an empty cart for a new session.
+        """
+        with self._lock:
+            now = time.monotonic()
+            entry = self._carts.get(session_id)
+            data = entry[0] if entry else self._restore(session_id)
+            if data is not None:
+                self._remember(session_id, data, now)
+            self._evict(now)
+        if data is None:
+            return ShoppingCart()
+        return ShoppingCart.from_bytes(data, self.product_repo)
+
+    def save(self, session_id: str, cart: ShoppingCart):
+        """
+        Stores the cart of a session. An empty cart deletes the session's cart.
+
+        Args:
+            session_id (str): The session ID.
+            cart (ShoppingCart): The cart to store.
+
+        Returns:
+            None
+        """
+        if not cart.cart_items:
+            self.delete(session_id)
+            return
+        data = cart.to_bytes()
+        with self._lock:
+            now = time.monotonic()
+            self._remember(session_id, data, now)
+            self._evict(now)
+
+    def delete(self, session_id: str):
+        """
+        Forgets the cart of a session, in memory and on disk.
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._forget(session_id)
+            try:
+                os.remove(self._path(session_id))
+            except FileNotFoundError:
+                pass
+
+    @contextmanager
+    def session(self, session_id: str) -> Iterator[ShoppingCart]:
+        """
+        Loads the cart of a session and saves it back when the block ends.
+
+        The cart is not saved if the block raises an exception.
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            Iterator[ShoppingCart]: A context manager yielding the cart.
+        """
+        cart = self.load(session_id)
+        yield cart
+        self.save(session_id, cart)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the store counters.
+
+        Returns:
+            Dict[str, int]: The number of carts and bytes in memory, and the number of
+                carts spilled to disk and restored from it so far.
+        """
+        with self._lock:
+            return {
+                "carts_in_memory": len(self._carts),
+                "memory_bytes": self._memory_bytes,
+                "spills": self.spills,
+                "restores": self.restores,
+            }
+
+    def close(self):
+        """
+        Spills every cart in memory to disk, so sessions survive a restart.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            while self._carts:
+                self._spill(next(iter(self._carts)))
@@ -0,0 +1,229 @@
+"""
+This module contains the CatalogGenerator class which writes synthetic
+product catalogs of any size in the products.csv format, reproducibly
+from a seed, with a configurable skew in the size of the categories.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import csv
+import os
+import random
+from itertools import accumulate, islice
+from typing import Iterator, List, Optional, Tuple
+
+# Rows written to the CSV file per call.
+WRITE_BATCH = 10_000
+
+ADJECTIVES = [
+    "Compact", "Digital", "Portable", "Industrial", "Wireless", "Precision",
+    "Smart", "Modular", "Advanced", "Basic", "Thermal", "Optical",
+]
+NOUNS = [
+    "Laptop", "Oscilloscope", "Multimeter", "Router", "Sensor", "Printer",
+    "Controller", "Microscope", "Drone", "Server", "Monitor", "Soldering Station",
+    "Spectrometer", "Power Supply", "Keyboard", "Camera",
+]
+DISCIPLINES = [
+    "System", "Electronic", "Industrial", "Civil", "Mechanical", "Electrical",
+    "Chemical", "Environmental", "Telecommunications", "Cadastral",
+]
+
+
+def parse_count(text: str) -> int:
+    """Parses a row count, accepting scientific notation such as 1e6.
+
+    Args:
+        text (str): The count.
+
+    Returns:
+        int: The count.
+
+    Raises:
+        ValueError: If the count is not a positive whole number.
+    """
+    count = int(float(text))
+    if count < 1 or count != float(text):
+        raise ValueError(f"Invalid row count: {text}")
+    return count
+
+
+class CatalogGenerator:
+    """
+    Generates synthetic product catalogs.
+
+    The catalog is fully determined by its parameters: the same rows, categories,
+    skew and seed always produce the same file, so benchmark runs on different
+    machines or commits measure the same data.
+
+    Category sizes follow a Zipf law: the k-th category (from 1) is drawn with a
+    weight of 1 / k ** skew. A skew of 0 gives categories of equal size; a skew of
+    1 or more makes the first few categories hold most of the products, like a
+    real shop with a few large departments and a long tail.
+
+    Attributes:
+        rows (int): The number of products.
+        categories (List[str]): The category names, from the largest to the smallest.
+        skew (float): The Zipf exponent of the category sizes.
+        seed (int): The seed of the random choices.
+        stock_share (float): The share of products that track stock.
+
+    Methods:
+        products: Yields the products as (id, name, category, price, stock) tuples.
+        write: Writes the catalog to a CSV file.
+    """
+
+    def __init__(
+        self,
+        rows: int,
+        categories: int = 20,
+        skew: float = 1.0,
+        seed: int = 0,
+        stock_share: float = 0.0,
+    ):
+        """
+        Initializes the CatalogGenerator.
+
+        Args:
+            rows (int): The number of products.
+            categories (int): The number of categories.
+            skew (float): The Zipf exponent of the category sizes; 0 for equal sizes.
+            seed (int): The seed of the random choices.
+            stock_share (float): The share of products, between 0 and 1, that track stock.
+
+        Raises:
+            ValueError: If a parameter is out of range.
+        """
+        if rows < 1 or categories < 1:
+            raise ValueError("rows and categories must be at least 1")
+        if skew < 0 or not 0 <= stock_share <= 1:
+            raise ValueError("skew must not be negative and stock_share must be in [0, 1]")
+        self.rows = rows
+        self.categories = [
+            f"{DISCIPLINES[k % len(DISCIPLINES)]} Engineering"
+            + (f" {k // len(DISCIPLINES) + 1}" if k >= len(DISCIPLINES) else "")
+            for k in range(categories)
+        ]
+        self.skew = skew
+        self.seed = seed
+        self.stock_share = stock_share
+
+    def products(self) -> Iterator[Tuple[str, str, str, float, Optional[int]]]:
+        """
+        Yields the products of the catalog.
+
+        Args:
+            None
+
+        Returns:
+            Iterator[Tuple[str, str, str, float, Optional[int]]]: The products as
+                (id, name, category, price, stock) tuples, with IDs 1 to rows.
+        """
+        generator = random.Random(self.seed)
+        cumulative = list(
+            accumulate(1 / (k + 1) ** self.skew for k in range(len(self.categories)))
+        )
+        choices, randrange, uniform = generator.choices, generator.randrange, generator.random
+        categories, adjectives, nouns = self.categories, ADJECTIVES, NOUNS
+        for start in range(0, self.rows, WRITE_BATCH):
+            count = min(WRITE_BATCH, self.rows - start)
+            drawn = choices(categories, cum_weights=cumulative, k=count)
+            for offset, category in enumerate(drawn):
+                product_id = start + offset + 1
+                name = (
+                    f"{adjectives[randrange(len(adjectives))]} "
+                    f"{nouns[randrange(len(nouns))]} {product_id}"
+                )
+                price = round(5 + 2995 * uniform() ** 2, 2)
+                stock = randrange(1000) if uniform() < self.stock_share else None
+                yield str(product_id), name, category, price, stock
+
+    def write(self, filename: str) -> int:
+        """
+        Writes the catalog to a CSV file in the products.csv format.
+
+        The file is written to a temporary name and renamed when complete, so an
+        interrupted run never leaves a truncated catalog behind. A Stock column is
+        written only when stock_share is above 0.
+
+        Args:
+            filename (str): The path of the CSV file.
+
+        Returns:
+            int: The number of products written.
+        """
+        header = ["id", "Product", "Category", "Price"]
+        with_stock = self.stock_share > 0
+        if with_stock:
+            header.append("Stock")
+        temp_filename = filename + ".tmp"
+        products = self.products()
+        with open(temp_filename, "w", newline="") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(header)
+            while True:
+                batch: List[Tuple] = list(islice(products, WRITE_BATCH))
+                if not batch:
+                    break
+                if with_stock:
+                    writer.writerows(
+                        row[:4] + ("" if row[4] is None else row[4],) for row in batch
+                    )
+                else:
+                    writer.writerows(row[:4] for row in batch)
+        os.replace(temp_filename, filename)
+        return self.rows
+
+
+def main(argv: Optional[List[str]] = None):
+    """Writes a synthetic catalog from the command line.
+
+    Args:
+        argv (Optional[List[str]]): The command-line arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Generate a synthetic products CSV file.")
+    parser.add_argument("rows", type=parse_count, help="the number of products, e.g. 1e6")
+    parser.add_argument("--output", default="catalog.csv", help="the CSV file to write")
+    parser.add_argument("--categories", type=int, default=20, help="the number of categories")
+    parser.add_argument(
+        "--skew",
+        type=float,
+        default=1.0,
+        help="the Zipf exponent of the category sizes; 0 for equal sizes (default: 1.0)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="the random seed")
+    parser.add_argument(
+        "--stock-share",
+        type=float,
+        default=0.0,
+        help="the share of products that track stock, between 0 and 1 (default: 0)",
+    )
+    options = parser.parse_args(argv)
+
+    generator = CatalogGenerator(
+        options.rows, options.categories, options.skew, options.seed, options.stock_share
+    )
+    print(f"Wrote {generator.write(options.output)} products to {options.output}")
+
+
+if __name__ == "__main__":
+    main()
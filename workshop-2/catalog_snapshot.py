@@ -0,0 +1,363 @@
+"""
+This module contains the CatalogSnapshot class and the helpers that
+compile products.csv into a binary snapshot which can be opened
+through mmap, so large catalogs start without re-parsing the CSV.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+
+Snapshot layout (all integers little-endian):
+
+    header      magic "CATSNAP2", row count (uint64), category count (uint64)
+    prices      row count x float64
+    stocks      row count x int64, -1 for products that do not track stock
+    offsets     (2 x rows + categories + 1) x uint64, start of each string in the heap
+    categories  row count x uint32, index of each row's category name
+    heap        UTF-8 strings: id and name of every row, then every category name
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, List, Optional
+from product import Product
+from product_table import NO_STOCK
+
+MAGIC = b"CATSNAP2"
+HEADER = struct.Struct("<8sQQ")
+
+
+def default_snapshot_path(csv_filename: str) -> str:
+    """Returns the snapshot path used for a CSV file when none is given.
+
+    Args:
+        csv_filename (str): The path to the CSV file with the product data.
+
+    Returns:
+        str: The CSV path with a ".snap" suffix.
+    """
+    return csv_filename + ".snap"
+
+
+def _little_endian(column: array) -> bytes:
+    """Returns the bytes of an array in little-endian order.
+
+    Args:
+        column (array): The column to serialize.
+
+    Returns:
+        bytes: The serialized column.
+    """
+    if sys.byteorder != "little":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def build_snapshot(csv_filename: str, snapshot_filename: str) -> int:
+    """Compiles a products CSV file into a binary snapshot.
+
+    The snapshot is written to a temporary file and moved into place with os.replace,
+    so readers never see a partially written snapshot.
+
+    Args:
+        csv_filename (str): The path to the CSV file with the product data.
+        snapshot_filename (str): The path of the snapshot to write.
+
+    Returns:
+        int: The number of products written to the snapshot.
+    """
+    # Imported here because product_repository imports this module.
+    from product_repository import read_product_rows
+
+    prices = array("d")
+    stocks = array("q")
+    offsets = array("Q", [0])
+    category_codes = array("I")
+    categories: Dict[str, int] = {}
+    heap = bytearray()
+
+    for product_id, name, category, price, stock in read_product_rows(csv_filename):
+        prices.append(price)
+        stocks.append(NO_STOCK if stock is None else stock)
+        for text in (product_id, name):
+            heap += text.encode("utf-8")
+            offsets.append(len(heap))
+        code = categories.get(category)
+        if code is None:
+            code = categories[category] = len(categories)
+        category_codes.append(code)
+
+    for category in categories:
+        heap += category.encode("utf-8")
+        offsets.append(len(heap))
+
+    temp_filename = f"{snapshot_filename}.tmp{os.getpid()}"
+    with open(temp_filename, "wb") as snapshot_file:
+        snapshot_file.write(HEADER.pack(MAGIC, len(prices), len(categories)))
+        snapshot_file.write(_little_endian(prices))
+        snapshot_file.write(_little_endian(stocks))
+        snapshot_file.write(_little_endian(offsets))
+        snapshot_file.write(_little_endian(category_codes))
+        snapshot_file.write(heap)
+    os.replace(temp_filename, snapshot_filename)
+    return len(prices)
+
+
+class CatalogSnapshot:
+    """
+    Read-only view of a binary catalog snapshot mapped into memory.
+
+    Opening a snapshot only maps the file and slices its columns; strings are
+    decoded and Product objects are created only for the rows that are read.
+
+    Attributes:
+        filename (str): The path of the snapshot file.
+        prices (memoryview): The float64 price column.
+        stocks (memoryview): The int64 stock column, -1 where stock is not tracked.
+        category_codes (memoryview): The uint32 category index of every row.
+        categories (List[str]): The distinct category names in first-seen order.
+
+    Methods:
+        product_id: Returns the ID of a row.
+        product_ids: Returns the IDs of all rows.
+        name: Returns the name of a row.
+        category: Returns the category name of a row.
+        price: Returns the price of a row.
+        stock: Returns the stock level of a row.
+        product: Materializes a row as a Product.
+        close: Releases the memory map.
+    """
+
+    def __init__(self, filename: str):
+        """
+        Maps a snapshot file and validates its header.
+
+        Args:
+            filename (str): The path of the snapshot file.
+
+        Raises:
+            ValueError: If the file is not a valid snapshot.
+        """
+        self.filename = filename
+        with open(filename, "rb") as snapshot_file:
+            self._mmap = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open_columns()
+        except Exception:
+            self.close()
+            raise
+
+    def _open_columns(self):
+        """
+        Slices the mapped file into its typed columns.
+
+        Raises:
+            ValueError: If the file is truncated or has a bad magic number, or if the
+                host is big-endian and cannot read the columns natively.
+        """
+        if sys.byteorder != "little":
+            raise ValueError("catalog snapshots can only be mapped on little-endian hosts")
+        if len(self._mmap) < HEADER.size:
+            raise ValueError(f"'{self.filename}' is too short to be a catalog snapshot")
+        magic, rows, category_count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"'{self.filename}' is not a catalog snapshot")
+
+        view = memoryview(self._mmap)
+        self._view = view
+        start = HEADER.size
+        offsets_count = 2 * rows + category_count + 1
+        bounds = []
+        for size in (8 * rows, 8 * rows, 8 * offsets_count, 4 * rows):
+            bounds.append((start, start + size))
+            start += size
+        if start > len(self._mmap):
+            raise ValueError(f"'{self.filename}' is truncated")
+
+        self._rows = rows
+        self.prices = view[bounds[0][0] : bounds[0][1]].cast("d")
+        self.stocks = view[bounds[1][0] : bounds[1][1]].cast("q")
+        self._offsets = view[bounds[2][0] : bounds[2][1]].cast("Q")
+        self.category_codes = view[bounds[3][0] : bounds[3][1]].cast("I")
+        self._heap_start = start
+        if self._heap_start + self._offsets[-1] > len(self._mmap):
+            raise ValueError(f"'{self.filename}' is truncated")
+        self.categories: List[str] = [
+            self._string(2 * rows + code) for code in range(category_count)
+        ]
+
+    def __len__(self) -> int:
+        """
+        Returns the number of rows in the snapshot.
+
+        Returns:
+            int: The row count.
+        """
+        return self._rows
+
+    def _string(self, index: int) -> str:
+        """
+        Decodes one string from the heap.
+
+        Args:
+            index (int): The position of the string in the offsets column.
+
+        Returns:
+            str: The decoded string.
+        """
+        start = self._heap_start + self._offsets[index]
+        end = self._heap_start + self._offsets[index + 1]
+        return str(self._mmap[start:end], "utf-8")
+
+    def product_id(self, row: int) -> str:
+        """
+        Returns the ID of a row.
+
+        Args:
+            row (int): The row number.
+
+        Returns:
+            str: The product ID.
+        """
+        return self._string(2 * row)
+
+    def product_ids(self) -> List[str]:
+        """
+        Decodes the ID of every row in a single pass over the heap.
+
+        Returns:
+            List[str]: The product IDs in row order.
+        """
+        heap = self._mmap[self._heap_start : self._heap_start + self._offsets[-1]]
+        offsets = self._offsets.tolist()
+        return [
+            str(heap[offsets[index] : offsets[index + 1]], "utf-8")
+            for index in range(0, 2 * self._rows, 2)
+        ]
+
+    def name(self, row: int) -> str:
+        """
+        Returns the name of a row.
+
+        Args:
+            row (int): The row number.
+
+        Returns:
+            str: The product name.
+        """
+        return self._string(2 * row + 1)
+
+    def category(self, row: int) -> str:
+        """
+        Returns the category name of a row.
+
+        Args:
+            row (int): The row number.
+
+        Returns:
+            str: The category name.
+        """
+        return self.categories[self.category_codes[row]]
+
+    def price(self, row: int) -> float:
+        """
+        Returns the price of a row.
+
+        Args:
+            row (int): The row number.
+
+        Returns:
+            float: The product price.
+        """
+        return self.prices[row]
+
+    def stock(self, row: int) -> Optional[int]:
+        """
+        Returns the stock level of a row.
+
+        Args:
+            row (int): The row number.
+
+        Returns:
+            Optional[int]: The units in stock, or None if stock is not tracked.
+        """
+        stock = self.stocks[row]
+        return None if stock == NO_STOCK else stock
+
+    def product(self, row: int) -> Product:
+        """
+        Materializes a row as a Product.
+
+        Args:
+            row (int): The row number.
+
+        Returns:
+            Product: A new Product holding the row's values.
+        """
+        return Product(
+            self.product_id(row),
+            self.name(row),
+            self.category(row),
+            self.price(row),
+            self.stock(row),
+        )
+
+    def close(self):
+        """
+        Releases the memory map.
+
+        Products that were already materialized stay valid after closing.
+
+        Returns:
+            None
+        """
+        for column in ("prices", "stocks", "_offsets", "category_codes", "_view"):
+            view = self.__dict__.pop(column, None)
+            if view is not None:
+                view.release()
+        self._mmap.close()
+
+
+def open_snapshot(csv_filename: str, snapshot_filename: Optional[str] = None) -> CatalogSnapshot:
+    """Opens the snapshot of a CSV file, rebuilding it first if it is missing or stale.
+
+    A snapshot is stale when the CSV file was modified after (or at the same time as)
+    it, or when it cannot be read as a snapshot at all.
+
+    Args:
+        csv_filename (str): The path to the CSV file with the product data.
+        snapshot_filename (Optional[str]): The snapshot path. Defaults to the CSV path
+            with a ".snap" suffix.
+
+    Returns:
+        CatalogSnapshot: The opened snapshot.
+    """
+    snapshot_filename = snapshot_filename or default_snapshot_path(csv_filename)
+    try:
+        stale = os.path.getmtime(snapshot_filename) <= os.path.getmtime(csv_filename)
+    except FileNotFoundError:
+        stale = True
+    if not stale:
+        try:
+            return CatalogSnapshot(snapshot_filename)
+        except (OSError, ValueError):
+            pass
+    build_snapshot(csv_filename, snapshot_filename)
+    return CatalogSnapshot(snapshot_filename)
@@ -0,0 +1,447 @@
+"""
+This module contains the ChangeJournal class which records product
+mutations in an append-only file, so that a single edit does not
+require rewriting the whole products CSV file.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+from metrics import METRICS
+from product import Product
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+def default_journal_path(csv_filename: str) -> str:
+    """Returns the journal path used for a CSV file.
+
+    Args:
+        csv_filename (str): The path to the CSV file with the product data.
+
+    Returns:
+        str: The CSV path with a ".journal" suffix.
+    """
+    return csv_filename + ".journal"
+
+
+class ChangeJournal:
+    """
+    Append-only log of product mutations stored as JSON lines.
+
+    Each line is one operation: {"op": "add" | "edit", "id", "name", "category",
+    "price"} (adds may also carry "stock"), {"op": "stock", "id", "stock"} or
+    {"op": "remove", "id"}. Stock entries hold the new stock level rather than
+    the change, so replaying one twice is harmless. The journal is replayed on top of the
+    products CSV file when a ProductRepository is loaded, and is emptied once
+    its changes have been folded back into the CSV file.
+
+    Replaying is idempotent against a CSV file that already contains some of
+    the changes, so a crash between rewriting the CSV file and clearing the
+    journal loses nothing.
+
+    Several processes may share one journal. Appends and clears hold the journal
+    lock (see locked) exclusively, which serializes them across threads and, where
+    fcntl is available, across processes through a ".lock" file next to the
+    journal; loads hold it shared, so they never see the CSV file and the journal
+    from two different compactions. Readers never modify the file: a last line
+    without its newline is a write still in progress, or one cut short by a crash,
+    and is skipped. The next append ends such a line first, and lines that do not
+    decode are skipped as well.
+
+    Entries can also be queued with enqueue, which takes no journal lock and does
+    no I/O, and written later with write_queued. Stock changes are queued while the
+    stock lock of the product is held, so the journal keeps the order the levels
+    changed in, and are written after it is released, so checkouts do not wait for
+    each other's journal writes.
+
+    Attributes:
+        filename (str): The path of the journal file.
+
+    Methods:
+        enqueue: Queues operations for the next write of the journal.
+        write_queued: Writes the queued operations to the journal.
+        append: Appends operations to the journal.
+        size: Returns the size of the journal in bytes.
+        entries: Yields the operations stored in the journal.
+        replay: Applies the stored operations to a repository.
+        locked: Holds the journal lock, exclusive or shared.
+        mark: Returns the position of the end of the journal.
+        clear: Empties the journal.
+    """
+
+    def __init__(self, filename: str):
+        """
+        Initializes the ChangeJournal for the given file, which may not exist yet.
+
+        Args:
+            filename (str): The path of the journal file.
+        """
+        self.filename = filename
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._lock_file = None
+        # Encoded lines waiting for write_queued, and how many were ever queued and
+        # written; guarded by a lock of their own so queueing never waits for I/O.
+        self._queue_lock = threading.Lock()
+        self._queued: List[str] = []
+        self._queued_count = 0
+        self._written_count = 0
+
+    @contextmanager
+    def locked(self, shared: bool = False) -> Iterator["ChangeJournal"]:
+        """
+        Holds the journal lock for the duration of a block.
+
+        The lock is reentrant within a thread: nested blocks join the outermost one,
+        whose mode they keep. Threads of one process always exclude each other; the
+        shared mode only lets other processes read at the same time. A shared lock is
+        skipped when the lock file does not exist or cannot be opened (see
+        _open_lock_file), so read-only catalogs load as before.
+
+        Args:
+            shared (bool): Whether other processes may hold the lock shared as well.
+
+        Returns:
+            Iterator[ChangeJournal]: A context manager that yields this journal.
+        """
+        with self._lock:
+            if self._depth == 0 and fcntl is not None:
+                self._lock_file = self._open_lock_file(shared)
+                if self._lock_file is not None:
+                    try:
+                        fcntl.flock(self._lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+                    except BaseException:
+                        self._lock_file.close()
+                        self._lock_file = None
+                        raise
+            self._depth += 1
+            try:
+                yield self
+            finally:
+                self._depth -= 1
+                if self._depth == 0 and self._lock_file is not None:
+                    # Closing the file releases the flock.
+                    self._lock_file.close()
+                    self._lock_file = None
+
+    def enqueue(self, *entries: Dict) -> int:
+        """
+        Queues operations for the next write of the journal, without any I/O.
+
+        Entries are written in the order they were queued, so a caller that queues
+        while holding a lock (such as the stock lock of a product) fixes their order
+        cheaply and can write them once the lock is released.
+
+        Args:
+            *entries (Dict): The operations to record.
+
+        Returns:
+            int: The sequence number of the last queued entry, to pass to write_queued.
+        """
+        lines = [json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries]
+        with self._queue_lock:
+            self._queued.extend(lines)
+            self._queued_count += len(lines)
+            return self._queued_count
+
+    def write_queued(self, up_to: Optional[int] = None):
+        """
+        Writes the queued operations to the journal with a single write.
+
+        Whichever thread writes first takes every entry queued so far, so concurrent
+        callers share one write instead of waiting for one each. If the journal ends
+        in a line cut short by a crash, that line is ended first, so the new entries
+        start on a line of their own. If the write fails, the entries stay queued
+        for the next one.
+
+        Args:
+            up_to (Optional[int]): Return as soon as the entries up to this sequence
+                number are written. None writes everything queued.
+
+        Returns:
+            None
+        """
+        with self.locked():
+            with self._queue_lock:
+                if up_to is not None and self._written_count >= up_to:
+                    return
+                lines, self._queued = self._queued, []
+                queued_count = self._queued_count
+            if not lines:
+                return
+            data = "".join(lines).encode("utf-8")
+            if METRICS.enabled:
+                METRICS.count_bytes("journal.append", written=len(data))
+            try:
+                with open(self.filename, "a+b") as journal_file:
+                    if journal_file.seek(0, os.SEEK_END) > 0:
+                        journal_file.seek(-1, os.SEEK_END)
+                        if journal_file.read(1) != b"\n":
+                            data = b"\n" + data
+                    journal_file.write(data)
+            except BaseException:
+                with self._queue_lock:
+                    self._queued[:0] = lines
+                raise
+            self._written_count = queued_count
+
+    def _open_lock_file(self, shared: bool) -> Optional[BinaryIO]:
+        """
+        Opens the lock file of the journal.
+
+        Writers create it. Readers only open an existing one, read-only: a catalog
+        no process has written to has nothing to lock yet, and one in a read-only
+        place must still load, so readers go without the lock when it cannot be
+        opened.
+
+        Args:
+            shared (bool): Whether the lock is taken for reading.
+
+        Returns:
+            Optional[BinaryIO]: The open lock file, or None to go without the lock.
+        """
+        if not shared:
+            return open(self.filename + ".lock", "a+b")
+        try:
+            return open(self.filename + ".lock", "rb")
+        except OSError:
+            return None
+
+    def append(self, *entries: Dict):
+        """
+        Appends operations to the journal, after any queued ones, with a single write.
+
+        Args:
+            *entries (Dict): The operations to record.
+
+        Returns:
+            None
+        """
+        if entries:
+            self.write_queued(self.enqueue(*entries))
+
+    def size(self) -> int:
+        """
+        Returns the size of the journal in bytes.
+
+        Returns:
+            int: The size of the journal, or 0 if it does not exist.
+        """
+        try:
+            return os.path.getsize(self.filename)
+        except FileNotFoundError:
+            return 0
+
+    def mark(self) -> Tuple[int, int]:
+        """
+        Returns the position of the end of the journal, to pass to clear later.
+
+        Returns:
+            Tuple[int, int]: The identity (inode) and size of the journal file, or
+                (0, 0) if it does not exist.
+        """
+        try:
+            status = os.stat(self.filename)
+        except FileNotFoundError:
+            return 0, 0
+        return status.st_ino, status.st_size
+
+    def entries(self) -> Iterator[Dict]:
+        """
+        Yields the operations stored in the journal in the order they were written.
+
+        A last line without its newline, which another process is still writing or
+        which a crash cut short, is skipped, as are lines that do not decode. The
+        file itself is never changed.
+
+        Returns:
+            Iterator[Dict]: An iterator over the operations.
+        """
+        try:
+            journal_file = open(self.filename, "rb")
+        except FileNotFoundError:
+            return
+        with journal_file:
+            for line in journal_file:
+                if not line.endswith(b"\n"):
+                    return
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                yield entry
+
+    def replay(self, repository) -> int:
+        """
+        Applies the stored operations to a repository.
+
+        Adds of IDs that already exist and edits or removals of missing IDs are
+        ignored, which makes replaying safe after a partial compaction.
+
+        Args:
+            repository (ProductRepository): The repository to update.
+
+        Returns:
+            int: The number of operations read from the journal.
+        """
+        if METRICS.enabled:
+            METRICS.count_bytes("journal.replay", read=self.size())
+        count = 0
+        for entry in self.entries():
+            operation = entry["op"]
+            if operation == "add":
+                repository.add_product(
+                    Product(
+                        entry["id"],
+                        entry["name"],
+                        entry["category"],
+                        entry["price"],
+                        entry.get("stock"),
+                    )
+                )
+            elif operation == "edit":
+                repository.update_product(
+                    entry["id"], entry["name"], entry["category"], entry["price"]
+                )
+            elif operation == "stock":
+                repository.set_stock(entry["id"], entry["stock"])
+            elif operation == "remove":
+                repository.remove_product(entry["id"])
+            else:
+                raise ValueError(f"Unknown journal operation: {operation}")
+            count += 1
+        return count
+
+    def clear(self, up_to: Optional[Tuple[int, int]] = None):
+        """
+        Empties the journal, or drops only what it held at a mark.
+
+        A compaction that copies the products without holding the journal lock
+        marks the journal first and passes the mark here, so entries appended while
+        the CSV file was being written are kept for the next load. If the journal
+        file was replaced since the mark, another process compacted it in between
+        and nothing is dropped.
+
+        Args:
+            up_to (Optional[Tuple[int, int]]): A mark returned by mark, or None to
+                drop everything.
+
+        Returns:
+            None
+        """
+        with self.locked():
+            remaining = b""
+            if up_to is not None:
+                inode, size = up_to
+                if self.mark()[0] != inode:
+                    return
+                try:
+                    with open(self.filename, "rb") as journal_file:
+                        journal_file.seek(size)
+                        remaining = journal_file.read()
+                except FileNotFoundError:
+                    return
+            if not remaining:
+                try:
+                    os.remove(self.filename)
+                except FileNotFoundError:
+                    pass
+                return
+            temp_filename = f"{self.filename}.tmp{os.getpid()}"
+            with open(temp_filename, "wb") as journal_file:
+                journal_file.write(remaining)
+            os.replace(temp_filename, self.filename)
+
+
+def add_entry(
+    product_id: str, name: str, category: str, price: float, stock: Optional[int] = None
+) -> Dict:
+    """Returns the journal entry for adding a product.
+
+    Args:
+        product_id (str): The unique identifier of the product.
+        name (str): The name of the product.
+        category (str): The category of the product.
+        price (float): The price of the product.
+        stock (Optional[int]): The units in stock, or None if stock is not tracked.
+
+    Returns:
+        Dict: The journal entry.
+    """
+    entry = {"op": "add", "id": product_id, "name": name, "category": category, "price": price}
+    if stock is not None:
+        entry["stock"] = stock
+    return entry
+
+
+def edit_entry(product_id: str, name: str, category: str, price: float) -> Dict:
+    """Returns the journal entry for editing a product.
+
+    Args:
+        product_id (str): The unique identifier of the product.
+        name (str): The updated name of the product.
+        category (str): The updated category of the product.
+        price (float): The updated price of the product.
+
+    Returns:
+        Dict: The journal entry.
+    """
+    return {"op": "edit", "id": product_id, "name": name, "category": category, "price": price}
+
+
+def stock_entry(product_id: str, stock: Optional[int]) -> Dict:
+    """Returns the journal entry for setting the stock level of a product.
+
+    Args:
+        product_id (str): The unique identifier of the product.
+        stock (Optional[int]): The new units in stock, or None to stop tracking stock.
+
+    Returns:
+        Dict: The journal entry.
+    """
+    return {"op": "stock", "id": product_id, "stock": stock}
+
+
+def remove_entry(product_id: str) -> Dict:
+    """Returns the journal entry for removing a product.
+
+    Args:
+        product_id (str): The unique identifier of the product.
+
+    Returns:
+        Dict: The journal entry.
+    """
+    return {"op": "remove", "id": product_id}
+
+
+METRICS.register(
+    ChangeJournal,
+    {
+        "append": "journal.append",
+        "write_queued": "journal.write_queued",
+        "replay": "journal.replay",
+    },
+)
@@ -22,13 +22,25 @@ You should have received a copy of the GNU General Public License
 along with Workshop-1. If not, see <https://www.gnu.org/licenses/>. 
 """
 
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from metrics import METRICS
+from order_ledger import OrderLedger
 from shopping_cart import ShoppingCart
 
 
 class Checkout:
-    """Handles the checkout process, including user input for contact details."""
+    """Handles the checkout process, including user input for contact details.
 
-    def __init__(self, cart: ShoppingCart):
+    place_order is the programmatic checkout: it turns the cart and the customer
+    details into an order record. process_checkout is the interactive front end
+    that collects the details with input() and prints the summary.
+    """
+
+    def __init__(
+        self, cart: ShoppingCart, ledger: Optional[OrderLedger] = None, product_repo=None
+    ):
         """Initializes the Checkout with a shopping cart.
 
         This method takes a ShoppingCart object as an argument and links it to the
@@ -36,18 +48,107 @@ class Checkout:
 
         Args:
             cart (ShoppingCart): The shopping cart to be processed during checkout.
+            ledger (Optional[OrderLedger]): The ledger that records placed orders.
+            product_repo (Optional[ProductRepository]): The repository whose stock is
+                reserved for each order, or None to place orders without checking stock.
 
         Returns:
             None: Initializes the Checkout instance.
         """
         self.cart = cart
+        self.ledger = ledger
+        self.product_repo = product_repo
+
+    def place_order(self, name: str, direction: str, country: str, email: str) -> Dict:
+        """Places an order for the items in the cart and empties the cart.
+
+        If the checkout has a repository, the stock of the whole cart is reserved first
+        with reserve_stock: either every line is taken out of stock or the order is
+        refused and the cart is left as it was. If the checkout has a ledger, the order
+        is appended to it; the ledger writes it in the background, so this method does
+        not wait for the disk.
+
+        Args:
+            name (str): The name of the customer.
+            direction (str): The delivery address.
+            country (str): The delivery country.
+            email (str): The email address of the customer.
+
+        Returns:
+            Dict: The order record, with the order ID, creation time, customer details,
+                one entry per cart line and the total (also in cents). Each line's
+                price is the one the cart was priced at, so the lines add up to the
+                total even if the catalog price changed after the line was added.
+
+        Raises:
+            ValueError: If the cart is empty, a product is out of stock, or a product
+                was removed from the catalog; such products are dropped from the cart,
+                so the next attempt can go ahead.
+        """
+        if not self.cart.cart_items:
+            raise ValueError("Your cart is empty!")
+        if self.product_repo is not None:
+            stale = [
+                product
+                for product, _ in self.cart.list_cart_lines()
+                if self.product_repo.get_by_id(product.product_id) is None
+            ]
+            if stale:
+                for product in stale:
+                    self.cart.remove_product(product.product_id)
+                names = ", ".join(f"'{product.name}'" for product in stale)
+                raise ValueError(
+                    f"No longer available, removed from your cart: {names}. "
+                    "Please review your cart and check out again."
+                )
+        lines = self.cart.list_cart_lines()
+        # Items are priced like the cart's total, at the price each line was added at,
+        # even if the catalog price has changed since.
+        items = [
+            {
+                "id": product.product_id,
+                "name": product.name,
+                "price": self.cart.line_cents(product.product_id) // quantity / 100,
+                "quantity": quantity,
+            }
+            for product, quantity in lines
+        ]
+        order = {
+            "order_id": uuid.uuid4().hex,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "customer": {
+                "name": name,
+                "direction": direction,
+                "country": country,
+                "email": email,
+            },
+            "items": items,
+            "total": self.cart.calculate_total(),
+            "total_cents": self.cart.total_cents,
+        }
+        reserved = [(product.product_id, quantity) for product, quantity in lines]
+        if self.product_repo is not None:
+            self.product_repo.reserve_stock(reserved)
+        if self.ledger is not None:
+            try:
+                self.ledger.append(order)
+            except BaseException:
+                if self.product_repo is not None:
+                    self.product_repo.release_stock(reserved)
+                raise
+        self.cart.clear()
+        return order
 
     def process_checkout(self):
         """Processes the checkout by showing cart items, total, and collecting user details.
 
         This method displays the cart summary including the total price, and collects
         customer details like name, direction, country, and email through user input.
-        If the cart is empty, it informs the user and aborts the process.
+        If the cart is empty, it informs the user and aborts the process. The order is
+        then placed with place_order, which empties the cart; if a product is out of
+        stock, the user is told and the cart is kept, and products that were removed
+        from the catalog are dropped from it. If the order cannot be recorded, the
+        error is shown and the cart is kept as well.
 
         Args:
             None
@@ -61,8 +162,8 @@ class Checkout:
 
         print("Cart Summary:")
         total = self.cart.calculate_total()
-        for item in self.cart.list_cart_items():
-            print(item)
+        for item, quantity in self.cart.list_cart_lines():
+            print(f"{item}, Quantity: {quantity}")
 
         print(f"Total: {total:.2f}")
 
@@ -72,10 +173,22 @@ class Checkout:
         direction = input("Direction: ")
         country = input("Country: ")
         email = input("Email: ")
+        try:
+            order = self.place_order(name, direction, country, email)
+        except ValueError as e:
+            print(e)
+            return
+        except OSError as e:
+            print(f"The order could not be recorded: {e}")
+            return
 
         # Displaying checkout summary
         print("\nCheckout Details:")
         print(
             f"Name: {name}, Direction: {direction}, Country: {country}, Email: {email}"
         )
+        print(f"Order ID: {order['order_id']}")
         print("Thank you for your purchase!")
+
+
+METRICS.register(Checkout, {"place_order": "checkout.place_order"})
@@ -21,6 +21,7 @@ You should have received a copy of the GNU General Public License
 along with Workshop-1. If not, see <https://www.gnu.org/licenses/>. 
 """
 
+from typing import Optional
 from abstract_client import AbstractProductManager
 from product_repository import ProductRepository
 
@@ -40,8 +41,10 @@ class Client(AbstractProductManager):
         add_product: Denies permission for clients to add products.
         remove_product: Denies permission for clients to remove products.
         edit_product: Denies permission for clients to edit products.
+        set_stock: Denies permission for clients to change stock levels.
         list_all_products: Lists all products from the repository.
         list_products_by_category: Lists products filtered by category.
+        search_products: Lists products whose name matches a search query.
     """
 
     def __init__(self, product_repo: ProductRepository):
@@ -104,6 +107,22 @@ class Client(AbstractProductManager):
         """
         print("Permission denied: Client cannot edit products.")
 
+    def set_stock(self, product_id: str, stock: Optional[int]):
+        """
+        Denies permission for clients to change stock levels.
+
+        Clients do not have the authority to restock products. Calling this method
+        will result in a permission denied message.
+
+        Args:
+            product_id (str): The unique identifier of the product.
+            stock (Optional[int]): The new units in stock.
+
+        Returns:
+            None
+        """
+        print("Permission denied: Client cannot change stock levels.")
+
     def list_all_products(self):
         """
         Lists all products available in the repository.
@@ -132,3 +151,19 @@ class Client(AbstractProductManager):
             list: A list of products that match the specified category.
         """
         return self.product_repo.list_products_by_category(category)
+
+    def search_products(self, query: str, limit: Optional[int] = None):
+        """
+        Lists products whose name contains every word of a search query.
+
+        Each word of the query may be the start of a word in the name, so
+        "lap" finds "Laptop".
+
+        Args:
+            query (str): The words to look for, in any order.
+            limit (Optional[int]): The maximum number of products to return.
+
+        Returns:
+            list: A list of products whose name matches the query.
+        """
+        return self.product_repo.search_products(query, limit=limit)
@@ -0,0 +1,454 @@
+"""
+This module contains the CommandRunner class which runs the menu's
+operations from a file of JSON commands, without prompting, and writes
+one JSON result per command through a single buffered writer.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import sys
+import time
+from contextlib import nullcontext
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, TextIO
+from checkout import Checkout
+from client import Client
+from manager import ChangeResult, Manager
+from metrics import METRICS
+from shopping_cart import ShoppingCart
+
+# Commands run between two writes of the output (and two journal writes).
+CHUNK_SIZE = 1000
+
+# Operations that change the catalog, which only managers may run.
+MANAGER_OPERATIONS = frozenset({"add", "edit", "stock", "remove"})
+
+
+class CommandRunner:
+    """
+    Runs menu operations given as JSON lines, for scripts and automation.
+
+    Each input line is one command, an object with an "op" field and the
+    arguments of that operation:
+
+        {"op": "list"}                          optional "limit" and "cursor"
+        {"op": "category", "category": ...}     optional "limit" and "cursor"
+        {"op": "search", "query": ...}
+        {"op": "get", "id": ...}
+        {"op": "cart_add", "id": ..., "quantity": 1}
+        {"op": "cart_set", "id": ..., "quantity": ...}
+        {"op": "cart_remove", "id": ...}
+        {"op": "cart"}
+        {"op": "checkout", "name": ..., "direction": ..., "country": ..., "email": ...}
+        {"op": "add", "id": ..., "name": ..., "category": ..., "price": ..., "stock": ...}
+        {"op": "edit", "id": ..., "name": ..., "category": ..., "price": ...}
+        {"op": "stock", "id": ..., "stock": ...}
+        {"op": "remove", "id": ...}
+        {"op": "stats"}                         the metrics recorded so far
+
+    Each command produces one JSON line, {"line", "op", "status": "ok",
+    "result"} or {"line", "op", "status": "error", "error"}, and an error
+    never stops the run. The role is fixed for the whole run; a client's
+    catalog changes are refused like in the menu.
+
+    Commands run in chunks of CHUNK_SIZE. The results of a chunk are written
+    with one call, and a manager's changes in the chunk are persisted with one
+    journal write (Manager.batch), so the cost per command stays small.
+
+    Attributes:
+        product_repo (ProductRepository): The repository the commands run against.
+        user (Client | Manager): The user the commands run as.
+        cart (ShoppingCart): The cart of the run.
+        checkout (Checkout): The checkout of the cart.
+
+    Methods:
+        run_command: Runs one command and returns its result.
+        run: Runs a stream of commands and writes their results.
+    """
+
+    def __init__(self, product_repo, user, cart: ShoppingCart, checkout: Checkout):
+        """
+        Initializes the CommandRunner.
+
+        Args:
+            product_repo (ProductRepository): The repository the commands run against.
+            user (Client | Manager): The user the commands run as.
+            cart (ShoppingCart): The cart of the run.
+            checkout (Checkout): The checkout of the cart.
+        """
+        self.product_repo = product_repo
+        self.user = user
+        self.cart = cart
+        self.checkout = checkout
+        self._operations: Dict[str, Callable[[Dict], object]] = {
+            "list": self._list,
+            "category": self._category,
+            "search": self._search,
+            "get": self._get,
+            "cart_add": self._cart_add,
+            "cart_set": self._cart_set,
+            "cart_remove": self._cart_remove,
+            "cart": self._cart,
+            "checkout": self._checkout,
+            "add": self._add,
+            "edit": self._edit,
+            "stock": self._stock,
+            "remove": self._remove,
+            "stats": self._stats,
+        }
+
+    def _list(self, command: Dict) -> object:
+        """
+        Lists the catalog, or one page of it when a limit is given.
+
+        Args:
+            command (Dict): The command.
+
+        Returns:
+            object: The products, or the page and the next cursor.
+        """
+        if "limit" not in command:
+            return [product.to_dict() for product in self.product_repo.list_all_products()]
+        products, cursor = self.product_repo.list_products_page(
+            int(command["limit"]), command.get("cursor")
+        )
+        return {"products": [product.to_dict() for product in products], "next_cursor": cursor}
+
+    def _category(self, command: Dict) -> object:
+        """
+        Lists one category, or one page of it when a limit is given.
+
+        Args:
+            command (Dict): The command.
+
+        Returns:
+            object: The products, or the page and the next cursor.
+        """
+        category = str(command["category"])
+        if "limit" not in command:
+            products = self.product_repo.list_products_by_category(category)
+            return [product.to_dict() for product in products]
+        products, cursor = self.product_repo.list_products_by_category_page(
+            category, int(command["limit"]), command.get("cursor")
+        )
+        return {"products": [product.to_dict() for product in products], "next_cursor": cursor}
+
+    def _search(self, command: Dict) -> object:
+        """
+        Lists the products whose name matches a query.
+
+        Args:
+            command (Dict): The command.
+
+        Returns:
+            object: The products.
+        """
+        return [
+            product.to_dict()
+            for product in self.product_repo.search_products(str(command["query"]))
+        ]
+
+    def _product(self, product_id: str):
+        """
+        Returns a product of the catalog.
+
+        Args:
+            product_id (str): The product ID.
+
+        Returns:
+            Product: The product.
+
+        Raises:
+            ValueError: If there is no such product.
+        """
+        product = self.product_repo.get_by_id(product_id)
+        if product is None:
+            raise ValueError(f"No product found with ID: {product_id}")
+        return product
+
+    def _get(self, command: Dict) -> object:
+        """
+        Returns one product.
+
+        Args:
+            command (Dict): The command.
+
+        Returns:
+            object: The product.
+        """
+        return self._product(str(command["id"])).to_dict()
+
+    def _cart_add(self, command: Dict) -> object:
+        """
+        Adds units of a product to the cart.
+
+        Args:
+            command (Dict): The command.
+
+        Returns:
+            object: The cart.
+        """
+        self.cart.add_product(self._product(str(command["id"])), int(command.get("quantity", 1)))
+        return self.cart.to_dict()
+
+    def _cart_set(self, command: Dict) -> object:
+        """
+        Changes the quantity of a product in the cart.
+
+        Args:
+            command (Dict): The command.
+
+        Returns:
+            object: The cart.
+        """
+        if not self.cart.set_quantity(str(command["id"]), int(command["quantity"])):
+            raise ValueError(f"Product {command['id']} is not in the cart.")
+        return self.cart.to_dict()
+
+    def _cart_remove(self, command: Dict) -> object:
+        """
+        Removes a product from the cart.
+
+        Args:
+            command (Dict): The command.
+
+        Returns:
+            object: The cart.
+        """
+        if self.cart.remove_product(str(command["id"])) is None:
+            raise ValueError(f"Product {command['id']} is not in the cart.")
+        return self.cart.to_dict()
+
+    def _cart(self, command: Dict) -> object:
+        """
+        Returns the cart.
+
+        Args:
+            command (Dict): The command.
+
+        Returns:
+            object: The cart.
+        """
+        return self.cart.to_dict()
+
+    def _checkout(self, command: Dict) -> object:
+        """
+        Places an order for the cart and empties it.
+
+        Args:
+            command (Dict): The command.
+
+        Returns:
+            object: The order record.
+        """
+        return self.checkout.place_order(
+            str(command.get("name", "")),
+            str(command.get("direction", "")),
+            str(command.get("country", "")),
+            str(command.get("email", "")),
+        )
+
+    def _change(self, message: ChangeResult) -> object:
+        """
+        Turns the result of a Manager change into a command result.
+
+        Args:
+            message (ChangeResult): The result returned by Manager.
+
+        Returns:
+            object: {"message"}.
+
+        Raises:
+            ValueError: If the change was not made.
+        """
+        if not message.ok:
+            raise ValueError(message)
+        return {"message": str(message)}
+
+    def _add(self, command: Dict) -> object:
+        """
+        Adds a product to the catalog.
+
+        Args:
+            command (Dict): The command.
+
+        Returns:
+            object: The manager's message.
+        """
+        stock = command.get("stock")
+        return self._change(
+            self.user.add_product(
+                str(command["id"]),
+                str(command["name"]),
+                str(command["category"]),
+                float(command["price"]),
+                None if stock is None else int(stock),
+            )
+        )
+
+    def _edit(self, command: Dict) -> object:
+        """
+        Edits the name, category and price of a product.
+
+        Args:
+            command (Dict): The command.
+
+        Returns:
+            object: The manager's message.
+        """
+        return self._change(
+            self.user.edit_product(
+                str(command["id"]),
+                str(command["name"]),
+                str(command["category"]),
+                float(command["price"]),
+            )
+        )
+
+    def _stock(self, command: Dict) -> object:
+        """
+        Sets the units in stock of a product.
+
+        Args:
+            command (Dict): The command.
+
+        Returns:
+            object: The manager's message.
+        """
+        stock = command["stock"]
+        return self._change(
+            self.user.set_stock(str(command["id"]), None if stock is None else int(stock))
+        )
+
+    def _remove(self, command: Dict) -> object:
+        """
+        Removes a product from the catalog.
+
+        Args:
+            command (Dict): The command.
+
+        Returns:
+            object: The manager's message.
+        """
+        return self._change(self.user.remove_product(str(command["id"])))
+
+    def _stats(self, command: Dict) -> object:
+        """
+        Returns the metrics recorded so far (see Metrics.snapshot).
+
+        Args:
+            command (Dict): The command.
+
+        Returns:
+            object: The metrics.
+        """
+        return METRICS.snapshot()
+
+    def run_command(self, line: str) -> Dict:
+        """
+        Runs one command.
+
+        Args:
+            line (str): The JSON command.
+
+        Returns:
+            Dict: {"op", "status": "ok", "result"} or {"op", "status": "error", "error"}.
+        """
+        operation = None
+        try:
+            command = json.loads(line)
+            if not isinstance(command, dict):
+                raise ValueError("A command must be a JSON object.")
+            operation = command.get("op")
+            handler = self._operations.get(operation)
+            if handler is None:
+                raise ValueError(f"Unknown operation: {operation}")
+            if operation in MANAGER_OPERATIONS and not isinstance(self.user, Manager):
+                raise ValueError("Permission denied: Client cannot change the catalog.")
+            return {"op": operation, "status": "ok", "result": handler(command)}
+        except (KeyError, TypeError) as e:
+            return {"op": operation, "status": "error", "error": f"Malformed command: {e!r}"}
+        except (ValueError, ArithmeticError) as e:
+            return {"op": operation, "status": "error", "error": str(e)}
+        except Exception as e:
+            # Any other failure (a journal write, an odd payload) is this command's
+            # error too; letting it out would roll back and stop the whole chunk.
+            return {"op": operation, "status": "error", "error": f"{type(e).__name__}: {e}"}
+
+    def run(self, lines: Iterable[str], output: TextIO) -> Dict:
+        """
+        Runs a stream of commands and writes one result line per command to output.
+
+        Blank lines are skipped but still counted, so result line numbers match the
+        input.
+
+        Args:
+            lines (Iterable[str]): The JSON commands.
+            output (TextIO): The stream the results are written to.
+
+        Returns:
+            Dict: The statistics: commands, ok, error and elapsed_seconds.
+        """
+        stats = {"commands": 0, "ok": 0, "error": 0}
+        numbered = ((number, line) for number, line in enumerate(lines, 1) if line.strip())
+        batch = self.user.batch if isinstance(self.user, Manager) else nullcontext
+        start = time.perf_counter()
+        while True:
+            chunk = list(islice(numbered, CHUNK_SIZE))
+            if not chunk:
+                break
+            results: List[str] = []
+            with batch():
+                for number, line in chunk:
+                    result = {"line": number}
+                    result.update(self.run_command(line))
+                    stats["commands"] += 1
+                    stats[result["status"]] += 1
+                    results.append(json.dumps(result, separators=(",", ":")) + "\n")
+            output.write("".join(results))
+        output.flush()
+        stats["elapsed_seconds"] = time.perf_counter() - start
+        return stats
+
+
+def run_commands(
+    product_repo, role: str, input_path: str, output: TextIO, checkout: Checkout
+) -> Dict:
+    """Runs the commands of a file, or of standard input, as a client or a manager.
+
+    Args:
+        product_repo (ProductRepository): The repository the commands run against.
+        role (str): "client" or "manager".
+        input_path (str): The commands file, or "-" for standard input.
+        output (TextIO): The stream the results are written to.
+        checkout (Checkout): The checkout of the cart the commands use.
+
+    Returns:
+        Dict: The statistics returned by CommandRunner.run.
+    """
+    user = Manager(product_repo) if role == "manager" else Client(product_repo)
+    runner = CommandRunner(product_repo, user, checkout.cart, checkout)
+    try:
+        if input_path == "-":
+            return runner.run(sys.stdin, output)
+        with open(input_path, encoding="utf-8") as commands:
+            return runner.run(commands, output)
+    finally:
+        if isinstance(user, Manager):
+            user.close()
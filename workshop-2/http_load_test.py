@@ -0,0 +1,342 @@
+"""
+This module contains the LoadTest class which drives a running
+ShopServer with many concurrent keep-alive connections from one
+asyncio event loop and reports the throughput and latencies observed.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+# The default share of each kind of request, as relative weights.
+DEFAULT_MIX = {
+    "list": 4,
+    "category": 3,
+    "search": 2,
+    "product": 4,
+    "add": 4,
+    "cart": 2,
+    "checkout": 1,
+}
+
+
+def parse_mix(text: str, kinds: Iterable[str] = DEFAULT_MIX) -> Dict[str, int]:
+    """Parses a request mix written as comma-separated name=weight pairs.
+
+    Args:
+        text (str): The mix, for example "list=4,add=2,checkout=1".
+        kinds (Iterable[str]): The known kinds of request. Defaults to those of
+            DEFAULT_MIX.
+
+    Returns:
+        Dict[str, int]: The weight of each kind of request.
+
+    Raises:
+        ValueError: If a kind is unknown or a weight is not a positive whole number.
+    """
+    kinds = set(kinds)
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in kinds:
+            raise ValueError(f"Unknown request kind: {name}")
+        mix[name] = int(weight)
+        if mix[name] < 1:
+            raise ValueError(f"The weight of {name} must be at least 1")
+    return mix
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Returns a percentile of sorted values, by the nearest-rank method.
+
+    Args:
+        sorted_values (List[float]): The values, in increasing order.
+        fraction (float): The percentile, between 0 and 1.
+
+    Returns:
+        float: The value at that rank, or 0.0 if there are no values.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(int(len(sorted_values) * fraction + 0.999999) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class LoadTest:
+    """
+    Runs concurrent keep-alive connections against a ShopServer.
+
+    Each connection is one simulated shopper with its own session: it sends
+    requests one after another, each drawn from the request mix, and times
+    every response. Product IDs, categories and search words are sampled from
+    the catalog, which is read through the API before the test starts.
+
+    Attributes:
+        host (str): The server address.
+        port (int): The server port.
+        connections (int): The number of concurrent connections.
+        requests_per_connection (int): The number of requests each connection sends.
+        mix (Dict[str, int]): The weight of each kind of request.
+
+    Methods:
+        run: Runs the test and returns the report.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        connections: int = 100,
+        requests_per_connection: int = 100,
+        mix: Optional[Dict[str, int]] = None,
+        seed: int = 0,
+    ):
+        """
+        Initializes the LoadTest.
+
+        Args:
+            host (str): The server address.
+            port (int): The server port.
+            connections (int): The number of concurrent connections.
+            requests_per_connection (int): The number of requests each connection sends.
+            mix (Optional[Dict[str, int]]): The weight of each kind of request.
+                Defaults to DEFAULT_MIX.
+            seed (int): The seed of the random choices, so runs can be repeated.
+        """
+        self.host = host
+        self.port = port
+        self.connections = connections
+        self.requests_per_connection = requests_per_connection
+        self.mix = mix or dict(DEFAULT_MIX)
+        self._random = random.Random(seed)
+        self._product_ids: List[str] = []
+        self._categories: List[str] = []
+        self._words: List[str] = []
+        self._latencies: List[float] = []
+        self._statuses: Counter = Counter()
+        self._kinds: Counter = Counter()
+        self._failed_connections = 0
+
+    @staticmethod
+    async def _request(
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        method: str,
+        path: str,
+        session_id: str,
+        payload: Optional[Dict] = None,
+    ) -> Tuple[int, bytes]:
+        """
+        Sends one request on a keep-alive connection and reads the response.
+
+        Args:
+            reader (asyncio.StreamReader): The incoming stream.
+            writer (asyncio.StreamWriter): The outgoing stream.
+            method (str): The request method.
+            path (str): The request target.
+            session_id (str): The session ID sent in X-Session-Id.
+            payload (Optional[Dict]): The JSON body, if any.
+
+        Returns:
+            Tuple[int, bytes]: The status code and the response body.
+        """
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        writer.write(
+            (
+                f"{method} {path} HTTP/1.1\r\nHost: load-test\r\nX-Session-Id: {session_id}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+            ).encode("latin-1")
+            + body
+        )
+        await writer.drain()
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        length = 0
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        return status, await reader.readexactly(length)
+
+    async def _discover(self):
+        """
+        Reads product IDs, categories and name words from the server.
+
+        Returns:
+            None
+        """
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            session_id = uuid.uuid4().hex
+            _, body = await self._request(
+                reader, writer, "GET", "/products?limit=1000", session_id
+            )
+            for product in json.loads(body)["products"]:
+                self._product_ids.append(product["id"])
+                self._words.extend(product["name"].split()[:1])
+            _, body = await self._request(reader, writer, "GET", "/categories", session_id)
+            self._categories = list(json.loads(body)["categories"])
+        finally:
+            writer.close()
+            await writer.wait_closed()
+        if not self._product_ids:
+            raise RuntimeError("The server has no products to test with.")
+
+    def _next_request(self, kind: str) -> Tuple[str, str, Optional[Dict]]:
+        """
+        Builds a request of a given kind.
+
+        Args:
+            kind (str): The kind of request, one of the keys of DEFAULT_MIX.
+
+        Returns:
+            Tuple[str, str, Optional[Dict]]: The method, target and JSON body.
+        """
+        choice = self._random.choice
+        if kind == "list":
+            return "GET", "/products?limit=20", None
+        if kind == "category":
+            return "GET", f"/products?limit=20&category={quote(choice(self._categories))}", None
+        if kind == "search":
+            return "GET", f"/products/search?limit=20&q={quote(choice(self._words))}", None
+        if kind == "product":
+            return "GET", f"/products/{quote(choice(self._product_ids))}", None
+        if kind == "add":
+            return "POST", "/cart/items", {"id": choice(self._product_ids), "quantity": 1}
+        if kind == "cart":
+            return "GET", "/cart", None
+        return "POST", "/checkout", {"name": "Load Test", "email": "load@test.invalid"}
+
+    async def _shopper(self, kinds: List[str], weights: List[int]):
+        """
+        Runs the requests of one connection.
+
+        Args:
+            kinds (List[str]): The kinds of request.
+            weights (List[int]): The weight of each kind.
+
+        Returns:
+            None
+        """
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        except OSError:
+            self._failed_connections += 1
+            return
+        session_id = uuid.uuid4().hex
+        try:
+            for kind in self._random.choices(kinds, weights, k=self.requests_per_connection):
+                method, path, payload = self._next_request(kind)
+                start = time.perf_counter()
+                status, _ = await self._request(reader, writer, method, path, session_id, payload)
+                self._latencies.append(time.perf_counter() - start)
+                self._statuses[status] += 1
+                self._kinds[kind] += 1
+        except (OSError, asyncio.IncompleteReadError):
+            self._failed_connections += 1
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def run(self) -> Dict:
+        """
+        Runs the test.
+
+        Returns:
+            Dict: The report: requests, status counts, requests per kind, failed
+                connections, elapsed seconds, requests per second and latency
+                percentiles in milliseconds.
+        """
+        await self._discover()
+        kinds = list(self.mix)
+        weights = [self.mix[kind] for kind in kinds]
+        start = time.perf_counter()
+        await asyncio.gather(*(self._shopper(kinds, weights) for _ in range(self.connections)))
+        elapsed = time.perf_counter() - start
+        latencies = sorted(self._latencies)
+        return {
+            "connections": self.connections,
+            "requests": len(latencies),
+            "statuses": {str(status): count for status, count in sorted(self._statuses.items())},
+            "kinds": dict(self._kinds),
+            "failed_connections": self._failed_connections,
+            "elapsed_seconds": elapsed,
+            "requests_per_second": len(latencies) / elapsed if elapsed else 0.0,
+            "latency_ms": {
+                name: percentile(latencies, fraction) * 1000
+                for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))
+            },
+        }
+
+
+def main(argv: Optional[List[str]] = None):
+    """Runs a load test against a ShopServer from the command line.
+
+    Args:
+        argv (Optional[List[str]]): The command-line arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Load-test a running shop server.")
+    parser.add_argument("--host", default="127.0.0.1", help="the server address")
+    parser.add_argument("--port", type=int, default=8080, help="the server port")
+    parser.add_argument(
+        "--connections", type=int, default=100, help="the number of concurrent connections"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=100, help="the number of requests per connection"
+    )
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=None,
+        help="the request mix as kind=weight pairs, from list, category, search, "
+        "product, add, cart and checkout (default: "
+        + ",".join(f"{kind}={weight}" for kind, weight in DEFAULT_MIX.items())
+        + ")",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="the random seed")
+    parser.add_argument("--output", help="write the report to this JSON file")
+    options = parser.parse_args(argv)
+
+    test = LoadTest(
+        options.host, options.port, options.connections, options.requests, options.mix, options.seed
+    )
+    report = json.dumps(asyncio.run(test.run()), indent=2)
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as output:
+            output.write(report + "\n")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
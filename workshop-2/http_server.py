@@ -0,0 +1,890 @@
+"""
+This module contains the ShopServer class which serves the catalog,
+per-session shopping carts, checkout and manager edits as an HTTP/JSON
+API from a single asyncio event loop.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import asyncio
+import hmac
+import json
+import os
+import re
+import signal
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.cookies import CookieError, SimpleCookie
+from typing import Callable, Dict, List, Optional, Pattern, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+from cart_store import CartStore
+from checkout import Checkout
+from client import Client
+from manager import Manager
+from metrics import METRICS
+from order_ledger import OrderLedger
+
+# Requests whose header block is larger than this are refused, in bytes.
+MAX_HEADER_BYTES = 64 * 1024
+# Requests whose body is larger than this are refused, in bytes.
+MAX_BODY_BYTES = 1024 * 1024
+# The name of the cookie that carries the session ID.
+SESSION_COOKIE = "session"
+
+Response = Tuple[int, object]
+
+
+class Request:
+    """
+    One parsed HTTP request.
+
+    Attributes:
+        method (str): The request method, in upper case.
+        path (str): The decoded path, without the query string.
+        query (Dict[str, str]): The query parameters; the last value of a repeated one wins.
+        headers (Dict[str, str]): The headers, with lower-case names.
+        body (bytes): The request body.
+        params (Tuple[str, ...]): The values captured from the path by the route.
+        session_id (Optional[str]): The session ID sent by the client, if any.
+        new_session (bool): Whether the server assigned the session ID.
+    """
+
+    __slots__ = (
+        "method",
+        "path",
+        "query",
+        "headers",
+        "body",
+        "params",
+        "session_id",
+        "new_session",
+    )
+
+    def __init__(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        """
+        Initializes the Request from its parts.
+
+        Args:
+            method (str): The request method.
+            target (str): The request target, with its query string.
+            headers (Dict[str, str]): The headers, with lower-case names.
+            body (bytes): The request body.
+        """
+        parts = urlsplit(target)
+        self.method = method.upper()
+        self.path = unquote(parts.path)
+        self.query = dict(parse_qsl(parts.query))
+        self.headers = headers
+        self.body = body
+        self.params: Tuple[str, ...] = ()
+        self.session_id = headers.get("x-session-id") or self._cookie_session(headers)
+        self.new_session = False
+
+    @staticmethod
+    def _cookie_session(headers: Dict[str, str]) -> Optional[str]:
+        """
+        Returns the session ID carried by the Cookie header.
+
+        Args:
+            headers (Dict[str, str]): The headers, with lower-case names.
+
+        Returns:
+            Optional[str]: The session ID, or None if there is no session cookie.
+        """
+        cookie = headers.get("cookie")
+        if not cookie:
+            return None
+        try:
+            morsel = SimpleCookie(cookie).get(SESSION_COOKIE)
+        except CookieError:
+            return None
+        return morsel.value if morsel is not None else None
+
+    def json(self) -> Dict:
+        """
+        Parses the body as a JSON object.
+
+        Returns:
+            Dict: The parsed object; an empty body gives an empty object.
+
+        Raises:
+            ValueError: If the body is not a JSON object.
+        """
+        if not self.body:
+            return {}
+        data = json.loads(self.body)
+        if not isinstance(data, dict):
+            raise ValueError("The request body must be a JSON object.")
+        return data
+
+
+class ShopServer:
+    """
+    HTTP/JSON front end for the catalog, carts, checkout and manager edits.
+
+    Every connection is served by one coroutine on a single event loop, so
+    thousands of idle or keep-alive clients cost only their buffers. Requests
+    are parsed by hand from the stream (HTTP/1.1 with Content-Length bodies),
+    and one connection may send any number of requests, which are answered in
+    order. Catalog reads go through Client, edits through Manager and orders
+    through Checkout. Handlers can block on the disk (journal writes and
+    compactions, stock journaling, cart spills), so they run on a single
+    worker thread rather than on the event loop, which keeps accepting,
+    reading and answering connections meanwhile. Since they run one at a
+    time, they see the repository as a single-threaded program would.
+
+    Each client is identified by a session ID, taken from the X-Session-Id
+    header or the session cookie, or assigned by the server (and returned
+    with Set-Cookie) on the first cart request. Carts are kept in a
+    CartStore, so idle carts are spilled to disk.
+
+    Manager endpoints require an "Authorization: Bearer <token>" header
+    matching manager_token; without a token they are disabled.
+
+    Endpoints (all bodies and responses are JSON):
+
+        GET    /products                ?limit=&cursor=&category=
+        GET    /products/search         ?q=&limit=
+        GET    /products/<id>
+        GET    /categories
+        GET    /cart
+        POST   /cart/items              {"id", "quantity"}
+        PUT    /cart/items/<id>         {"quantity"}
+        DELETE /cart/items/<id>
+        DELETE /cart
+        POST   /checkout                {"name", "direction", "country", "email"}
+        POST   /products                {"id", "name", "category", "price", "stock"}
+        PUT    /products/<id>           {"name", "category", "price"}
+        PUT    /products/<id>/stock     {"stock"}
+        DELETE /products/<id>
+        GET    /stats
+
+    Attributes:
+        product_repo (ProductRepository): The repository products are read from.
+        cart_store (CartStore): The carts of every session.
+        ledger (Optional[OrderLedger]): The ledger that records placed orders.
+        manager_token (Optional[str]): The token of manager requests, or None to
+            disable manager endpoints.
+        page_size (int): The default number of products per listing page.
+        idle_timeout (float): Seconds a keep-alive connection may stay idle.
+
+    Methods:
+        start: Starts listening for connections.
+        handle_connection: Serves the requests of one connection.
+        dispatch: Routes one request to its handler.
+        stats: Returns the server counters.
+        close: Saves outstanding changes and spills every cart to disk.
+    """
+
+    def __init__(
+        self,
+        product_repo,
+        cart_store: CartStore,
+        ledger: Optional[OrderLedger] = None,
+        manager_token: Optional[str] = None,
+        page_size: int = 20,
+        idle_timeout: float = 30.0,
+    ):
+        """
+        Initializes the ShopServer.
+
+        Args:
+            product_repo (ProductRepository): The repository products are read from.
+            cart_store (CartStore): The carts of every session.
+            ledger (Optional[OrderLedger]): The ledger that records placed orders.
+            manager_token (Optional[str]): The token of manager requests, or None to
+                disable manager endpoints.
+            page_size (int): The default number of products per listing page.
+            idle_timeout (float): Seconds a keep-alive connection may stay idle.
+        """
+        self.product_repo = product_repo
+        self.cart_store = cart_store
+        self.ledger = ledger
+        self.manager_token = manager_token
+        self.page_size = max(page_size, 1)
+        self.idle_timeout = idle_timeout
+        self.client = Client(product_repo)
+        self.manager = Manager(product_repo)
+        # The one thread handlers run on, so they never block the event loop.
+        self._handler_thread = ThreadPoolExecutor(1, thread_name_prefix="shop-handler")
+        self.connections = 0
+        self.open_connections = 0
+        self.requests = 0
+        self.errors = 0
+        self._routes: List[Tuple[str, Pattern, Callable[[Request], Response]]] = [
+            ("GET", re.compile(r"/products"), self.list_products),
+            ("GET", re.compile(r"/products/search"), self.search_products),
+            ("GET", re.compile(r"/products/([^/]+)"), self.get_product),
+            ("GET", re.compile(r"/categories"), self.list_categories),
+            ("GET", re.compile(r"/cart"), self.get_cart),
+            ("POST", re.compile(r"/cart/items"), self.add_to_cart),
+            ("PUT", re.compile(r"/cart/items/([^/]+)"), self.set_cart_quantity),
+            ("DELETE", re.compile(r"/cart/items/([^/]+)"), self.remove_from_cart),
+            ("DELETE", re.compile(r"/cart"), self.clear_cart),
+            ("POST", re.compile(r"/checkout"), self.checkout),
+            ("POST", re.compile(r"/products"), self.add_product),
+            ("PUT", re.compile(r"/products/([^/]+)"), self.edit_product),
+            ("PUT", re.compile(r"/products/([^/]+)/stock"), self.set_stock),
+            ("DELETE", re.compile(r"/products/([^/]+)"), self.remove_product),
+            ("GET", re.compile(r"/stats"), self.get_stats),
+        ]
+
+    async def start(self, host: str, port: int, backlog: int = 1024) -> asyncio.AbstractServer:
+        """
+        Starts listening for connections on the running event loop.
+
+        Args:
+            host (str): The address to bind.
+            port (int): The port to bind; 0 picks a free one.
+            backlog (int): The number of pending connections the kernel may queue.
+
+        Returns:
+            asyncio.AbstractServer: The listening server.
+        """
+        return await asyncio.start_server(
+            self.handle_connection, host, port, limit=MAX_HEADER_BYTES, backlog=backlog
+        )
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        """
+        Serves the requests of one connection until it is closed or goes idle.
+
+        Args:
+            reader (asyncio.StreamReader): The incoming stream.
+            writer (asyncio.StreamWriter): The outgoing stream.
+
+        Returns:
+            None
+        """
+        self.connections += 1
+        self.open_connections += 1
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(
+                        reader.readuntil(b"\r\n\r\n"), self.idle_timeout
+                    )
+                except asyncio.LimitOverrunError:
+                    status = HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE
+                    await self._send(writer, status, None, False)
+                    return
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                try:
+                    method, target, version, headers = self._parse_head(head)
+                except ValueError:
+                    await self._send(writer, HTTPStatus.BAD_REQUEST, None, False)
+                    return
+                if "transfer-encoding" in headers:
+                    await self._send(writer, HTTPStatus.NOT_IMPLEMENTED, None, False)
+                    return
+                try:
+                    length = int(headers.get("content-length", "0"))
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= MAX_BODY_BYTES:
+                    await self._send(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, None, False)
+                    return
+                try:
+                    body = await reader.readexactly(length) if length else b""
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                connection = headers.get("connection", "").lower()
+                if version == "HTTP/1.1":
+                    keep_alive = connection != "close"
+                else:
+                    keep_alive = connection == "keep-alive"
+                request = Request(method, target, headers, body)
+                status, payload = await asyncio.get_running_loop().run_in_executor(
+                    self._handler_thread, self.dispatch, request
+                )
+                await self._send(writer, status, payload, keep_alive, request)
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            self.open_connections -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    def _parse_head(head: bytes) -> Tuple[str, str, str, Dict[str, str]]:
+        """
+        Parses the request line and headers of a request.
+
+        Args:
+            head (bytes): Everything up to and including the blank line.
+
+        Returns:
+            Tuple[str, str, str, Dict[str, str]]: The method, target, HTTP version and
+                headers (with lower-case names).
+
+        Raises:
+            ValueError: If the request line or a header is malformed.
+        """
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, version = lines[0].split(" ")
+        if not version.startswith("HTTP/1."):
+            raise ValueError(f"Unsupported version: {version}")
+        headers = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+        return method, target, version, headers
+
+    async def _send(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        payload: object,
+        keep_alive: bool,
+        request: Optional[Request] = None,
+    ):
+        """
+        Writes one JSON response.
+
+        Args:
+            writer (asyncio.StreamWriter): The outgoing stream.
+            status (int): The HTTP status code.
+            payload (object): The response body, serialized as JSON; None sends the
+                status phrase as an error message.
+            keep_alive (bool): Whether the connection stays open.
+            request (Optional[Request]): The request answered, if it could be parsed.
+
+        Returns:
+            None
+        """
+        phrase = HTTPStatus(status).phrase
+        if payload is None:
+            payload = {"error": phrase}
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        head = [
+            f"HTTP/1.1 {int(status)} {phrase}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+        ]
+        if request is not None and request.new_session:
+            head.append(f"Set-Cookie: {SESSION_COOKIE}={request.session_id}; Path=/; HttpOnly")
+        if not keep_alive:
+            head.append("Connection: close")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    def dispatch(self, request: Request) -> Response:
+        """
+        Routes one request to its handler and turns errors into responses.
+
+        Connections call it on the handler thread; it may block on the disk.
+
+        Args:
+            request (Request): The request.
+
+        Returns:
+            Response: The status code and the JSON payload.
+        """
+        self.requests += 1
+        allowed = False
+        for method, pattern, handler in self._routes:
+            match = pattern.fullmatch(request.path)
+            if match is None:
+                continue
+            if method != request.method:
+                allowed = True
+                continue
+            request.params = match.groups()
+            try:
+                status, payload = handler(request)
+            except (ValueError, KeyError, TypeError) as e:
+                status, payload = HTTPStatus.BAD_REQUEST, {"error": str(e)}
+            except Exception as e:
+                print(f"Error handling {request.method} {request.path}: {e!r}")
+                status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal error"}
+            if status >= 400:
+                self.errors += 1
+            return status, payload
+        self.errors += 1
+        if allowed:
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Method not allowed"}
+        return HTTPStatus.NOT_FOUND, {"error": f"No such endpoint: {request.path}"}
+
+    def _session(self, request: Request) -> str:
+        """
+        Returns the session ID of a request, assigning a new one if it has none.
+
+        Args:
+            request (Request): The request.
+
+        Returns:
+            str: The session ID.
+        """
+        if not request.session_id:
+            request.session_id = uuid.uuid4().hex
+            request.new_session = True
+        return request.session_id
+
+    def _authorize(self, request: Request) -> Optional[Response]:
+        """
+        Checks the manager token of a request.
+
+        Args:
+            request (Request): The request.
+
+        Returns:
+            Optional[Response]: An error response, or None if the request may proceed.
+        """
+        if self.manager_token is None:
+            return HTTPStatus.FORBIDDEN, {"error": "Manager endpoints are disabled."}
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(
+            token.encode("utf-8"), self.manager_token.encode("utf-8")
+        ):
+            return HTTPStatus.UNAUTHORIZED, {"error": "A valid manager token is required."}
+        return None
+
+    def _limit(self, request: Request) -> int:
+        """
+        Returns the page size asked for by a request.
+
+        Args:
+            request (Request): The request.
+
+        Returns:
+            int: The limit query parameter, or the default page size.
+
+        Raises:
+            ValueError: If the limit is not a positive whole number.
+        """
+        limit = request.query.get("limit")
+        if limit is None:
+            return self.page_size
+        try:
+            value = int(limit)
+        except ValueError:
+            value = 0
+        if value < 1:
+            raise ValueError(f"limit must be a positive integer, not {limit!r}")
+        return value
+
+    def list_products(self, request: Request) -> Response:
+        """
+        Returns one page of the catalog, or of one category.
+
+        Args:
+            request (Request): The request, with optional limit, cursor and category.
+
+        Returns:
+            Response: {"products", "next_cursor"}.
+        """
+        category = request.query.get("category")
+        cursor = request.query.get("cursor")
+        if category is None:
+            products, next_cursor = self.product_repo.list_products_page(
+                self._limit(request), cursor
+            )
+        else:
+            products, next_cursor = self.product_repo.list_products_by_category_page(
+                category, self._limit(request), cursor
+            )
+        return HTTPStatus.OK, {
+            "products": [product.to_dict() for product in products],
+            "next_cursor": next_cursor,
+        }
+
+    def search_products(self, request: Request) -> Response:
+        """
+        Returns the products whose name matches a query.
+
+        Args:
+            request (Request): The request, with q and an optional limit.
+
+        Returns:
+            Response: {"products"}.
+        """
+        products = self.client.search_products(request.query.get("q", ""), self._limit(request))
+        return HTTPStatus.OK, {"products": [product.to_dict() for product in products]}
+
+    def get_product(self, request: Request) -> Response:
+        """
+        Returns one product.
+
+        Args:
+            request (Request): The request, with the product ID in the path.
+
+        Returns:
+            Response: The product, or 404.
+        """
+        product = self.product_repo.get_by_id(request.params[0])
+        if product is None:
+            error = f"No product found with ID: {request.params[0]}"
+            return HTTPStatus.NOT_FOUND, {"error": error}
+        return HTTPStatus.OK, product.to_dict()
+
+    def list_categories(self, request: Request) -> Response:
+        """
+        Returns the categories with the number of products in each.
+
+        Args:
+            request (Request): The request.
+
+        Returns:
+            Response: {"categories": {name: count}}.
+        """
+        return HTTPStatus.OK, {"categories": self.product_repo.list_categories()}
+
+    def get_cart(self, request: Request) -> Response:
+        """
+        Returns the cart of the session.
+
+        Args:
+            request (Request): The request.
+
+        Returns:
+            Response: The cart.
+        """
+        return HTTPStatus.OK, self.cart_store.load(self._session(request)).to_dict()
+
+    def add_to_cart(self, request: Request) -> Response:
+        """
+        Adds units of a product to the cart of the session.
+
+        Args:
+            request (Request): The request, with {"id", "quantity"}.
+
+        Returns:
+            Response: The updated cart, or 404 if the product does not exist.
+        """
+        data = request.json()
+        product_id = str(data["id"])
+        product = self.product_repo.get_by_id(product_id)
+        if product is None:
+            return HTTPStatus.NOT_FOUND, {"error": f"No product found with ID: {product_id}"}
+        with self.cart_store.session(self._session(request)) as cart:
+            cart.verbose = False
+            cart.add_product(product, int(data.get("quantity", 1)))
+        return HTTPStatus.OK, cart.to_dict()
+
+    def set_cart_quantity(self, request: Request) -> Response:
+        """
+        Changes the quantity of a product in the cart of the session.
+
+        Args:
+            request (Request): The request, with the product ID in the path and
+                {"quantity"}; 0 removes the product.
+
+        Returns:
+            Response: The updated cart, or 404 if the product is not in the cart.
+        """
+        quantity = int(request.json()["quantity"])
+        with self.cart_store.session(self._session(request)) as cart:
+            found = cart.set_quantity(request.params[0], quantity)
+        if not found:
+            error = f"Product {request.params[0]} is not in the cart."
+            return HTTPStatus.NOT_FOUND, {"error": error}
+        return HTTPStatus.OK, cart.to_dict()
+
+    def remove_from_cart(self, request: Request) -> Response:
+        """
+        Removes a product from the cart of the session.
+
+        Args:
+            request (Request): The request, with the product ID in the path.
+
+        Returns:
+            Response: The updated cart, or 404 if the product is not in the cart.
+        """
+        with self.cart_store.session(self._session(request)) as cart:
+            removed = cart.remove_product(request.params[0])
+        if removed is None:
+            error = f"Product {request.params[0]} is not in the cart."
+            return HTTPStatus.NOT_FOUND, {"error": error}
+        return HTTPStatus.OK, cart.to_dict()
+
+    def clear_cart(self, request: Request) -> Response:
+        """
+        Empties the cart of the session.
+
+        Args:
+            request (Request): The request.
+
+        Returns:
+            Response: The empty cart.
+        """
+        self.cart_store.delete(self._session(request))
+        return HTTPStatus.OK, {"items": [], "total": 0.0, "total_cents": 0}
+
+    def checkout(self, request: Request) -> Response:
+        """
+        Places an order for the cart of the session and empties the cart.
+
+        The cart is kept if the order is refused.
+
+        Args:
+            request (Request): The request, with the customer details.
+
+        Returns:
+            Response: The order record (201), 400 for an empty cart, or 409 if a
+                product is out of stock.
+        """
+        data = request.json()
+        session_id = self._session(request)
+        cart = self.cart_store.load(session_id)
+        if not cart.cart_items:
+            return HTTPStatus.BAD_REQUEST, {"error": "Your cart is empty!"}
+        try:
+            order = Checkout(cart, self.ledger, self.product_repo).place_order(
+                str(data["name"]),
+                str(data.get("direction", "")),
+                str(data.get("country", "")),
+                str(data.get("email", "")),
+            )
+        except ValueError as e:
+            return HTTPStatus.CONFLICT, {"error": str(e)}
+        self.cart_store.save(session_id, cart)
+        return HTTPStatus.CREATED, order
+
+    def add_product(self, request: Request) -> Response:
+        """
+        Adds a product to the catalog. Manager only.
+
+        Args:
+            request (Request): The request, with {"id", "name", "category", "price"}
+                and an optional "stock".
+
+        Returns:
+            Response: The new product (201), or 409 if the ID is in use.
+        """
+        denied = self._authorize(request)
+        if denied:
+            return denied
+        data = request.json()
+        product_id = str(data["id"])
+        if self.product_repo.get_by_id(product_id) is not None:
+            return HTTPStatus.CONFLICT, {"error": f"Product with ID {product_id} already exists."}
+        stock = data.get("stock")
+        message = self.manager.add_product(
+            product_id,
+            str(data["name"]),
+            str(data["category"]),
+            float(data["price"]),
+            None if stock is None else int(stock),
+        )
+        product = self.product_repo.get_by_id(product_id).to_dict()
+        return HTTPStatus.CREATED, dict(product, message=message)
+
+    def edit_product(self, request: Request) -> Response:
+        """
+        Edits the name, category and price of a product. Manager only.
+
+        Args:
+            request (Request): The request, with the product ID in the path and
+                {"name", "category", "price"}.
+
+        Returns:
+            Response: The updated product, or 404.
+        """
+        denied = self._authorize(request)
+        if denied:
+            return denied
+        product_id = request.params[0]
+        if self.product_repo.get_by_id(product_id) is None:
+            return HTTPStatus.NOT_FOUND, {"error": f"Product with ID {product_id} not found."}
+        data = request.json()
+        message = self.manager.edit_product(
+            product_id, str(data["name"]), str(data["category"]), float(data["price"])
+        )
+        product = self.product_repo.get_by_id(product_id).to_dict()
+        return HTTPStatus.OK, dict(product, message=message)
+
+    def set_stock(self, request: Request) -> Response:
+        """
+        Sets the units in stock of a product. Manager only.
+
+        Args:
+            request (Request): The request, with the product ID in the path and
+                {"stock"}; a null stock stops tracking it.
+
+        Returns:
+            Response: The updated product, or 404.
+        """
+        denied = self._authorize(request)
+        if denied:
+            return denied
+        product_id = request.params[0]
+        if self.product_repo.get_by_id(product_id) is None:
+            return HTTPStatus.NOT_FOUND, {"error": f"Product with ID {product_id} not found."}
+        stock = request.json()["stock"]
+        message = self.manager.set_stock(product_id, None if stock is None else int(stock))
+        product = self.product_repo.get_by_id(product_id).to_dict()
+        return HTTPStatus.OK, dict(product, message=message)
+
+    def remove_product(self, request: Request) -> Response:
+        """
+        Removes a product from the catalog. Manager only.
+
+        Args:
+            request (Request): The request, with the product ID in the path.
+
+        Returns:
+            Response: A confirmation message, or 404.
+        """
+        denied = self._authorize(request)
+        if denied:
+            return denied
+        product_id = request.params[0]
+        if self.product_repo.get_by_id(product_id) is None:
+            return HTTPStatus.NOT_FOUND, {"error": f"Product with ID {product_id} not found."}
+        return HTTPStatus.OK, {"message": self.manager.remove_product(product_id)}
+
+    def get_stats(self, request: Request) -> Response:
+        """
+        Returns the server counters.
+
+        Args:
+            request (Request): The request.
+
+        Returns:
+            Response: The counters returned by stats.
+        """
+        return HTTPStatus.OK, self.stats()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Returns the counters of the server, the cart store and the ledger, and the
+        operation metrics when they are enabled.
+
+        Returns:
+            Dict[str, Dict[str, int]]: The counters, grouped by component.
+        """
+        stats = {
+            "server": {
+                "connections": self.connections,
+                "open_connections": self.open_connections,
+                "requests": self.requests,
+                "errors": self.errors,
+            },
+            "carts": self.cart_store.stats(),
+        }
+        if self.ledger is not None:
+            stats["ledger"] = self.ledger.stats()
+        if METRICS.enabled:
+            stats["metrics"] = METRICS.snapshot()
+        return stats
+
+    def close(self):
+        """
+        Waits for running handlers, saves outstanding catalog changes and spills
+        every cart to disk.
+
+        Returns:
+            None
+        """
+        self._handler_thread.shutdown()
+        self.manager.close()
+        self.cart_store.close()
+
+
+async def serve(server: ShopServer, host: str, port: int, backlog: int):
+    """Runs a ShopServer until the process receives SIGTERM or the task is cancelled.
+
+    Args:
+        server (ShopServer): The server to run.
+        host (str): The address to bind.
+        port (int): The port to bind.
+        backlog (int): The number of pending connections the kernel may queue.
+
+    Returns:
+        None
+    """
+    loop = asyncio.get_running_loop()
+    stopped = loop.create_future()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, stopped.set_result, None)
+    except (NotImplementedError, AttributeError):
+        # Signal handlers are not available on every platform (e.g. Windows).
+        pass
+    listener = await server.start(host, port, backlog)
+    addresses = ", ".join(str(sock.getsockname()) for sock in listener.sockets)
+    print(f"Serving on {addresses}")
+    async with listener:
+        await stopped
+
+
+def main(argv: Optional[List[str]] = None):
+    """Serves the shop over HTTP from the command line until interrupted.
+
+    Args:
+        argv (Optional[List[str]]): The command-line arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        None
+    """
+    # Imported here so that importing this module does not pull in the menu.
+    from main import add_storage_arguments, dump_metrics, open_repository
+
+    parser = argparse.ArgumentParser(description="Serve the shop as an HTTP/JSON API.")
+    parser.add_argument("--host", default="127.0.0.1", help="the address to bind")
+    parser.add_argument("--port", type=int, default=8080, help="the port to bind")
+    parser.add_argument(
+        "--backlog", type=int, default=1024, help="the length of the pending-connection queue"
+    )
+    parser.add_argument(
+        "--carts", default="carts", help="the directory idle session carts are spilled to"
+    )
+    parser.add_argument(
+        "--manager-token",
+        default=os.environ.get("MANAGER_TOKEN"),
+        help="the bearer token of manager requests; manager endpoints are disabled "
+        "without one (env: MANAGER_TOKEN)",
+    )
+    parser.add_argument(
+        "--page-size", type=int, default=20, help="the default listing page size"
+    )
+    add_storage_arguments(parser)
+    options = parser.parse_args(argv)
+
+    product_repo = open_repository(options)
+    ledger = OrderLedger(options.ledger)
+    server = ShopServer(
+        product_repo,
+        CartStore(product_repo, options.carts),
+        ledger,
+        options.manager_token,
+        options.page_size,
+    )
+    try:
+        asyncio.run(serve(server, options.host, options.port, options.backlog))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        ledger.close()
+        dump_metrics(options)
+
+
+if __name__ == "__main__":
+    main()
@@ -21,14 +21,225 @@ You should have received a copy of the GNU General Public License
 along with Workshop-1. If not, see <https://www.gnu.org/licenses/>. 
 """
 
+import argparse
+import os
+import sys
+from typing import Callable, List, Optional, Tuple
 from product_repository import ProductRepository
+from sqlite_product_repository import SqliteProductRepository
 from shopping_cart import ShoppingCart
 from checkout import Checkout
+from command_runner import run_commands
 from client import Client
 from manager import Manager
+from metrics import METRICS
+from order_ledger import OrderLedger
+from product import Product
 
+Page = Tuple[List[Product], Optional[str]]
 
-def main():
+
+def add_storage_arguments(parser: argparse.ArgumentParser):
+    """Adds the options that select the product storage to a parser.
+
+    Each option can also be set through an environment variable, which is used as
+    its default value. The parsed options are read by open_repository.
+
+    Args:
+        parser (argparse.ArgumentParser): The parser to extend.
+
+    Returns:
+        None
+    """
+    parser.add_argument(
+        "--backend",
+        choices=["csv", "sqlite"],
+        default=os.environ.get("PRODUCT_BACKEND", "csv"),
+        help="where the catalog is stored (env: PRODUCT_BACKEND, default: csv)",
+    )
+    parser.add_argument(
+        "--csv",
+        default=os.environ.get("PRODUCT_CSV", "products.csv"),
+        help="the products CSV file (env: PRODUCT_CSV, default: products.csv)",
+    )
+    parser.add_argument(
+        "--database",
+        default=os.environ.get("PRODUCT_DATABASE", "products.db"),
+        help="the SQLite database used by the sqlite backend; it is filled from the "
+        "CSV file the first time (env: PRODUCT_DATABASE, default: products.db)",
+    )
+    parser.add_argument(
+        "--ledger",
+        default=os.environ.get("ORDER_LEDGER", "orders"),
+        help="the directory of the ledger that records placed orders "
+        "(env: ORDER_LEDGER, default: orders)",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        default=os.environ.get("SHOP_METRICS", "") not in ("", "0"),
+        help="record call counts, latencies and bytes read and written of the main "
+        "operations (env: SHOP_METRICS)",
+    )
+    parser.add_argument(
+        "--metrics-output",
+        default=os.environ.get("SHOP_METRICS_OUTPUT"),
+        help="write the recorded metrics to this JSON file on exit "
+        "(env: SHOP_METRICS_OUTPUT)",
+    )
+
+
+def parse_arguments(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parses the command-line options that configure the product storage and display.
+
+    Each option can also be set through an environment variable, which is used as
+    its default value.
+
+    Args:
+        argv (Optional[List[str]]): The arguments to parse. Defaults to sys.argv[1:].
+
+    Returns:
+        argparse.Namespace: The parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Console shopping cart application.")
+    add_storage_arguments(parser)
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=int(os.environ.get("PRODUCT_PAGE_SIZE", "20")),
+        help="the number of products shown per page in listings "
+        "(env: PRODUCT_PAGE_SIZE, default: 20)",
+    )
+    parser.add_argument(
+        "--commands",
+        help="run the JSON commands of this file, one per line (or - for standard "
+        "input), instead of the menu; see CommandRunner for the format",
+    )
+    parser.add_argument(
+        "--role",
+        choices=["client", "manager"],
+        default="client",
+        help="the user the commands run as (default: client)",
+    )
+    parser.add_argument(
+        "--output",
+        default="-",
+        help="the file the command results are written to, one JSON line per "
+        "command (default: standard output)",
+    )
+    return parser.parse_args(argv)
+
+
+def open_repository(options: argparse.Namespace):
+    """Opens the product repository selected by the command-line options.
+
+    Args:
+        options (argparse.Namespace): Options parsed by a parser extended with
+            add_storage_arguments.
+
+    Metrics are enabled first when options.metrics is set, so that the load is
+    recorded too.
+
+    Returns:
+        ProductRepository | SqliteProductRepository: The opened repository.
+    """
+    if options.metrics:
+        METRICS.enable()
+    if options.backend == "sqlite":
+        product_repo = SqliteProductRepository(options.database)
+        if product_repo.is_empty():
+            try:
+                product_repo.import_csv(options.csv)
+            except FileNotFoundError:
+                print(f"Error: The file '{options.csv}' was not found.")
+        return product_repo
+    # The products are read from a binary snapshot that is rebuilt whenever the CSV file changes.
+    return ProductRepository(options.csv, use_snapshot=True)
+
+
+def print_pages(page: Page, next_page: Callable[[str], Page]):
+    """Prints a product listing one page at a time.
+
+    Each page is rendered into one string and written with a single call, and the
+    next page is only fetched if the user asks for it, so the first page appears at
+    once however large the listing is.
+
+    Args:
+        page (Page): The first page and the cursor of the next one.
+        next_page (Callable[[str], Page]): Fetches the page that follows a cursor.
+
+    Returns:
+        None
+    """
+    products, cursor = page
+    while True:
+        sys.stdout.write("".join(f"{product}\n" for product in products))
+        sys.stdout.flush()
+        if cursor is None:
+            return
+        if input("Press Enter for more products, or 'q' to stop: ").strip().lower() == "q":
+            return
+        products, cursor = next_page(cursor)
+
+
+def dump_metrics(options: argparse.Namespace):
+    """Writes the recorded metrics to the file given by --metrics-output, if any.
+
+    Args:
+        options (argparse.Namespace): Options parsed by a parser extended with
+            add_storage_arguments.
+
+    Returns:
+        None
+    """
+    if not options.metrics_output:
+        return
+    try:
+        METRICS.dump(options.metrics_output)
+    except OSError as e:
+        print(f"Error writing the metrics: {e}")
+
+
+def show_metrics():
+    """Prints the recorded metrics and optionally writes them to a file.
+
+    If metrics are disabled, offers to enable them instead.
+
+    Returns:
+        None
+    """
+    if not METRICS.enabled:
+        if input("Metrics are disabled. Enable them now? (y/n): ").strip().lower() == "y":
+            METRICS.enable()
+            print("Metrics enabled.")
+        return
+    print(METRICS.report())
+    filename = input("Enter a file to save the metrics to (leave empty to skip): ").strip()
+    if filename:
+        try:
+            METRICS.dump(filename)
+            print(f"Metrics written to {filename}")
+        except OSError as e:
+            print(f"Error writing the metrics: {e}")
+
+
+def profile_operation():
+    """Arms cProfile for the next call of an operation chosen by the user.
+
+    Returns:
+        None
+    """
+    print("Operations: " + ", ".join(METRICS.operation_names()))
+    name = input("Enter the operation to profile: ").strip()
+    filename = input("Enter the profile file (default: profile.pstats): ").strip()
+    try:
+        METRICS.profile_next(name, filename or "profile.pstats")
+        print(f"The next call of {name} will be profiled.")
+    except ValueError as e:
+        print(e)
+
+
+def main(argv: Optional[List[str]] = None):
     """Main function to handle user interaction for a product shopping application.
 
     This method is the entry point for the shopping cart application. It handles
@@ -37,8 +248,8 @@ def main():
     repository, a shopping cart, and a checkout process.
 
     The menu options include:
-    1. Listing all products.
-    2. Listing products by category.
+    1. Listing all products, one page at a time.
+    2. Listing products by category, one page at a time.
     3. Adding a product to the shopping cart.
     4. Viewing the items in the cart.
     5. Proceeding to checkout.
@@ -46,9 +257,19 @@ def main():
     7. Removing a product.
     8. Editing a product.
     9. Quitting the application.
+    10. Searching products by name.
+    11. Setting the stock of a product.
+    12. Showing operation metrics (see --metrics).
+    13. Profiling the next call of an operation with cProfile.
+    14. Removing a product from the cart.
+
+    The catalog is read from products.csv by default; pass --backend sqlite to keep
+    it in an SQLite database instead (see parse_arguments). With --commands, the
+    menu is not shown: the commands of the file run as --role and their results
+    are written to --output (see CommandRunner).
 
     Args:
-        None
+        argv (Optional[List[str]]): The command-line arguments. Defaults to sys.argv[1:].
 
     Returns:
         None: The function runs the menu loop until the user chooses to exit.
@@ -58,120 +279,196 @@ def main():
     """
 
     # Ensure the path to 'products.csv' is correct. It should be in the same directory as the script
-    product_repo = ProductRepository("products.csv")
+    options = parse_arguments(argv)
+    page_size = max(options.page_size, 1)
+    product_repo = open_repository(options)
     cart = ShoppingCart()
-    checkout = Checkout(cart)
-    user_type = ""
+    ledger = OrderLedger(options.ledger)
+    checkout = Checkout(cart, ledger, product_repo)
 
-    while user_type not in ["client", "manager"]:
-        user_type = input("Are you a Client or Manager? ").strip().lower()
-        if user_type not in ["client", "manager"]:
-            print("Invalid user type. Please enter 'Client' or 'Manager'.")
+    if options.commands:
+        # Scripted mode: no prompts, one JSON result per command
+        cart.verbose = False
+        try:
+            if options.output == "-":
+                stats = run_commands(
+                    product_repo, options.role, options.commands, sys.stdout, checkout
+                )
+            else:
+                with open(options.output, "w", encoding="utf-8") as output:
+                    stats = run_commands(
+                        product_repo, options.role, options.commands, output, checkout
+                    )
+        finally:
+            ledger.close()
+            dump_metrics(options)
+        print(
+            f"{stats['commands']} commands ({stats['ok']} ok, {stats['error']} errors) "
+            f"in {stats['elapsed_seconds']:.2f}s",
+            file=sys.stderr,
+        )
+        return
 
-    print(f"You have selected: {user_type.capitalize()}")
+    try:
+        user_type = ""
 
-    user = Client(product_repo) if user_type == "client" else Manager(product_repo)
+        while user_type not in ["client", "manager"]:
+            user_type = input("Are you a Client or Manager? ").strip().lower()
+            if user_type not in ["client", "manager"]:
+                print("Invalid user type. Please enter 'Client' or 'Manager'.")
+
+        print(f"You have selected: {user_type.capitalize()}")
+
+        user = Client(product_repo) if user_type == "client" else Manager(product_repo)
+
+        # Menu loop for user interaction
+        while True:
+            print("\nMenu:")
+            print("1. List all products")
+            print("2. List products by category")
+            print("3. Add product to cart")
+            print("4. View cart")
+            print("5. Checkout")
+            print("6. Add a new product")
+            print("7. Remove a product")
+            print("8. Edit a product")
+            print("9. Quit")
+            print("10. Search products by name")
+            print("11. Set product stock")
+            print("12. Show operation metrics")
+            print("13. Profile an operation")
+            print("14. Remove a product from the cart")
+
+            choice = input("Please select an option: ")
+
+            if choice == "1":
+                # List all available products, one page at a time
+                print("\nList of all products:")
+                print_pages(
+                    product_repo.list_products_page(page_size),
+                    lambda cursor: product_repo.list_products_page(page_size, cursor),
+                )
+
+            elif choice == "2":
+                # List products by specified category
+                category = input("\nEnter category name: ")
+                first_page = product_repo.list_products_by_category_page(category, page_size)
+                if first_page[0]:
+                    print(f"\nList of products in category '{category}':")
+                    print_pages(
+                        first_page,
+                        lambda cursor: product_repo.list_products_by_category_page(
+                            category, page_size, cursor
+                        ),
+                    )
+                else:
+                    print(f"No products found in category '{category}'.")
+
+            elif choice == "3":
+                # Add a product to the cart by ID
+                product_id = input("\nEnter product ID to add to cart: ")
+                product = product_repo.get_by_id(product_id)
+                if product:
+                    cart.add_product(product)
+                else:
+                    print(f"No product found with ID: {product_id}")
+
+            elif choice == "4":
+                # View current items in the cart
+                if cart.list_cart_items():
+                    print("\nItems in your cart:")
+                    for item, quantity in cart.list_cart_lines():
+                        print(f"{item}, Quantity: {quantity}")
+                else:
+                    print("\nYour cart is empty.")
+
+            elif choice == "5":
+                # Proceed to checkout
+                checkout.process_checkout()
+
+            elif choice == "6":
+                product_id = input("Enter product ID: ")
+                name = input("Enter product name: ")
+                category = input("Enter product category: ")
+                price = float(input("Enter product price: "))
+                # Both Client and Manager can call this method
+                message = user.add_product(product_id, name, category, price)
+                if message:  # Only Managers return a message
+                    print(message)
+
+            elif choice == "7":
+                product_id = input("Enter product ID to remove: ")
+                # Both Client and Manager can call this method
+                message = user.remove_product(product_id)
+                if message:  # Only Managers return a message
+                    print(message)
+
+            elif choice == "8":
+                product_id = input("Enter product ID to edit: ")
+                name = input("Enter new product name: ")
+                category = input("Enter new product category: ")
+                price = float(input("Enter new product price: "))
+                # Both Client and Manager can call this method
+                message = user.edit_product(product_id, name, category, price)
+                if message:  # Only Managers return a message
+                    print(message)
+
+            elif choice == "9":
+                # Exit the application
+                if (
+                    input("Are you sure you want to to exit? (y/n): ").strip().lower()
+                    == "y"
+                ):
+                    if isinstance(user, Manager):
+                        # Persist outstanding changes and fold the journal into products.csv
+                        user.close()
+                    dump_metrics(options)
+                    input("Exiting the program. Goodbye!")
+                    break
+
+            elif choice == "10":
+                # Search products by the words of their name
+                query = input("\nEnter words to search for: ")
+                matches = product_repo.search_products(query)
+                if matches:
+                    print(f"\nProducts matching '{query}':")
+                    for product in matches:
+                        print(product)
+                else:
+                    print(f"No products found matching '{query}'.")
+
+            elif choice == "11":
+                product_id = input("Enter product ID: ")
+                stock = input("Enter units in stock (leave empty to stop tracking): ").strip()
+                # Both Client and Manager can call this method
+                try:
+                    message = user.set_stock(product_id, int(stock) if stock else None)
+                except ValueError as e:
+                    message = f"Invalid stock: {e}"
+                if message:  # Only Managers return a message
+                    print(message)
+
+            elif choice == "12":
+                show_metrics()
+
+            elif choice == "13":
+                profile_operation()
+
+            elif choice == "14":
+                # Remove a line from the cart, e.g. a product no longer in the catalog
+                product_id = input("\nEnter product ID to remove from cart: ")
+                removed = cart.remove_product(product_id)
+                if removed:
+                    print(f"Removed '{removed.name}' from your cart.")
+                else:
+                    print(f"Product {product_id} is not in your cart.")
 
-    # Menu loop for user interaction
-    while True:
-        print("\nMenu:")
-        print("1. List all products")
-        print("2. List products by category")
-        print("3. Add product to cart")
-        print("4. View cart")
-        print("5. Checkout")
-        print("6. Add a new product")
-        print("7. Remove a product")
-        print("8. Edit a product")
-        print("9. Quit")
-
-        choice = input("Please select an option: ")
-
-        if choice == "1":
-            # List all available products
-            print("\nList of all products:")
-            for product in product_repo.list_all_products():
-                print(product)
-
-        elif choice == "2":
-            # List products by specified category
-            category = input("\nEnter category name: ")
-            products_by_category = product_repo.list_products_by_category(category)
-            if products_by_category:
-                print(f"\nList of products in category '{category}':")
-                for product in products_by_category:
-                    print(product)
-            else:
-                print(f"No products found in category '{category}'.")
-
-        elif choice == "3":
-            # Add a product to the cart by ID
-            product_id = input("\nEnter product ID to add to cart: ")
-            product = next(
-                (
-                    p
-                    for p in product_repo.list_all_products()
-                    if p.product_id == product_id
-                ),
-                None,
-            )
-            if product:
-                cart.add_product(product)
-            else:
-                print(f"No product found with ID: {product_id}")
-
-        elif choice == "4":
-            # View current items in the cart
-            if cart.list_cart_items():
-                print("\nItems in your cart:")
-                for item in cart.list_cart_items():
-                    print(item)
             else:
-                print("\nYour cart is empty.")
-
-        elif choice == "5":
-            # Proceed to checkout
-            checkout.process_checkout()
-
-        elif choice == "6":
-            product_id = input("Enter product ID: ")
-            name = input("Enter product name: ")
-            category = input("Enter product category: ")
-            price = float(input("Enter product price: "))
-            # Both Client and Manager can call this method
-            message = user.add_product(product_id, name, category, price)
-            if message:  # Only Managers return a message
-                print(message)
-
-        elif choice == "7":
-            product_id = input("Enter product ID to remove: ")
-            # Both Client and Manager can call this method
-            message = user.remove_product(product_id)
-            if message:  # Only Managers return a message
-                print(message)
-
-        elif choice == "8":
-            product_id = input("Enter product ID to edit: ")
-            name = input("Enter new product name: ")
-            category = input("Enter new product category: ")
-            price = float(input("Enter new product price: "))
-            # Both Client and Manager can call this method
-            message = user.edit_product(product_id, name, category, price)
-            if message:  # Only Managers return a message
-                print(message)
-
-        elif choice == "9":
-            # Exit the application
-            if (
-                input("Are you sure you want to to exit? (y/n): ").strip().lower()
-                == "y"
-            ):
-                input("Exiting the program. Goodbye!")
-                break
-
-        else:
-            # Handle invalid menu choices
-            print("Invalid choice. Please try again.")
+                # Handle invalid menu choices
+                print("Invalid choice. Please try again.")
+    finally:
+        # Write the orders still buffered in the ledger, even after EOF or Ctrl-C
+        ledger.close()
 
 
 if __name__ == "__main__":
@@ -22,9 +22,160 @@ along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
 """
 
 import csv
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from abstract_client import AbstractProductManager
-from product_repository import ProductRepository
+from change_journal import add_entry, edit_entry, remove_entry, stock_entry
+from metrics import METRICS
+from product_repository import ProductRepository, read_product_rows
 from product import Product
+from product_table import check_stock
+from write_behind import WriteBehindFlusher
+
+
+# Journal size, in bytes, past which the journal is folded back into the CSV file.
+COMPACT_THRESHOLD = 1024 * 1024
+
+
+class ChangeResult(str):
+    """
+    The message a Manager returns for a change, which also tells whether it was made.
+
+    It is the message itself, so callers that only show it keep working, while
+    callers that must tell failures apart check ok instead of parsing the text.
+
+    Attributes:
+        ok (bool): Whether the change was made.
+    """
+
+    def __new__(cls, message: str, ok: bool) -> "ChangeResult":
+        """
+        Creates the result of a change.
+
+        Args:
+            message (str): The message for the user.
+            ok (bool): Whether the change was made.
+
+        Returns:
+            ChangeResult: The result.
+        """
+        result = super().__new__(cls, message)
+        result.ok = ok
+        return result
+
+
+class CsvRows:
+    """
+    The rows of a products CSV file, keyed by ID, that a journal can be replayed on.
+
+    It implements the part of the repository interface that ChangeJournal.replay
+    uses, with the same rules: adds of existing IDs and changes of missing IDs are
+    ignored.
+
+    Attributes:
+        rows (Dict[str, dict]): The CSV rows, in file order, keyed by product ID.
+    """
+
+    def __init__(self, filename: str):
+        """
+        Reads the rows of a CSV file; a missing file gives no rows.
+
+        Args:
+            filename (str): The path to the CSV file with the product data.
+        """
+        self.rows: Dict[str, dict] = {}
+        try:
+            for product_id, name, category, price, stock in read_product_rows(filename):
+                self._put(product_id, name, category, price, stock)
+        except FileNotFoundError:
+            pass
+
+    def _put(
+        self, product_id: str, name: str, category: str, price: float, stock: Optional[int]
+    ):
+        """
+        Stores one row.
+
+        Args:
+            product_id (str): The product ID.
+            name (str): The product name.
+            category (str): The product category.
+            price (float): The product price.
+            stock (Optional[int]): The units in stock, or None if stock is not tracked.
+
+        Returns:
+            None
+        """
+        self.rows[product_id] = {
+            "id": product_id,
+            "Product": name,
+            "Category": category,
+            "Price": price,
+            "Stock": "" if stock is None else stock,
+        }
+
+    def add_product(self, product: Product) -> bool:
+        """
+        Adds a row for a product, unless its ID is already in use.
+
+        Args:
+            product (Product): The product to add.
+
+        Returns:
+            bool: True if the row was added.
+        """
+        if product.product_id in self.rows:
+            return False
+        self._put(product.product_id, product.name, product.category, product.price, product.stock)
+        return True
+
+    def update_product(self, product_id: str, name: str, category: str, price: float):
+        """
+        Changes the name, category and price of a row, if there is one.
+
+        Args:
+            product_id (str): The product ID.
+            name (str): The new name.
+            category (str): The new category.
+            price (float): The new price.
+
+        Returns:
+            None
+        """
+        row = self.rows.get(product_id)
+        if row is not None:
+            row.update({"Product": name, "Category": category, "Price": price})
+
+    def set_stock(self, product_id: str, stock: Optional[int]):
+        """
+        Changes the stock of a row, if there is one.
+
+        Args:
+            product_id (str): The product ID.
+            stock (Optional[int]): The units in stock, or None to stop tracking stock.
+
+        Returns:
+            None
+        """
+        row = self.rows.get(product_id)
+        if row is not None:
+            row["Stock"] = "" if stock is None else stock
+
+    def remove_product(self, product_id: str):
+        """
+        Removes a row, if there is one.
+
+        Args:
+            product_id (str): The product ID.
+
+        Returns:
+            None
+        """
+        self.rows.pop(product_id, None)
 
 
 class Manager(AbstractProductManager):
@@ -36,75 +187,145 @@ class Manager(AbstractProductManager):
     also have the ability to save changes to the CSV file that stores
     product data.
 
+    By default each change is appended to the repository's change journal
+    instead of rewriting the CSV file. The journal is folded back into the
+    CSV file once it grows past compact_threshold bytes, or when compact is
+    called.
+
+    With a write_behind_interval, changes are not written in the calling
+    thread at all: they only mark the catalog dirty, and a background thread
+    saves the whole CSV file at most once per interval. Call flush to wait for
+    pending changes to reach the disk, and close before exiting.
+
+    The CSV file is always replaced atomically, so a crash during a save never
+    leaves a truncated catalog behind.
+
+    Several processes may manage one CSV file when changes are journaled (the
+    default): a compaction holds the journal lock and folds the CSV file on disk and
+    the whole journal, which hold the changes of every process, rather than this
+    manager's own view of the catalog. With use_journal off or a
+    write_behind_interval, the CSV file is written from this manager's view, so
+    only one process may change the catalog then.
+
+    Repositories whose persists_changes
+    attribute is True (such as SqliteProductRepository) store each change
+    themselves, so the manager neither journals nor saves anything for them.
+
     Attributes:
         product_repo (ProductRepository): The repository that manages product data.
+        use_journal (bool): Whether changes are journaled instead of saved in full.
+        compact_threshold (int): The journal size, in bytes, that triggers compaction.
+        write_behind_interval (Optional[float]): The delay, in seconds, before a
+            background save, or None to persist changes in the calling thread.
 
     Methods:
         add_product: Adds a new product to the repository.
         remove_product: Removes an existing product from the repository.
         edit_product: Edits an existing product's details.
+        set_stock: Sets the number of units in stock of a product.
+        batch: Groups several changes so that they are persisted once, or not at all.
+        apply_changes: Applies a list of add, edit and remove operations as one batch.
+        compact: Folds the change journal into the CSV file.
+        flush: Waits until every change is saved.
+        close: Saves outstanding changes and stops background saving.
         _save_products: Saves the current list of products to a CSV file.
     """
 
-    def __init__(self, product_repo: ProductRepository):
+    def __init__(
+        self,
+        product_repo: ProductRepository,
+        use_journal: bool = True,
+        compact_threshold: int = COMPACT_THRESHOLD,
+        write_behind_interval: Optional[float] = None,
+    ):
         """
         Initializes the Manager with access to the product repository.
 
         Args:
             product_repo (ProductRepository): The repository used to manage products.
+            use_journal (bool): Whether changes are journaled instead of saved in full.
+            compact_threshold (int): The journal size, in bytes, that triggers compaction.
+            write_behind_interval (Optional[float]): The delay, in seconds, before a
+                background save, or None to persist changes in the calling thread.
         """
         self.product_repo = product_repo
+        self.use_journal = use_journal
+        self.compact_threshold = compact_threshold
+        self.write_behind_interval = write_behind_interval
+        self._pending: Optional[List[dict]] = None
+        # Guards the repository against the background flusher reading it mid-change.
+        self._lock = threading.RLock()
+        self._flusher: Optional[WriteBehindFlusher] = None
+        if write_behind_interval is not None and not product_repo.persists_changes:
+            self._flusher = WriteBehindFlusher(self._save_products, write_behind_interval)
 
-    def add_product(self, product_id: str, name: str, category: str, price: float):
+    def add_product(
+        self,
+        product_id: str,
+        name: str,
+        category: str,
+        price: float,
+        stock: Optional[int] = None,
+    ):
         """
         Adds a new product to the repository.
 
         This method allows the manager to create a new product with the given details
-        and append it to the product repository. After adding the product, it is saved
-        to the CSV file.
+        and append it to the product repository. After adding the product, the change
+        is persisted.
 
         Args:
             product_id (str): The unique identifier for the new product.
             name (str): The name of the new product.
             category (str): The category of the new product.
             price (float): The price of the new product.
+            stock (Optional[int]): The units in stock, or None if stock is not tracked.
 
         Returns:
-            str: A confirmation message indicating that the product was added successfully.
+            ChangeResult: A confirmation message indicating that the product was added
+                successfully, or a message indicating that the ID is already in use; its ok
+                attribute tells which.
+
+        Raises:
+            ValueError: If stock is negative or larger than MAX_STOCK.
         """
-        new_product = Product(product_id, name, category, price)
-        self.product_repo.products.append(new_product)
-        self._save_products()
-        return f"Product '{name}' with id '{product_id}' added successfully."
+        check_stock(stock)
+        new_product = Product(product_id, name, category, price, stock)
+        with self._lock:
+            if not self.product_repo.add_product(new_product):
+                return ChangeResult(f"Product with ID {product_id} already exists.", False)
+            self._persist(add_entry(product_id, name, category, price, stock))
+        message = f"Product '{name}' with id '{product_id}' added successfully."
+        return ChangeResult(message, True)
 
     def remove_product(self, product_id: str):
         """
         Removes a product from the repository.
 
         This method allows the manager to remove a product from the repository based on
-        its unique ID. After removal, the product list is updated in the CSV file.
+        its unique ID. After removal, the change is persisted.
 
         Args:
             product_id (str): The unique identifier of the product to be removed.
 
         Returns:
-            str: A confirmation message indicating that the product was removed successfully.
+            ChangeResult: A confirmation message indicating that the product was removed
+                successfully, or a message indicating that the product was not found; its ok
+                attribute tells which.
         """
-        self.product_repo.products = [
-            product
-            for product in self.product_repo.products
-            if product.product_id != product_id
-        ]
-        self._save_products()
-        return f"Product with id '{product_id}' removed successfully"
+        with self._lock:
+            if self.product_repo.remove_product(product_id) is None:
+                return ChangeResult(f"Product with ID {product_id} not found.", False)
+            self._persist(remove_entry(product_id))
+        return ChangeResult(f"Product with id '{product_id}' removed successfully", True)
 
     def edit_product(self, product_id: str, name: str, category: str, price: float):
         """
         Edits the details of an existing product.
 
         This method allows the manager to update the name, category, and price of
-        an existing product based on its unique ID. The changes are saved to the
-        CSV file after updating the product details.
+        an existing product based on its unique ID. The changes are persisted after
+        updating the product details.
 
         Args:
             product_id (str): The unique identifier of the product to be edited.
@@ -113,18 +334,255 @@ class Manager(AbstractProductManager):
             price (float): The updated price of the product.
 
         Returns:
-            str: A confirmation message indicating that the product was edited successfully,
-                 or a message indicating that the product was not found.
+            ChangeResult: A confirmation message indicating that the product was edited
+                successfully, or a message indicating that the product was not found; its ok
+                attribute tells which.
+        """
+        with self._lock:
+            if self.product_repo.update_product(product_id, name, category, price) is None:
+                return ChangeResult(f"Product with ID {product_id} not found.", False)
+            self._persist(edit_entry(product_id, name, category, price))
+        message = f"Product '{name}' with id '{product_id}' edited successfully"
+        return ChangeResult(message, True)
+
+    def set_stock(self, product_id: str, stock: Optional[int]):
+        """
+        Sets the number of units in stock of a product.
+
+        Checkouts take units out of stock on their own; this is how a manager
+        restocks a product, corrects its count, or starts or stops tracking it.
+
+        Checkouts journal the levels they leave, even in batches and whatever the
+        manager's mode, so the new level is journaled the same way, right away and
+        under the product's stock lock (see ProductRepository.set_stock): otherwise a
+        reservation made in between could be journaled before it, and replaying the
+        journal would put the units it sold back. When changes are not journaled,
+        the catalog is saved as well.
+
+        Args:
+            product_id (str): The unique identifier of the product.
+            stock (Optional[int]): The new units in stock, or None to stop tracking stock.
+
+        Returns:
+            ChangeResult: A confirmation message indicating that the stock was set
+                successfully, or a message indicating that the product was not found; its ok
+                attribute tells which.
+
+        Raises:
+            ValueError: If stock is negative or larger than MAX_STOCK.
+        """
+        with self._lock:
+            if self.product_repo.persists_changes:
+                if self.product_repo.set_stock(product_id, stock) is None:
+                    return ChangeResult(f"Product with ID {product_id} not found.", False)
+            else:
+                try:
+                    if self.product_repo.set_stock(product_id, stock, journaled=True) is None:
+                        return ChangeResult(f"Product with ID {product_id} not found.", False)
+                except OSError as e:
+                    print(f"Error writing to the change journal: {e}")
+                if self.use_journal and self._flusher is None:
+                    if self._pending is None:
+                        self._compact_if_large()
+                else:
+                    self._persist(stock_entry(product_id, stock))
+        if stock is None:
+            message = f"Stock of product with id '{product_id}' is no longer tracked"
+        else:
+            message = f"Stock of product with id '{product_id}' set to {stock}"
+        return ChangeResult(message, True)
+
+    @contextmanager
+    def batch(self) -> Iterator["Manager"]:
+        """
+        Groups several changes so that they are persisted once, or not at all.
+
+        Inside the block, add_product, edit_product and remove_product update the
+        repository in memory only. When the block ends normally, the changes are
+        persisted with a single journal write (or a single CSV save when the journal
+        is disabled). If the block raises, every change made inside it is rolled back
+        and nothing is persisted. Stock levels are the exception: set_stock journals
+        them right away, in order with checkouts, and a rollback journals the level
+        it restores. Nested batches join the outermost one, and a
+        background save never observes a half-applied batch.
+
+        Example:
+            with manager.batch():
+                for product_id, name, category, price in repriced:
+                    manager.edit_product(product_id, name, category, price)
+
+        Args:
+            None
+
+        Returns:
+            Iterator[Manager]: A context manager that yields this manager.
+        """
+        with self._lock:
+            if self._pending is not None:
+                yield self
+                return
+            self._pending = []
+            self.product_repo.begin()
+            try:
+                yield self
+            except BaseException:
+                self._pending = None
+                self.product_repo.rollback()
+                raise
+            entries, self._pending = self._pending, None
+            self.product_repo.commit()
+            self._flush(entries)
+
+    def apply_changes(self, operations: Iterable[Tuple]) -> List[str]:
+        """
+        Applies a list of operations as a single batch.
+
+        Each operation is a tuple: ("add", product_id, name, category, price[, stock]),
+        ("edit", product_id, name, category, price), ("stock", product_id, stock) or
+        ("remove", product_id). If any
+        operation is unknown, adds an ID that already exists, or edits or removes an
+        ID that does not, the whole batch is rolled back.
+
+        Args:
+            operations (Iterable[Tuple]): The operations to apply, in order.
+
+        Returns:
+            List[str]: The confirmation message of each operation.
+
+        Raises:
+            ValueError: If an operation fails; no change is kept or persisted.
         """
-        for product in self.product_repo.products:
-            if product.product_id == product_id:
-                product.name = name
-                product.category = category
-                product.price = price
-                self._save_products()
-                return f"Product '{name}' with id '{product_id}' edited successfully"
+        handlers = {
+            "add": self.add_product,
+            "edit": self.edit_product,
+            "remove": self.remove_product,
+            "stock": self.set_stock,
+        }
+        messages = []
+        with self.batch():
+            for kind, product_id, *values in operations:
+                handler = handlers.get(kind)
+                if handler is None:
+                    raise ValueError(f"Unknown operation: {kind}")
+                exists = self.product_repo.get_by_id(product_id) is not None
+                if kind == "add" and exists:
+                    raise ValueError(f"Product with ID {product_id} already exists.")
+                if kind != "add" and not exists:
+                    raise ValueError(f"Product with ID {product_id} not found.")
+                messages.append(handler(product_id, *values))
+        return messages
 
-        return f"Product with ID {product_id} not found."
+    def compact(self):
+        """
+        Folds the change journal into the CSV file.
+
+        The CSV file is rewritten with the current products and the journal is
+        emptied, so later loads no longer need to replay it.
+
+        Args:
+            None
+
+        Returns:
+            bool: True if the CSV file was written, False if an error occurred.
+        """
+        return self._save_products()
+
+    def flush(self):
+        """
+        Waits until every change made so far is saved.
+
+        In write-behind mode this saves pending changes in the calling thread.
+        Otherwise changes are already persisted when they are made, so there is
+        nothing to wait for.
+
+        Args:
+            None
+
+        Returns:
+            bool: True if every change is saved, False if the save failed.
+        """
+        if self._flusher is None:
+            return True
+        return self._flusher.flush()
+
+    def close(self):
+        """
+        Saves outstanding changes and stops background saving.
+
+        In write-behind mode the background thread is stopped after a final save.
+        Otherwise a non-empty change journal is folded into the CSV file.
+
+        Args:
+            None
+
+        Returns:
+            bool: True if every change is saved, False if the save failed.
+        """
+        if self._flusher is not None:
+            flusher, self._flusher = self._flusher, None
+            return flusher.close()
+        if not self.product_repo.persists_changes and self.product_repo.journal.size():
+            return self.compact()
+        return True
+
+    def _persist(self, entry: dict):
+        """
+        Persists one change, either by journaling it or by saving every product.
+
+        Inside a batch the entry is only queued; it is persisted when the batch ends.
+
+        Args:
+            entry (dict): The journal entry describing the change.
+
+        Returns:
+            None
+        """
+        if self._pending is not None:
+            self._pending.append(entry)
+            return
+        self._flush([entry])
+
+    def _flush(self, entries: List[dict]):
+        """
+        Persists a list of changes with a single write.
+
+        Args:
+            entries (List[dict]): The journal entries describing the changes.
+
+        Returns:
+            None
+        """
+        if not entries:
+            return
+        if self.product_repo.persists_changes:
+            return
+        if self._flusher is not None:
+            self._flusher.mark_dirty()
+            return
+        if not self.use_journal:
+            self._save_products()
+            return
+        journal = self.product_repo.journal
+        try:
+            journal.append(*entries)
+        except Exception as e:
+            print(f"Error writing to the change journal: {e}")
+            return
+        self._compact_if_large()
+
+    def _compact_if_large(self):
+        """
+        Folds the change journal into the CSV file if it has grown past
+        compact_threshold bytes.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        if self.product_repo.journal.size() >= self.compact_threshold:
+            self.compact()
 
     def _save_products(self):
         """
@@ -132,27 +590,107 @@ class Manager(AbstractProductManager):
 
         This method writes the current state of the product list in the repository
         to a CSV file, ensuring that any changes made by the manager are persisted.
-        If an error occurs during the file operation, an error message is displayed.
+        The change journal is emptied afterwards, since the CSV file now holds every
+        change. If an error occurs during the file operation, an error message is
+        displayed.
+
+        The products are written to a temporary file that is synced and then moved
+        over the CSV file with os.replace, so readers and crashes only ever see the
+        old or the new catalog. In write-behind mode the products are copied under
+        the lock and written without it, so edits are not held up by the disk.
+
+        With the journal on (and no write-behind), the rows are the CSV file on disk
+        with the whole journal replayed on top, read and written under the exclusive
+        journal lock: the journal holds the changes of every process that shares the
+        CSV file, so none of them is lost, and the whole journal is then cleared.
+        Otherwise the journal is marked before the products are copied, and only that
+        much of it is cleared afterwards: stock changes that checkouts journal while
+        the file is being written are kept for the next load. A Stock column is
+        written only when some product tracks stock.
 
         Args:
             None
 
         Returns:
-            None
+            bool: True if the CSV file was written, False if an error occurred.
+        """
+        if self.product_repo.persists_changes:
+            return True
+        journal = self.product_repo.journal
+        if self.use_journal and self._flusher is None:
+            with self._lock, journal.locked():
+                merged = CsvRows(self.product_repo.filename)
+                journal.replay(merged)
+                return self._write_products(list(merged.rows.values()))
+        with self._lock:
+            journaled = journal.mark()
+            rows = [
+                {
+                    "id": product_id,
+                    "Product": name,
+                    "Category": category,
+                    "Price": price,
+                    "Stock": "" if stock is None else stock,
+                }
+                for product_id, name, category, price, stock in self.product_repo.product_rows()
+            ]
+            if self._flusher is None:
+                # Journal appends are made under the lock too; keep them out until
+                # the journal is cleared.
+                return self._write_products(rows, journaled)
+        return self._write_products(rows, journaled)
+
+    def _write_products(self, rows: List[dict], journaled: Optional[Tuple[int, int]] = None):
+        """
+        Atomically replaces the CSV file with the given rows and clears the journal.
+
+        Args:
+            rows (List[dict]): The CSV rows to write.
+            journaled (Optional[Tuple[int, int]]): The ChangeJournal.mark taken when the
+                rows were copied; only that much of it is cleared. None clears the
+                whole journal.
+
+        Returns:
+            bool: True if the CSV file was written, False if an error occurred.
         """
+        filename = self.product_repo.filename
+        directory = os.path.dirname(os.path.abspath(filename))
+        temp_filename = None
         try:
-            with open(self.product_repo.filename, "w", newline="") as csvfile:
+            file_descriptor, temp_filename = tempfile.mkstemp(
+                prefix=os.path.basename(filename) + ".", suffix=".tmp", dir=directory
+            )
+            with open(file_descriptor, "w", newline="") as csvfile:
                 fieldnames = ["id", "Product", "Category", "Price"]
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                if any(row["Stock"] != "" for row in rows):
+                    fieldnames.append("Stock")
+                writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction="ignore")
                 writer.writeheader()
-                for product in self.product_repo.products:
-                    writer.writerow(
-                        {
-                            "id": product.product_id,
-                            "Product": product.name,
-                            "Category": product.category,
-                            "Price": product.price,
-                        }
-                    )
+                writer.writerows(rows)
+                csvfile.flush()
+                os.fsync(csvfile.fileno())
+            if METRICS.enabled:
+                METRICS.count_bytes("manager.save", written=os.path.getsize(temp_filename))
+            if os.path.exists(filename):
+                shutil.copymode(filename, temp_filename)
+            os.replace(temp_filename, filename)
         except Exception as e:
             print(f"Error saving products to file: {e}")
+            if temp_filename is not None and os.path.exists(temp_filename):
+                os.remove(temp_filename)
+            return False
+        self.product_repo.journal.clear(journaled)
+        return True
+
+
+METRICS.register(
+    Manager,
+    {
+        "add_product": "manager.add_product",
+        "edit_product": "manager.edit_product",
+        "remove_product": "manager.remove_product",
+        "set_stock": "manager.set_stock",
+        "apply_changes": "manager.apply_changes",
+        "_save_products": "manager.save",
+    },
+)
@@ -0,0 +1,420 @@
+"""
+This module contains the Metrics class which counts the calls of the
+main shop operations, records their latencies in histograms and the
+bytes read and written by loads and saves, and can profile a single
+call of an operation with cProfile.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import cProfile
+import functools
+import json
+import threading
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Latencies are counted in power-of-two buckets of microseconds: bucket i holds the
+# calls that took less than 2 ** i microseconds, and the last one everything slower.
+HISTOGRAM_BUCKETS = 32
+
+
+class OperationStats:
+    """
+    The call count, errors and latency histogram of one operation.
+
+    Attributes:
+        calls (int): The number of calls.
+        errors (int): The number of calls that raised.
+        total (float): The seconds spent in all calls.
+        minimum (float): The seconds of the fastest call.
+        maximum (float): The seconds of the slowest call.
+        histogram (List[int]): The number of calls in each latency bucket.
+    """
+
+    __slots__ = ("calls", "errors", "total", "minimum", "maximum", "histogram")
+
+    def __init__(self):
+        """
+        Initializes empty statistics.
+        """
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.minimum = float("inf")
+        self.maximum = 0.0
+        self.histogram = [0] * HISTOGRAM_BUCKETS
+
+    def record(self, seconds: float, failed: bool):
+        """
+        Adds one call.
+
+        Args:
+            seconds (float): The seconds the call took.
+            failed (bool): Whether the call raised.
+
+        Returns:
+            None
+        """
+        self.calls += 1
+        self.errors += failed
+        self.total += seconds
+        if seconds < self.minimum:
+            self.minimum = seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+        self.histogram[min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Estimates a latency percentile from the histogram.
+
+        Args:
+            fraction (float): The percentile, between 0 and 1.
+
+        Returns:
+            float: The upper bound, in microseconds, of the bucket holding that rank,
+                capped at the slowest call.
+        """
+        rank = max(int(self.calls * fraction + 0.999999), 1)
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if seen >= rank:
+                return min(float(2**bucket), self.maximum * 1e6)
+        return self.maximum * 1e6
+
+    def to_dict(self) -> Dict:
+        """
+        Returns the statistics in JSON-serializable form.
+
+        Returns:
+            Dict: The calls, errors, total seconds, mean, minimum, maximum and
+                estimated p50, p90 and p99 in microseconds, and the non-empty
+                histogram buckets keyed by their upper bound in microseconds.
+        """
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_seconds": self.total,
+            "mean_us": self.total / self.calls * 1e6 if self.calls else 0.0,
+            "min_us": self.minimum * 1e6 if self.calls else 0.0,
+            "max_us": self.maximum * 1e6,
+            "p50_us": self.percentile(0.5),
+            "p90_us": self.percentile(0.9),
+            "p99_us": self.percentile(0.99),
+            "histogram_us": {
+                ("inf" if bucket == HISTOGRAM_BUCKETS - 1 else f"<{2**bucket}"): count
+                for bucket, count in enumerate(self.histogram)
+                if count
+            },
+        }
+
+
+class Metrics:
+    """
+    Collects per-operation metrics for the shop.
+
+    Modules declare which methods are operations with register, at import time.
+    Nothing is wrapped until enable is called: enable replaces each registered
+    method with a timing wrapper and disable puts the original back, so while
+    metrics are disabled the operations run exactly the code they would without
+    this module. Byte counters are updated by the code that reads or writes files,
+    behind a check of the enabled attribute.
+
+    Attributes:
+        enabled (bool): Whether metrics are being collected.
+
+    Methods:
+        register: Declares methods of a class as named operations.
+        enable: Starts collecting metrics.
+        disable: Stops collecting metrics.
+        reset: Discards the metrics collected so far.
+        count_bytes: Adds to the bytes read or written by an operation.
+        profile_next: Profiles the next call of an operation with cProfile.
+        snapshot: Returns the metrics collected so far.
+        report: Formats the metrics collected so far as a table.
+        dump: Writes the metrics collected so far to a JSON file.
+    """
+
+    def __init__(self):
+        """
+        Initializes the Metrics, disabled and empty.
+        """
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._operations: Dict[str, OperationStats] = {}
+        self._bytes: Dict[str, List[int]] = {}
+        self._targets: List[Tuple[type, str, str]] = []
+        self._originals: Dict[Tuple[type, str], Callable] = {}
+        self._profile: Optional[Tuple[str, str]] = None
+
+    def register(self, cls: type, operations: Dict[str, str]):
+        """
+        Declares methods of a class as named operations.
+
+        Args:
+            cls (type): The class.
+            operations (Dict[str, str]): The operation name of each method name.
+
+        Returns:
+            None
+        """
+        for method, name in operations.items():
+            self._targets.append((cls, method, name))
+            if self.enabled:
+                self._wrap(cls, method, name)
+
+    def _wrap(self, cls: type, method: str, name: str):
+        """
+        Replaces a method with a wrapper that records its calls.
+
+        Args:
+            cls (type): The class.
+            method (str): The method name.
+            name (str): The operation name.
+
+        Returns:
+            None
+        """
+        original = cls.__dict__[method]
+        metrics = self
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            if metrics._profile is not None and metrics._profile[0] == name:
+                return metrics._run_profiled(original, args, kwargs)
+            start = perf_counter()
+            failed = True
+            try:
+                result = original(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                metrics._record(name, perf_counter() - start, failed)
+
+        self._originals[(cls, method)] = original
+        setattr(cls, method, timed)
+
+    def enable(self):
+        """
+        Starts collecting metrics by wrapping every registered method.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if self.enabled:
+                return
+            for cls, method, name in self._targets:
+                self._wrap(cls, method, name)
+            self.enabled = True
+
+    def disable(self):
+        """
+        Stops collecting metrics and restores every registered method.
+
+        The metrics collected so far are kept.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            for (cls, method), original in self._originals.items():
+                setattr(cls, method, original)
+            self._originals.clear()
+            self._profile = None
+            self.enabled = False
+
+    def reset(self):
+        """
+        Discards the metrics collected so far.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._operations.clear()
+            self._bytes.clear()
+
+    def _record(self, name: str, seconds: float, failed: bool):
+        """
+        Adds one call of an operation.
+
+        Args:
+            name (str): The operation name.
+            seconds (float): The seconds the call took.
+            failed (bool): Whether the call raised.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            stats = self._operations.get(name)
+            if stats is None:
+                stats = self._operations[name] = OperationStats()
+            stats.record(seconds, failed)
+
+    def count_bytes(self, name: str, read: int = 0, written: int = 0):
+        """
+        Adds to the bytes read or written by an operation.
+
+        Callers check the enabled attribute first, so measuring sizes costs nothing
+        while metrics are disabled.
+
+        Args:
+            name (str): The operation name.
+            read (int): The bytes read.
+            written (int): The bytes written.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            counters = self._bytes.setdefault(name, [0, 0])
+            counters[0] += read
+            counters[1] += written
+
+    def profile_next(self, name: str, filename: str):
+        """
+        Profiles the next call of an operation with cProfile.
+
+        Metrics are enabled if they are not already. The profile is written to
+        filename in the pstats format, readable with "python -m pstats filename".
+
+        Args:
+            name (str): The operation name, as listed by the registered operations.
+            filename (str): The file the profile is written to.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If no operation has that name.
+        """
+        if name not in self.operation_names():
+            raise ValueError(f"Unknown operation: {name}")
+        self.enable()
+        self._profile = (name, filename)
+
+    def _run_profiled(self, function: Callable, args: tuple, kwargs: dict):
+        """
+        Runs one call under cProfile and writes the profile.
+
+        Args:
+            function (Callable): The original method.
+            args (tuple): The positional arguments.
+            kwargs (dict): The keyword arguments.
+
+        Returns:
+            object: The result of the call.
+        """
+        with self._lock:
+            if self._profile is None:
+                return function(*args, **kwargs)
+            name, filename = self._profile
+            self._profile = None
+        profiler = cProfile.Profile()
+        start = perf_counter()
+        failed = True
+        try:
+            result = profiler.runcall(function, *args, **kwargs)
+            failed = False
+            return result
+        finally:
+            self._record(name, perf_counter() - start, failed)
+            try:
+                profiler.dump_stats(filename)
+                print(f"Profile of {name} written to {filename}")
+            except OSError as e:
+                print(f"Error writing the profile: {e}")
+
+    def operation_names(self) -> List[str]:
+        """
+        Returns the names of the registered operations.
+
+        Returns:
+            List[str]: The names, sorted.
+        """
+        return sorted({name for _, _, name in self._targets})
+
+    def snapshot(self) -> Dict:
+        """
+        Returns the metrics collected so far.
+
+        Returns:
+            Dict: Whether metrics are enabled, the statistics of each operation that
+                was called (OperationStats.to_dict) and the bytes read and written
+                by each operation that counted any.
+        """
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "operations": {
+                    name: stats.to_dict() for name, stats in sorted(self._operations.items())
+                },
+                "bytes": {
+                    name: {"read": read, "written": written}
+                    for name, (read, written) in sorted(self._bytes.items())
+                },
+            }
+
+    def report(self) -> str:
+        """
+        Formats the metrics collected so far as a table, slowest operations first.
+
+        Returns:
+            str: The table, one line per operation.
+        """
+        snapshot = self.snapshot()
+        lines = [
+            f"{'operation':<34}{'calls':>9}{'errors':>7}{'total ms':>11}"
+            f"{'p50 us':>10}{'p99 us':>10}{'max us':>11}{'read':>12}{'written':>12}"
+        ]
+        operations = sorted(
+            snapshot["operations"].items(), key=lambda item: item[1]["total_seconds"], reverse=True
+        )
+        for name, stats in operations:
+            counted = snapshot["bytes"].get(name, {"read": 0, "written": 0})
+            lines.append(
+                f"{name:<34}{stats['calls']:>9}{stats['errors']:>7}"
+                f"{stats['total_seconds'] * 1000:>11.2f}{stats['p50_us']:>10.0f}"
+                f"{stats['p99_us']:>10.0f}{stats['max_us']:>11.0f}"
+                f"{counted['read']:>12}{counted['written']:>12}"
+            )
+        if not operations:
+            lines.append("No operations recorded.")
+        return "\n".join(lines)
+
+    def dump(self, filename: str):
+        """
+        Writes the metrics collected so far to a JSON file.
+
+        Args:
+            filename (str): The path of the file.
+
+        Returns:
+            None
+        """
+        with open(filename, "w", encoding="utf-8") as output:
+            json.dump(self.snapshot(), output, indent=2)
+            output.write("\n")
+
+
+# The metrics of this process, shared by every instrumented module.
+METRICS = Metrics()
@@ -0,0 +1,324 @@
+"""
+This module contains the OrderLedger class which records completed
+orders as JSON lines, buffering them in memory and writing them in
+groups from a background thread into size- and age-rotated files.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import BinaryIO, Dict, List, Optional
+
+# A ledger file is rotated once it reaches this size, in bytes...
+MAX_FILE_BYTES = 64 * 1024 * 1024
+# ...or once it has been open for this many seconds.
+MAX_FILE_AGE = 24 * 60 * 60
+
+
+class LedgerWriteError(OSError):
+    """A group of orders was partly written to a ledger file and could not be removed."""
+
+
+class OrderLedger:
+    """
+    Append-only ledger of completed orders stored as JSON lines.
+
+    append serializes an order into an in-memory buffer and returns at once.
+    A background thread writes everything buffered with a single write at most
+    flush_interval seconds after an order is buffered, or sooner when the buffer
+    reaches max_buffer_bytes (group commit); while nothing is buffered it sleeps. With fsync set, each group is also
+    fsynced before it counts as committed; wait blocks until a given order is
+    committed, so callers that need durability share one fsync per group.
+
+    The ledger writes to files named ledger-<UTC time>-<pid>-<n>.jsonl in its
+    directory and starts a new file when the current one would exceed
+    max_file_bytes or has been open for max_file_age seconds. The process ID
+    keeps the names of processes sharing the directory apart. A failed write is
+    cut off the file and retried; if it cannot be cut off, the ledger stops
+    rather than record orders twice, and append raises from then on.
+
+    Attributes:
+        directory (str): The directory that holds the ledger files.
+        max_file_bytes (int): The size at which a file is rotated.
+        max_file_age (float): The age, in seconds, at which a file is rotated.
+        flush_interval (float): The longest time an order waits in the buffer.
+        max_buffer_bytes (int): The buffer size that triggers an early write.
+        fsync (bool): Whether each group is fsynced before it counts as committed.
+
+    Methods:
+        append: Buffers an order and returns its sequence number.
+        wait: Blocks until an order has been committed.
+        flush: Writes the buffer and waits for it.
+        stats: Returns the ledger counters.
+        close: Writes the buffer and stops the background thread.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_file_bytes: int = MAX_FILE_BYTES,
+        max_file_age: float = MAX_FILE_AGE,
+        flush_interval: float = 0.05,
+        max_buffer_bytes: int = 1024 * 1024,
+        fsync: bool = False,
+    ):
+        """
+        Initializes the OrderLedger, creating its directory, and starts the writer thread.
+
+        Args:
+            directory (str): The directory that holds the ledger files.
+            max_file_bytes (int): The size at which a file is rotated.
+            max_file_age (float): The age, in seconds, at which a file is rotated.
+            flush_interval (float): The longest time an order waits in the buffer.
+            max_buffer_bytes (int): The buffer size that triggers an early write.
+            fsync (bool): Whether each group is fsynced before it counts as committed.
+        """
+        self.directory = directory
+        self.max_file_bytes = max_file_bytes
+        self.max_file_age = max_file_age
+        self.flush_interval = flush_interval
+        self.max_buffer_bytes = max_buffer_bytes
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        self._condition = threading.Condition()
+        self._buffer: List[bytes] = []
+        self._buffer_bytes = 0
+        self._appended = 0
+        self._committed = 0
+        self._closed = False
+        self._failed = False
+        self._flush_requested = False
+        self.error: Optional[BaseException] = None
+        self.commits = 0
+        self.bytes_written = 0
+        self.rotations = 0
+        self._file: Optional[BinaryIO] = None
+        self._file_size = 0
+        self._file_opened = 0.0
+        self._file_number = 0
+        self._thread = threading.Thread(target=self._run, name="order-ledger", daemon=True)
+        self._thread.start()
+
+    def append(self, order: Dict) -> int:
+        """
+        Buffers an order for the next group commit. Does not wait for the disk.
+
+        Args:
+            order (Dict): The order record.
+
+        Returns:
+            int: The sequence number of the order, to pass to wait.
+
+        Raises:
+            RuntimeError: If the ledger is closed.
+        """
+        line = json.dumps(order, separators=(",", ":")).encode("utf-8") + b"\n"
+        with self._condition:
+            if self._failed:
+                raise RuntimeError(f"The order ledger failed: {self.error}")
+            if self._closed:
+                raise RuntimeError("The order ledger is closed.")
+            self._buffer.append(line)
+            self._buffer_bytes += len(line)
+            self._appended += 1
+            if self._buffer_bytes >= self.max_buffer_bytes:
+                self._condition.notify_all()
+            return self._appended
+
+    def wait(self, sequence: int, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until the order with a sequence number has been committed.
+
+        Args:
+            sequence (int): The number returned by append.
+            timeout (Optional[float]): The longest time to wait, in seconds.
+
+        Returns:
+            bool: True if the order is committed, False if the wait timed out or the
+                ledger failed (see error).
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._committed >= sequence or self._failed, timeout
+            )
+            return self._committed >= sequence
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Writes every buffered order now and waits until they are committed.
+
+        Args:
+            timeout (Optional[float]): The longest time to wait, in seconds.
+
+        Returns:
+            bool: True if every order appended so far is committed.
+        """
+        with self._condition:
+            sequence = self._appended
+            self._flush_requested = True
+            self._condition.notify_all()
+        return self.wait(sequence, timeout)
+
+    def _run(self):
+        """
+        Writes the buffer in groups until the ledger is closed and drained.
+
+        Returns:
+            None
+        """
+        while True:
+            with self._condition:
+                # Sleep until there is something to do; only a buffered order starts
+                # the flush_interval clock, so an idle ledger never wakes up.
+                self._condition.wait_for(
+                    lambda: self._closed or self._flush_requested or self._buffer
+                )
+                self._condition.wait_for(
+                    lambda: self._closed
+                    or self._flush_requested
+                    or self._buffer_bytes >= self.max_buffer_bytes,
+                    timeout=self.flush_interval,
+                )
+                closing = self._closed
+                self._flush_requested = False
+                lines, self._buffer = self._buffer, []
+                self._buffer_bytes = 0
+                target = self._appended
+            if lines:
+                try:
+                    self._write(b"".join(lines))
+                except LedgerWriteError as e:
+                    # Part of the group may be in the file; retrying could record
+                    # orders twice, so the ledger stops and reports the failure.
+                    with self._condition:
+                        self.error = e
+                        self._failed = True
+                        self._closed = True
+                        self._condition.notify_all()
+                    return
+                except Exception as e:
+                    # Nothing of the group was kept; retry it with the next one.
+                    with self._condition:
+                        self.error = e
+                        self._buffer[:0] = lines
+                        self._buffer_bytes += sum(map(len, lines))
+                    if closing:
+                        return
+                    time.sleep(self.flush_interval)
+                    continue
+            with self._condition:
+                self._committed = target
+                self._condition.notify_all()
+            if closing:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                return
+
+    def _open_file(self):
+        """
+        Starts a new ledger file.
+
+        Returns:
+            None
+        """
+        if self._file is not None:
+            self._file.close()
+            self.rotations += 1
+        self._file_number += 1
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        name = f"ledger-{stamp}-{os.getpid()}-{self._file_number:06d}.jsonl"
+        path = os.path.join(self.directory, name)
+        # Unbuffered, so a failed write leaves nothing behind to be written later.
+        self._file = open(path, "ab", buffering=0)
+        self._file_size = self._file.tell()
+        self._file_opened = time.monotonic()
+
+    def _write(self, data: bytes):
+        """
+        Appends a group of lines to the current file, rotating it first if needed.
+
+        If the write fails, the file is truncated back to where the group started, so
+        the group can be written again without duplicating any line.
+
+        Args:
+            data (bytes): The lines to write.
+
+        Returns:
+            None
+
+        Raises:
+            OSError: If the group could not be written; the file is as it was.
+            LedgerWriteError: If part of the group was written and could not be removed.
+        """
+        too_big = self._file_size > 0 and self._file_size + len(data) > self.max_file_bytes
+        too_old = time.monotonic() - self._file_opened > self.max_file_age
+        if self._file is None or too_big or too_old:
+            self._open_file()
+        start = self._file_size
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[self._file.write(view) :]
+            if self.fsync:
+                os.fsync(self._file.fileno())
+        except OSError as e:
+            # Cut off whatever part of the group reached the file, so it can be retried.
+            try:
+                self._file.truncate(start)
+            except OSError:
+                self._file.close()
+                self._file = None
+                raise LedgerWriteError(f"A partial ledger write could not be undone: {e}") from e
+            raise
+        self._file_size += len(data)
+        self.bytes_written += len(data)
+        self.commits += 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the ledger counters.
+
+        Returns:
+            Dict[str, int]: The orders appended and committed, the group commits, the
+                bytes written and the file rotations so far.
+        """
+        with self._condition:
+            return {
+                "appended": self._appended,
+                "committed": self._committed,
+                "commits": self.commits,
+                "bytes_written": self.bytes_written,
+                "rotations": self.rotations,
+            }
+
+    def close(self):
+        """
+        Writes every buffered order and stops the writer thread.
+
+        Returns:
+            None
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
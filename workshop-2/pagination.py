@@ -0,0 +1,66 @@
+"""
+This module contains the helpers that turn a position in a product
+listing into an opaque cursor and back, so listings can be read one
+page at a time.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import base64
+import binascii
+from typing import Optional
+
+
+def encode_cursor(position: int) -> str:
+    """Returns the cursor that resumes a listing after a position.
+
+    The position is the row (or SQLite seq) of the last product of a page. It is
+    stored as URL-safe base64 so callers treat the cursor as an opaque token.
+
+    Args:
+        position (int): The position of the last product returned.
+
+    Returns:
+        str: The cursor.
+    """
+    return base64.urlsafe_b64encode(str(position).encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """Returns the position stored in a cursor.
+
+    Args:
+        cursor (Optional[str]): A cursor returned with a previous page, or None to
+            start from the beginning.
+
+    Returns:
+        int: The position after which the next page starts; -1 for the first page.
+
+    Raises:
+        ValueError: If the cursor was not produced by encode_cursor.
+    """
+    if cursor is None:
+        return -1
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = int(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor!r}") from None
+    if position < 0:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return position
@@ -0,0 +1,180 @@
+"""
+This module contains the helpers that parse a products CSV file in
+parallel: the file is split into byte ranges aligned on line
+boundaries, each range is parsed in a worker process, and the
+resulting columns are merged into a ProductTable in file order.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import csv
+import io
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, List, Optional, Tuple
+from product_table import NO_STOCK, ProductTable, check_stock
+
+# Files smaller than this are parsed serially: below it, starting worker processes and
+# shipping the parsed columns back costs more than the parsing itself.
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+
+COLUMNS = ("id", "Product", "Category", "Price")
+# Optional column; files without it do not track stock.
+STOCK_COLUMN = "Stock"
+
+
+def split_ranges(filename: str, parts: int) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """Splits the data rows of a CSV file into byte ranges that start on a new line.
+
+    The header line is read and returned separately. Each range starts at the beginning
+    of a line and ends where the next range starts, so every row belongs to exactly one
+    range. Rows are assumed not to contain quoted line breaks.
+
+    Args:
+        filename (str): The path to the CSV file.
+        parts (int): The number of ranges to aim for.
+
+    Returns:
+        Tuple[List[str], List[Tuple[int, int]]]: The header fields and the (start, end)
+            byte offsets of each non-empty range.
+    """
+    with open(filename, "rb") as csvfile:
+        header = next(csv.reader([csvfile.readline().decode("utf-8")]), [])
+        data_start = csvfile.tell()
+        size = os.fstat(csvfile.fileno()).st_size
+        step = max(1, (size - data_start) // max(1, parts))
+        bounds = [data_start]
+        for part in range(1, parts):
+            target = data_start + part * step
+            if target <= bounds[-1]:
+                continue
+            # The line containing byte target - 1 ends just before the next range.
+            csvfile.seek(target - 1)
+            csvfile.readline()
+            boundary = csvfile.tell()
+            if boundary >= size:
+                break
+            if boundary > bounds[-1]:
+                bounds.append(boundary)
+        bounds.append(size)
+    ranges = [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+    return header, ranges
+
+
+def parse_range(
+    filename: str,
+    start: int,
+    end: int,
+    columns: Tuple[int, int, int, int],
+    stock_column: Optional[int] = None,
+) -> Tuple[List[str], List[str], List[str], array, array, Optional[array]]:
+    """Parses the rows stored in one byte range of a products CSV file.
+
+    This function runs in the worker processes. Categories are returned as codes into a
+    list of the distinct names seen in the range, so each name is sent back only once.
+
+    Args:
+        filename (str): The path to the CSV file.
+        start (int): The offset of the first byte of the range.
+        end (int): The offset just past the last byte of the range.
+        columns (Tuple[int, int, int, int]): The positions of the id, Product, Category
+            and Price fields in each row.
+        stock_column (Optional[int]): The position of the Stock field, or None if the
+            file has no Stock column.
+
+    Returns:
+        Tuple[List[str], List[str], List[str], array, array, Optional[array]]: The
+            product IDs, names, distinct category names, category codes, prices and
+            stock levels (None without a Stock column) of the rows in the range.
+
+    Raises:
+        ValueError: If a price or stock field is not a number, or a stock level is
+            negative or larger than MAX_STOCK.
+    """
+    with open(filename, "rb") as csvfile:
+        csvfile.seek(start)
+        data = csvfile.read(end - start).decode("utf-8")
+
+    id_column, name_column, category_column, price_column = columns
+    product_ids: List[str] = []
+    names: List[str] = []
+    categories: Dict[str, int] = {}
+    category_codes = array("I")
+    prices = array("d")
+    stocks = None if stock_column is None else array("q")
+    for record in csv.reader(io.StringIO(data, newline="")):
+        if not record:
+            continue
+        product_ids.append(record[id_column])
+        names.append(record[name_column])
+        category = record[category_column]
+        code = categories.get(category)
+        if code is None:
+            code = categories[category] = len(categories)
+        category_codes.append(code)
+        prices.append(float(record[price_column]))
+        if stocks is not None:
+            stock = record[stock_column] if stock_column < len(record) else ""
+            if stock.strip():
+                stock = int(stock)
+                # -1 would read back as NO_STOCK, so the sign is checked like the range.
+                check_stock(stock)
+                stocks.append(stock)
+            else:
+                stocks.append(NO_STOCK)
+    return product_ids, names, list(categories), category_codes, prices, stocks
+
+
+def load_table(filename: str, workers: int) -> ProductTable:
+    """Parses a products CSV file with a pool of worker processes.
+
+    Args:
+        filename (str): The path to the CSV file.
+        workers (int): The number of worker processes.
+
+    Returns:
+        ProductTable: A table with the rows of the file in file order.
+
+    Raises:
+        KeyError: If the header lacks one of the id, Product, Category or Price columns.
+        ValueError: If a row has a malformed price or stock, or a negative stock.
+    """
+    header, ranges = split_ranges(filename, workers)
+    positions = {name: index for index, name in enumerate(header)}
+    columns = tuple(positions[name] for name in COLUMNS)
+    stock_column = positions.get(STOCK_COLUMN)
+
+    table = ProductTable()
+    if not ranges:
+        return table
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as executor:
+        starts = [start for start, _ in ranges]
+        ends = [end for _, end in ranges]
+        chunks = executor.map(
+            parse_range,
+            repeat(filename),
+            starts,
+            ends,
+            repeat(columns),
+            repeat(stock_column),
+        )
+        for chunk in chunks:
+            table.extend(*chunk)
+    return table
@@ -0,0 +1,168 @@
+"""
+This module contains the PriceIndex class, a list of product rows
+kept sorted by price so that price ranges and the cheapest or most
+expensive products are found with a binary search.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Sequence
+
+
+class PriceIndex:
+    """
+    Product rows sorted by (price, row).
+
+    The prices and the rows are kept in two parallel arrays of C numbers, so
+    an entry costs 16 bytes instead of a tuple. Rows with the same price are
+    sorted by row number, that is, in catalog order, which lets bisect find
+    one exact entry among many products sharing a price.
+
+    Attributes:
+        prices (array): The sorted prices, as C doubles.
+        rows (array): The row of each price.
+
+    Methods:
+        from_rows: Builds an index from rows already sorted by (price, row).
+        add: Inserts an entry at its sorted position.
+        remove: Deletes an entry.
+        between: Returns the rows whose price is within a closed range.
+        smallest: Returns the rows of the k lowest prices.
+        largest: Returns the rows of the k highest prices.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty PriceIndex.
+        """
+        self.prices = array("d")
+        self.rows = array("q")
+
+    @classmethod
+    def from_rows(cls, prices: Sequence[float], rows: Iterable[int]) -> "PriceIndex":
+        """
+        Builds an index from rows that are already sorted by (price, row).
+
+        Args:
+            prices (Sequence[float]): The price column, indexed by row.
+            rows (Iterable[int]): The rows in sorted order.
+
+        Returns:
+            PriceIndex: The index over the given rows.
+        """
+        index = cls()
+        index.rows.extend(rows)
+        index.prices.extend(prices[row] for row in index.rows)
+        return index
+
+    def __len__(self) -> int:
+        """
+        Returns the number of entries in the index.
+
+        Returns:
+            int: The number of entries.
+        """
+        return len(self.rows)
+
+    def _position(self, price: float, row: int) -> int:
+        """
+        Returns the position where an entry is, or would be inserted.
+
+        Args:
+            price (float): The price of the entry.
+            row (int): The row of the entry.
+
+        Returns:
+            int: The position in the arrays.
+        """
+        low = bisect_left(self.prices, price)
+        high = bisect_right(self.prices, price, low)
+        return bisect_left(self.rows, row, low, high)
+
+    def add(self, price: float, row: int):
+        """
+        Inserts an entry at its sorted position.
+
+        Args:
+            price (float): The price of the product.
+            row (int): The row of the product.
+
+        Returns:
+            None
+        """
+        position = self._position(price, row)
+        self.prices.insert(position, price)
+        self.rows.insert(position, row)
+
+    def remove(self, price: float, row: int):
+        """
+        Deletes an entry. Entries that are not in the index are ignored.
+
+        Args:
+            price (float): The price the row was indexed with.
+            row (int): The row of the product.
+
+        Returns:
+            None
+        """
+        position = self._position(price, row)
+        if position < len(self.rows) and self.rows[position] == row:
+            del self.prices[position]
+            del self.rows[position]
+
+    def between(self, low: float, high: float) -> array:
+        """
+        Returns the rows whose price is at least low and at most high.
+
+        Args:
+            low (float): The lowest price.
+            high (float): The highest price.
+
+        Returns:
+            array: The rows, from the cheapest to the most expensive.
+        """
+        start = bisect_left(self.prices, low)
+        return self.rows[start:bisect_right(self.prices, high, start)]
+
+    def smallest(self, k: int) -> array:
+        """
+        Returns the rows of the k lowest prices.
+
+        Args:
+            k (int): The number of rows to return.
+
+        Returns:
+            array: The rows, from the cheapest up.
+        """
+        return self.rows[:max(k, 0)]
+
+    def largest(self, k: int) -> array:
+        """
+        Returns the rows of the k highest prices.
+
+        Args:
+            k (int): The number of rows to return.
+
+        Returns:
+            array: The rows, from the most expensive down.
+        """
+        if k <= 0:
+            return array("q")
+        return self.rows[: -k - 1 : -1] if k < len(self.rows) else self.rows[::-1]
@@ -0,0 +1,687 @@
+"""
+This module contains the ProcessLoadTest class which runs client and
+manager sessions in separate processes against one shared products.csv
+and reports their throughput, tail latencies, the torn or partial reads
+seen by clients and the changes lost between managers.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import queue
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import redirect_stdout
+from typing import Callable, Dict, List, Optional
+from catalog_generator import CatalogGenerator, parse_count
+from catalog_snapshot import default_snapshot_path
+from change_journal import default_journal_path
+from http_load_test import parse_mix, percentile
+from manager import Manager
+from product_repository import ProductRepository
+from shopping_cart import ShoppingCart
+
+# The default share of each client operation, as relative weights. A reload reads
+# products.csv and its journal from scratch, like a new session starting.
+DEFAULT_CLIENT_MIX = {"reload": 1, "get": 10, "list": 4, "category": 3, "search": 2, "cart": 4}
+
+# The default share of each manager operation. A save is a full compaction
+# (Manager._save_products), the rewrite that concurrent reloads race with.
+DEFAULT_MANAGER_MIX = {"add": 4, "edit": 4, "remove": 2, "save": 1}
+
+# Torn reads kept, per worker, to describe what was seen.
+MAX_SAMPLES = 5
+
+# Seconds allowed for the workers to load the catalog and to report, beyond the test.
+WORKER_GRACE = 120.0
+
+
+class LoadWorker:
+    """
+    One client or manager session, run in its own process.
+
+    Every product name written by the generator or by a manager ends with the
+    product ID, and managers only remove products they added. A client reload
+    checks both facts on the catalog it reads: a generated ID that is missing, a
+    name that does not end with its ID, or an error printed while loading the file
+    or replaying the journal means the read saw a partial or torn catalog.
+
+    Managers remember which of their products should exist at the end, so the
+    harness can tell which changes were lost to another manager's save.
+
+    Attributes:
+        role (str): "client" or "manager".
+        index (int): The number of the worker within its role.
+        filename (str): The shared products CSV file.
+        rows (int): The number of generated products, with IDs 1 to rows.
+
+    Methods:
+        run: Runs operations until a deadline and returns the worker report.
+    """
+
+    def __init__(self, role: str, index: int, filename: str, rows: int, seed: int):
+        """
+        Initializes the LoadWorker and loads the catalog.
+
+        Args:
+            role (str): "client" or "manager".
+            index (int): The number of the worker within its role.
+            filename (str): The shared products CSV file.
+            rows (int): The number of generated products.
+            seed (int): The seed of the random choices.
+        """
+        self.role = role
+        self.index = index
+        self.filename = filename
+        self.rows = rows
+        self._random = random.Random(f"{seed}-{role}-{index}")
+        self._torn = 0
+        self._samples: List[str] = []
+        self._added: List[str] = []
+        self._removed: List[str] = []
+        self._sequence = 0
+        self._cart = ShoppingCart(verbose=False)
+        self.product_repo = self._load()
+        self.manager = Manager(self.product_repo) if role == "manager" else None
+        self._operations: Dict[str, Callable[[], None]] = {
+            "reload": self._reload,
+            "get": self._get,
+            "list": self._list,
+            "category": self._category,
+            "search": self._search,
+            "cart": self._cart_add,
+            "add": self._add,
+            "edit": self._edit,
+            "remove": self._remove,
+            "save": self._save,
+        }
+
+    def _load(self) -> ProductRepository:
+        """
+        Loads the catalog, counting the read as torn if it does not check out.
+
+        Returns:
+            ProductRepository: The loaded repository.
+        """
+        messages = io.StringIO()
+        with redirect_stdout(messages):
+            product_repo = ProductRepository(self.filename, cache_size=0)
+        problems = [line for line in messages.getvalue().splitlines() if line]
+        missing = sum(
+            product_repo.get_by_id(str(product_id)) is None
+            for product_id in range(1, self.rows + 1)
+        )
+        if missing:
+            problems.append(f"{missing} generated products missing")
+        mismatched = [
+            product.product_id
+            for product in product_repo.list_all_products()
+            if not product.name.endswith(f" {product.product_id}")
+        ]
+        if mismatched:
+            problems.append(f"{len(mismatched)} names not matching their ID, e.g. {mismatched[0]}")
+        if problems:
+            self._torn += 1
+            if len(self._samples) < MAX_SAMPLES:
+                self._samples.append("; ".join(problems))
+        return product_repo
+
+    def _product_id(self) -> str:
+        """
+        Returns a random generated product ID.
+
+        Returns:
+            str: The ID.
+        """
+        return str(self._random.randint(1, self.rows))
+
+    def _reload(self):
+        """
+        Replaces the loaded catalog with a fresh read of the shared files.
+
+        Returns:
+            None
+        """
+        self.product_repo = self._load()
+
+    def _get(self):
+        """
+        Looks up a product by ID.
+
+        Returns:
+            None
+        """
+        self.product_repo.get_by_id(self._product_id())
+
+    def _list(self):
+        """
+        Reads the first page of the catalog.
+
+        Returns:
+            None
+        """
+        self.product_repo.list_products_page(20)
+
+    def _category(self):
+        """
+        Reads the first page of the category of a random product.
+
+        Returns:
+            None
+        """
+        product = self.product_repo.get_by_id(self._product_id())
+        if product is not None:
+            self.product_repo.list_products_by_category_page(product.category, 20)
+
+    def _search(self):
+        """
+        Searches for the first word of the name of a random product.
+
+        Returns:
+            None
+        """
+        product = self.product_repo.get_by_id(self._product_id())
+        if product is not None:
+            self.product_repo.search_products(product.name.split()[0])
+
+    def _cart_add(self):
+        """
+        Adds a random product to the cart and prices it, emptying full carts.
+
+        Returns:
+            None
+        """
+        product = self.product_repo.get_by_id(self._product_id())
+        if product is not None:
+            self._cart.add_product(product)
+            self._cart.calculate_total()
+        if len(self._cart.cart_items) >= 50:
+            self._cart.clear()
+
+    def _add(self):
+        """
+        Adds a product of this manager.
+
+        Returns:
+            None
+        """
+        self._sequence += 1
+        product_id = f"lt-{self.index}-{self._sequence}"
+        self.manager.add_product(product_id, f"Load Test {product_id}", "Load Test", 1.0)
+        self._added.append(product_id)
+
+    def _edit(self):
+        """
+        Renames and reprices a generated product, keeping its ID at the end of the name.
+
+        Returns:
+            None
+        """
+        self._sequence += 1
+        product_id = self._product_id()
+        product = self.product_repo.get_by_id(product_id)
+        if product is not None:
+            self.manager.edit_product(
+                product_id,
+                f"Edited {self.index}-{self._sequence} {product_id}",
+                product.category,
+                round(self._random.uniform(5, 3000), 2),
+            )
+
+    def _remove(self):
+        """
+        Removes a random product added by this manager, if there is one.
+
+        Returns:
+            None
+        """
+        if not self._added:
+            return
+        position = self._random.randrange(len(self._added))
+        self._added[position], self._added[-1] = self._added[-1], self._added[position]
+        product_id = self._added.pop()
+        self.manager.remove_product(product_id)
+        self._removed.append(product_id)
+
+    def _save(self):
+        """
+        Folds the journal into products.csv.
+
+        Returns:
+            None
+        """
+        self.manager.compact()
+
+    def run(self, mix: Dict[str, int], deadline: float) -> Dict:
+        """
+        Runs operations drawn from a mix until a deadline.
+
+        Args:
+            mix (Dict[str, int]): The weight of each operation.
+            deadline (float): The time.perf_counter value to stop at.
+
+        Returns:
+            Dict: The worker report: role, index, the latencies and errors of each
+                operation, the torn reads and their samples and, for managers, the
+                products added and removed.
+        """
+        kinds = list(mix)
+        weights = [mix[kind] for kind in kinds]
+        latencies: Dict[str, List[float]] = defaultdict(list)
+        errors: Counter = Counter()
+        messages = io.StringIO()
+        with redirect_stdout(messages):
+            while time.perf_counter() < deadline:
+                for kind in self._random.choices(kinds, weights, k=100):
+                    operation = self._operations[kind]
+                    start = time.perf_counter()
+                    try:
+                        operation()
+                    except Exception as e:
+                        errors[kind] += 1
+                        if len(self._samples) < MAX_SAMPLES:
+                            self._samples.append(f"{kind} raised {e!r}")
+                    latencies[kind].append(time.perf_counter() - start)
+            if self.manager is not None:
+                self.manager.close()
+        return {
+            "role": self.role,
+            "index": self.index,
+            "latencies": dict(latencies),
+            "errors": dict(errors),
+            "torn_reads": self._torn,
+            "samples": self._samples,
+            "added": self._added,
+            "removed": self._removed,
+            "messages": [line for line in messages.getvalue().splitlines() if line][:MAX_SAMPLES],
+        }
+
+
+def run_worker(
+    role: str,
+    index: int,
+    filename: str,
+    rows: int,
+    seed: int,
+    mix: Dict[str, int],
+    duration: float,
+    barrier,
+    results,
+):
+    """Runs one LoadWorker in the current process and puts its report on a queue.
+
+    The worker loads the catalog, waits at the barrier until every worker is ready
+    and then runs for duration seconds. If loading fails, the barrier is aborted, so
+    the other workers and the parent stop waiting and report the failure at once.
+
+    Args:
+        role (str): "client" or "manager".
+        index (int): The number of the worker within its role.
+        filename (str): The shared products CSV file.
+        rows (int): The number of generated products.
+        seed (int): The seed of the random choices.
+        mix (Dict[str, int]): The weight of each operation.
+        duration (float): The seconds to run for.
+        barrier (multiprocessing.Barrier): Releases every worker at once.
+        results (multiprocessing.Queue): Receives the worker report.
+
+    Returns:
+        None
+    """
+    try:
+        worker = LoadWorker(role, index, filename, rows, seed)
+    except Exception as e:
+        barrier.abort()
+        results.put({"role": role, "index": index, "failed": repr(e)})
+        return
+    try:
+        barrier.wait()
+        report = worker.run(mix, time.perf_counter() + duration)
+    except threading.BrokenBarrierError:
+        report = {"role": role, "index": index, "failed": "Not started: a worker failed to load."}
+    except Exception as e:
+        report = {"role": role, "index": index, "failed": repr(e)}
+    results.put(report)
+
+
+class ProcessLoadTest:
+    """
+    Runs client and manager processes against one shared products.csv.
+
+    A catalog of `rows` products is generated with CatalogGenerator, then every
+    worker process loads it and they all start together. Clients mostly read
+    their loaded catalog and reload it from disk now and then; managers change it
+    through Manager, journaling each change, and now and then fold the journal
+    back into the CSV file. Each worker is a LoadWorker.
+
+    The report gives, for each role, the operations, the throughput and the p50,
+    p90, p99 and maximum latency of each operation, plus the torn reads clients
+    saw. At the end the catalog is loaded once more to count the products that
+    managers added and kept but that are missing ("lost"), and the ones they
+    removed that are back ("resurrected"). Saves fold the CSV file on disk and the
+    shared journal under the journal lock, so with any number of managers both
+    counts should be zero; anything else is a change that a save overwrote.
+
+    Attributes:
+        directory (str): Where the shared catalog is written.
+        rows (int): The number of generated products.
+        clients (int): The number of client processes.
+        managers (int): The number of manager processes.
+        duration (float): The seconds each worker runs for.
+        client_mix (Dict[str, int]): The weight of each client operation.
+        manager_mix (Dict[str, int]): The weight of each manager operation.
+        seed (int): The seed of the catalog and of the random choices.
+
+    Methods:
+        run: Runs the test and returns the report.
+    """
+
+    def __init__(
+        self,
+        directory: str = "load_test",
+        rows: int = 10000,
+        clients: int = 4,
+        managers: int = 1,
+        duration: float = 10.0,
+        client_mix: Optional[Dict[str, int]] = None,
+        manager_mix: Optional[Dict[str, int]] = None,
+        seed: int = 0,
+    ):
+        """
+        Initializes the ProcessLoadTest.
+
+        Args:
+            directory (str): Where the shared catalog is written.
+            rows (int): The number of generated products.
+            clients (int): The number of client processes.
+            managers (int): The number of manager processes.
+            duration (float): The seconds each worker runs for.
+            client_mix (Optional[Dict[str, int]]): The weight of each client operation.
+                Defaults to DEFAULT_CLIENT_MIX.
+            manager_mix (Optional[Dict[str, int]]): The weight of each manager
+                operation. Defaults to DEFAULT_MANAGER_MIX.
+            seed (int): The seed of the catalog and of the random choices.
+        """
+        self.directory = directory
+        self.rows = rows
+        self.clients = clients
+        self.managers = managers
+        self.duration = duration
+        self.client_mix = client_mix or dict(DEFAULT_CLIENT_MIX)
+        self.manager_mix = manager_mix or dict(DEFAULT_MANAGER_MIX)
+        self.seed = seed
+        self.filename = os.path.join(directory, "products.csv")
+
+    def _prepare(self):
+        """
+        Writes a fresh catalog, with no journal or snapshot left from an earlier run.
+
+        Returns:
+            None
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        leftovers = (default_journal_path(self.filename), default_snapshot_path(self.filename))
+        for leftover in leftovers:
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        CatalogGenerator(self.rows, seed=self.seed).write(self.filename)
+
+    @staticmethod
+    def _latency_report(latencies: Dict[str, List[float]], elapsed: float) -> Dict:
+        """
+        Summarizes the latencies of the operations of one role.
+
+        Args:
+            latencies (Dict[str, List[float]]): The seconds taken by each call, by operation.
+            elapsed (float): The seconds the workers ran for.
+
+        Returns:
+            Dict: The operations, operations per second and, by operation, the count
+                and the p50, p90, p99 and maximum latency in milliseconds.
+        """
+        operations = sum(len(values) for values in latencies.values())
+        by_kind = {}
+        for kind, values in sorted(latencies.items()):
+            values = sorted(values)
+            by_kind[kind] = {"count": len(values)}
+            by_kind[kind].update(
+                {
+                    name: percentile(values, fraction) * 1000
+                    for name, fraction in (
+                        ("p50_ms", 0.5),
+                        ("p90_ms", 0.9),
+                        ("p99_ms", 0.99),
+                        ("max_ms", 1.0),
+                    )
+                }
+            )
+        return {
+            "operations": operations,
+            "operations_per_second": operations / elapsed if elapsed else 0.0,
+            "by_operation": by_kind,
+        }
+
+    def _check_catalog(self, reports: List[Dict]) -> Dict:
+        """
+        Loads the final catalog and counts the manager changes it does not hold.
+
+        Args:
+            reports (List[Dict]): The worker reports.
+
+        Returns:
+            Dict: The products in the final catalog and the lost and resurrected
+                manager products, with a few of their IDs.
+        """
+        messages = io.StringIO()
+        with redirect_stdout(messages):
+            product_repo = ProductRepository(self.filename, cache_size=0)
+        lost: List[str] = []
+        resurrected: List[str] = []
+        for report in reports:
+            lost.extend(
+                product_id
+                for product_id in report.get("added", [])
+                if product_repo.get_by_id(product_id) is None
+            )
+            resurrected.extend(
+                product_id
+                for product_id in report.get("removed", [])
+                if product_repo.get_by_id(product_id) is not None
+            )
+        return {
+            "products": len(product_repo.list_all_products()),
+            "load_messages": messages.getvalue().splitlines()[:MAX_SAMPLES],
+            "lost_products": len(lost),
+            "lost_samples": lost[:MAX_SAMPLES],
+            "resurrected_products": len(resurrected),
+            "resurrected_samples": resurrected[:MAX_SAMPLES],
+        }
+
+    def run(self) -> Dict:
+        """
+        Runs the test.
+
+        Returns:
+            Dict: The report: the parameters, a section per role with latencies,
+                errors and torn reads, the final catalog check and any workers that
+                failed. If a worker failed to load the catalog, no worker runs and
+                the report holds only the parameters and the failed workers.
+
+        Raises:
+            RuntimeError: If the workers did not all start or report in time.
+        """
+        self._prepare()
+        context = multiprocessing.get_context()
+        workers = [("client", index, self.client_mix) for index in range(self.clients)]
+        workers += [("manager", index, self.manager_mix) for index in range(self.managers)]
+        barrier = context.Barrier(len(workers) + 1)
+        results = context.Queue()
+        processes = [
+            context.Process(
+                target=run_worker,
+                args=(
+                    role,
+                    index,
+                    self.filename,
+                    self.rows,
+                    self.seed,
+                    mix,
+                    self.duration,
+                    barrier,
+                    results,
+                ),
+            )
+            for role, index, mix in workers
+        ]
+        for process in processes:
+            process.start()
+        reports = []
+        started = True
+        try:
+            try:
+                barrier.wait(WORKER_GRACE)
+            except threading.BrokenBarrierError:
+                # A worker failed to load and aborted the barrier (or one is still
+                # loading after WORKER_GRACE); every worker that got there reports.
+                started = False
+            start = time.perf_counter()
+            timeout = (self.duration if started else 0) + WORKER_GRACE
+            for _ in processes:
+                reports.append(results.get(timeout=timeout))
+            elapsed = time.perf_counter() - start
+        except queue.Empty:
+            raise RuntimeError(
+                "The workers did not all start in time."
+                if not started
+                else "The workers did not all report in time."
+            ) from None
+        finally:
+            for process in processes:
+                process.join(1.0)
+                if process.is_alive():
+                    process.terminate()
+
+        report = {
+            "parameters": {
+                "rows": self.rows,
+                "clients": self.clients,
+                "managers": self.managers,
+                "duration_seconds": self.duration,
+                "client_mix": self.client_mix,
+                "manager_mix": self.manager_mix,
+                "seed": self.seed,
+                "cpu_count": os.cpu_count(),
+            },
+            "failed_workers": [
+                {"role": item["role"], "index": item["index"], "error": item["failed"]}
+                for item in reports
+                if "failed" in item
+            ],
+        }
+        if not started:
+            return report
+        reports = [item for item in reports if "failed" not in item]
+        for role in ("client", "manager"):
+            role_reports = [item for item in reports if item["role"] == role]
+            latencies: Dict[str, List[float]] = defaultdict(list)
+            errors: Counter = Counter()
+            for item in role_reports:
+                for kind, values in item["latencies"].items():
+                    latencies[kind].extend(values)
+                errors.update(item["errors"])
+            section = self._latency_report(latencies, min(elapsed, self.duration))
+            section["errors"] = dict(errors)
+            section["torn_reads"] = sum(item["torn_reads"] for item in role_reports)
+            section["samples"] = [
+                sample for item in role_reports for sample in item["samples"]
+            ][:MAX_SAMPLES]
+            report[f"{role}s"] = section
+        report["final_catalog"] = self._check_catalog(reports)
+        return report
+
+
+def main(argv: Optional[List[str]] = None):
+    """Runs a multi-process load test from the command line.
+
+    Args:
+        argv (Optional[List[str]]): The command-line arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(
+        description="Load-test a shared products.csv with client and manager processes."
+    )
+    parser.add_argument("--clients", type=int, default=4, help="the number of client processes")
+    parser.add_argument(
+        "--managers", type=int, default=1, help="the number of manager processes"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=10.0, help="the seconds each process runs for"
+    )
+    parser.add_argument(
+        "--rows", type=parse_count, default=10000, help="the size of the generated catalog"
+    )
+    parser.add_argument(
+        "--client-mix",
+        type=lambda text: parse_mix(text, DEFAULT_CLIENT_MIX),
+        default=None,
+        help="the client operations as kind=weight pairs (default: "
+        + ",".join(f"{kind}={weight}" for kind, weight in DEFAULT_CLIENT_MIX.items())
+        + ")",
+    )
+    parser.add_argument(
+        "--manager-mix",
+        type=lambda text: parse_mix(text, DEFAULT_MANAGER_MIX),
+        default=None,
+        help="the manager operations as kind=weight pairs (default: "
+        + ",".join(f"{kind}={weight}" for kind, weight in DEFAULT_MANAGER_MIX.items())
+        + ")",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="the random seed")
+    parser.add_argument(
+        "--directory", default="load_test", help="where the shared catalog is written"
+    )
+    parser.add_argument("--output", help="write the report to this JSON file")
+    options = parser.parse_args(argv)
+
+    test = ProcessLoadTest(
+        options.directory,
+        options.rows,
+        options.clients,
+        options.managers,
+        options.duration,
+        options.client_mix,
+        options.manager_mix,
+        options.seed,
+    )
+    report = json.dumps(test.run(), indent=2)
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as output:
+            output.write(report + "\n")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -21,15 +21,34 @@ You should have received a copy of the GNU General Public License
 along with Workshop-1. If not, see <https://www.gnu.org/licenses/>. 
 """
 
+from typing import Dict, Optional
+from product_table import ProductTable
+
 
 class Product:
-    """This class represents a product with an ID, name, category, and price."""
+    """This class represents a product with an ID, name, category, price and optional stock.
+
+    A Product is either a plain value or a lightweight view over one row of a ProductTable.
+    Products created directly hold their values in slots of their own, which is as cheap as
+    a tuple; the repository hands out views over its shared table, which hold no data and
+    read or write the table. A plain product added to a repository is bound to the row its
+    values were copied to, so it becomes a view of that row.
+    """
 
-    def __init__(self, product_id: str, name: str, category: str, price: float):
+    __slots__ = ("_table", "_row", "_product_id", "_name", "_category", "_price", "_stock")
+
+    def __init__(
+        self,
+        product_id: str,
+        name: str,
+        category: str,
+        price: float,
+        stock: Optional[int] = None,
+    ):
         """Initializes a new instance of the Product class
 
-        This method sets up the initial state of a Product object by assigning the given values
-        to the instance variables. Each instance represents a product with a unique ID, a name,
+        This method sets up the initial state of a Product object by storing the given values
+        in the instance. Each instance represents a product with a unique ID, a name,
         a category, and a price.
 
         Args:
@@ -37,23 +56,138 @@ class Product:
             name (str): Name of the product.
             category (str): Category to which the product belongs.
             price (float): Price of the product.
+            stock (Optional[int]): Units in stock, or None if stock is not tracked.
 
         Returns:
             None: This method does not return any value. It initializes the object's attributes.
         """
-        self.product_id = product_id
-        self.name = name
-        self.category = category
-        self.price = price
+        self._table = None
+        self._product_id = product_id
+        self._name = name
+        self._category = category
+        self._price = float(price)
+        self._stock = stock
+
+    @classmethod
+    def view(cls, table: ProductTable, row: int) -> "Product":
+        """Returns a Product that reads and writes one row of an existing table.
+
+        Args:
+            table (ProductTable): The table holding the product data.
+            row (int): The row number of the product.
+
+        Returns:
+            Product: A view over the row.
+        """
+        product = cls.__new__(cls)
+        product._table = table
+        product._row = row
+        return product
+
+    def bind(self, table: ProductTable, row: int):
+        """Turns a plain product into a view over the row its values were copied to.
+
+        Products that already are views are left as they are.
+
+        Args:
+            table (ProductTable): The table holding the product data.
+            row (int): The row number of the product.
+
+        Returns:
+            None
+        """
+        if self._table is None:
+            self._table = table
+            self._row = row
+            del self._product_id, self._name, self._category, self._price, self._stock
+
+    @property
+    def product_id(self) -> str:
+        """str: Unique identifier for the product."""
+        if self._table is None:
+            return self._product_id
+        return self._table.product_ids[self._row]
+
+    @property
+    def name(self) -> str:
+        """str: Name of the product."""
+        if self._table is None:
+            return self._name
+        return self._table.name(self._row)
+
+    @name.setter
+    def name(self, name: str):
+        if self._table is None:
+            self._name = name
+        else:
+            self._table.set_name(self._row, name)
+
+    @property
+    def category(self) -> str:
+        """str: Category to which the product belongs."""
+        if self._table is None:
+            return self._category
+        return self._table.category(self._row)
+
+    @category.setter
+    def category(self, category: str):
+        if self._table is None:
+            self._category = category
+        else:
+            self._table.set_category(self._row, category)
+
+    @property
+    def price(self) -> float:
+        """float: Price of the product."""
+        if self._table is None:
+            return self._price
+        return self._table.prices[self._row]
+
+    @price.setter
+    def price(self, price: float):
+        if self._table is None:
+            self._price = float(price)
+        else:
+            self._table.set_price(self._row, price)
+
+    @property
+    def stock(self) -> Optional[int]:
+        """Optional[int]: Units in stock, or None if stock is not tracked."""
+        if self._table is None:
+            return self._stock
+        return self._table.stock(self._row)
+
+    @stock.setter
+    def stock(self, stock: Optional[int]):
+        if self._table is None:
+            self._stock = stock
+        else:
+            self._table.set_stock(self._row, stock)
+
+    def to_dict(self) -> Dict:
+        """Returns the product as a dictionary that can be serialized to JSON.
+
+        Returns:
+            Dict: The product's id, name, category, price and stock (None if not tracked).
+        """
+        return {
+            "id": self.product_id,
+            "name": self.name,
+            "category": self.category,
+            "price": self.price,
+            "stock": self.stock,
+        }
 
     def __str__(self):
         """Returns a string representation of the Product instance.
 
         This method provides a formatted string that includes the product's ID, name, category,
-        and price. It is used to give a description of the Product object,
+        and price, followed by its stock when stock is tracked. It is used to give a description of the Product object,
         making it easier to understand the instance's attributes in a readable format.
 
         Returns:
             str: A string containing the product's ID, name, category, and price.
         """
-        return f"ID: {self.product_id}, Product: {self.name}, Category: {self.category}, Price: {self.price}"
+        text = f"ID: {self.product_id}, Product: {self.name}, Category: {self.category}, Price: {self.price}"
+        stock = self.stock
+        return text if stock is None else f"{text}, Stock: {stock}"
@@ -22,55 +22,585 @@ along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
 """
 
 import csv
-from typing import List
+import os
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from change_journal import ChangeJournal, default_journal_path, stock_entry
+from catalog_snapshot import CatalogSnapshot, default_snapshot_path, open_snapshot
+from metrics import METRICS
+from pagination import decode_cursor, encode_cursor
+from parallel_ingest import PARALLEL_MIN_BYTES, load_table
+from price_index import PriceIndex
 from product import Product
+from product_table import MAX_STOCK, ProductTable, check_stock
+from query_cache import QueryCache
+from search_index import TokenIndex, tokenize
+from striped_lock import StripedLock
+
+
+def parse_stock(value: Optional[str]) -> Optional[int]:
+    """Parses the optional Stock field of a products CSV row.
+
+    Args:
+        value (Optional[str]): The field, or None if the file has no Stock column.
+
+    Returns:
+        Optional[int]: The units in stock, or None if the field is missing or empty.
+
+    Raises:
+        ValueError: If the field is not an integer, or is negative or larger than
+            MAX_STOCK.
+    """
+    if value is None or not value.strip():
+        return None
+    stock = int(value)
+    check_stock(stock)
+    return stock
+
+
+def read_product_rows(
+    filename: str,
+) -> Iterator[Tuple[str, str, str, float, Optional[int]]]:
+    """Yields the rows of a products CSV file as (id, name, category, price, stock) tuples.
+
+    The Stock column is optional; products without one do not track stock and get
+    None. The file is read lazily, so only the row being parsed is held in memory.
+    Errors such as a missing file are raised when the generator is first advanced.
+
+    Args:
+        filename (str): The path to the CSV file with the product data.
+
+    Returns:
+        Iterator[Tuple[str, str, str, float, Optional[int]]]: An iterator over the rows
+            in file order.
+    """
+    with open(filename, newline="") as csvfile:
+        reader = csv.DictReader(csvfile)
+        for row in reader:
+            yield (
+                row["id"],
+                row["Product"],
+                row["Category"],
+                float(row["Price"]),
+                parse_stock(row.get("Stock")),
+            )
+
+
+def read_products(filename: str) -> Iterator[Product]:
+    """Yields the products stored in a CSV file one row at a time.
+
+    The file is read lazily, so only the row being parsed is held in memory. Errors
+    such as a missing file are raised when the generator is first advanced.
+
+    Args:
+        filename (str): The path to the CSV file with the product data.
+
+    Returns:
+        Iterator[Product]: An iterator over the products in file order.
+    """
+    for row in read_product_rows(filename):
+        yield Product(*row)
+
+
+def read_product_batches(filename: str, batch_size: int) -> Iterator[List[Product]]:
+    """Yields the products stored in a CSV file in lists of at most batch_size items.
+
+    Args:
+        filename (str): The path to the CSV file with the product data.
+        batch_size (int): The maximum number of products per batch.
+
+    Returns:
+        Iterator[List[Product]]: An iterator over the batches in file order.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    products = read_products(filename)
+    while True:
+        batch = list(islice(products, batch_size))
+        if not batch:
+            return
+        yield batch
 
 
 class ProductRepository:
     """Manages product data loaded from a CSV file."""
 
-    def __init__(self, filename: str):
+    # Changes only live in memory until a Manager journals or saves them.
+    persists_changes = False
+
+    def __init__(
+        self,
+        filename: str,
+        use_snapshot: bool = False,
+        snapshot_filename: Optional[str] = None,
+        workers: int = 1,
+        cache_size: int = 256,
+    ):
         """Initializes the ProductRepository with a filename and loads the products.
 
         In this method, the filename of the CSV file containing product data is used to
-        load the list of products into the repository.
+        load the list of products into the repository. When use_snapshot is set, the
+        products are read from a binary snapshot of the CSV file instead; the snapshot
+        is rebuilt first if the CSV file is newer, and product names are only decoded
+        the first time they are read. Changes recorded in the change journal next to
+        the CSV file are then replayed on top of the loaded products, under the
+        journal lock held shared, so a compaction by another process is never seen
+        half done.
+
+        The name search index is built by the first search, so loading never pays for
+        tokenizing every product name (and, with a snapshot, decoding it) unless the
+        catalog is searched. The price indexes are built by the first price query, so
+        loading never pays for sorting the catalog by price either.
+
+        With more than one worker, CSV files of at least PARALLEL_MIN_BYTES are split
+        into line-aligned byte ranges that are parsed in a process pool; smaller files
+        are always parsed serially.
+
+        Results of category listings and name searches are kept in an LRU cache of
+        cache_size entries. Each change discards exactly the entries it affects: the
+        listings of the categories whose membership changed and the searches that the
+        old or new name of the product matches.
+
+        Stock levels are guarded by striped per-product locks rather than one lock for
+        the whole catalog, so checkouts of unrelated products never wait for each other.
 
         Args:
             filename (str): The path to the CSV file with the product data.
+            use_snapshot (bool): Whether to load the products from a binary snapshot.
+            snapshot_filename (Optional[str]): The snapshot path. Defaults to the CSV
+                path with a ".snap" suffix.
+            workers (int): The number of processes used to parse the CSV file.
+            cache_size (int): The number of cached query results; 0 disables the cache.
 
         Returns:
             None: This method initializes the repository with the list of products.
         """
         self.filename = filename
-        self.products = self._load_products()
+        self.snapshot_filename = snapshot_filename or default_snapshot_path(filename)
+        self.workers = workers
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._table = ProductTable()
+        self._row_by_id: Dict[str, int] = {}
+        self._rows_by_category: Dict[str, array] = {}
+        self._category_names: Dict[str, str] = {}
+        self._search_index: Optional[TokenIndex] = None
+        self._price_index: Optional[PriceIndex] = None
+        self._price_index_by_category: Dict[str, PriceIndex] = {}
+        self._query_cache = QueryCache(cache_size)
+        self._undo_log: Optional[List[Tuple]] = None
+        self._stock_locks = StripedLock()
+        self.journal = ChangeJournal(default_journal_path(filename))
+        # Shared with other loads, so no compaction runs between reading the CSV
+        # file and replaying the journal.
+        with self.journal.locked(shared=True):
+            if use_snapshot:
+                self._load_snapshot()
+            else:
+                self._index_table(self._load_products())
+            self._replay_journal()
+
+    @property
+    def products(self) -> Iterator[Product]:
+        """Returns the products held by the repository in load order.
+
+        The repository stores its products as rows of a ProductTable, so this property
+        yields a lightweight view over each row only as it is reached. The row numbers
+        are copied first, so products may be added or removed during the iteration.
+
+        Returns:
+            Iterator[Product]: An iterator over all products currently held by the
+                repository.
+        """
+        table = self._table
+        return (Product.view(table, row) for row in list(self._row_by_id.values()))
+
+    @products.setter
+    def products(self, products: List[Product]):
+        """Replaces the products held by the repository and rebuilds its indexes.
+
+        If several products share the same ID, the last one wins. Plain products are
+        bound to their new rows, as with add_product.
+
+        Args:
+            products (List[Product]): The new list of products.
+
+        Returns:
+            None
+        """
+        table = ProductTable()
+        for product in products:
+            row = table.append(
+                product.product_id,
+                product.name,
+                product.category,
+                product.price,
+                product.stock,
+            )
+            product.bind(table, row)
+        self.close()
+        self._index_table(table)
+
+    def _product(self, row: int) -> Product:
+        """Returns a view over one row of the product table.
+
+        Args:
+            row (int): The row number.
+
+        Returns:
+            Product: The product stored in the row.
+        """
+        return Product.view(self._table, row)
+
+    def _index_table(self, table: ProductTable):
+        """Makes a table the repository's storage and rebuilds the ID and category indexes.
+
+        The indexes are built from the ID and category-code columns only, so product
+        names that are still in a snapshot are not decoded. If an ID appears in several
+        rows, the last row wins. The name search index and the price indexes are
+        dropped, to be rebuilt when they are next needed.
+
+        Args:
+            table (ProductTable): The table holding the products.
+
+        Returns:
+            None
+        """
+        self._table = table
+        product_ids = table.product_ids
+        self._row_by_id = dict(zip(product_ids, range(len(product_ids))))
+        live_rows = None
+        if len(self._row_by_id) != len(product_ids):
+            self._row_by_id = {}
+            for row, product_id in enumerate(product_ids):
+                self._row_by_id.pop(product_id, None)
+                self._row_by_id[product_id] = row
+            live_rows = set(self._row_by_id.values())
+
+        self._rows_by_category = {}
+        self._category_names = {}
+        rows_by_code: List[List[int]] = [[] for _ in table.categories]
+        for row, code in enumerate(table.category_codes):
+            if live_rows is None or row in live_rows:
+                rows_by_code[code].append(row)
+        for category, rows in zip(table.categories, rows_by_code):
+            if not rows:
+                continue
+            key = self._category_key(category)
+            self._category_names.setdefault(key, category)
+            bucket = self._rows_by_category.get(key)
+            if bucket is None:
+                self._rows_by_category[key] = array("q", rows)
+            else:
+                # Spellings that differ only in case share a bucket; keep it sorted.
+                bucket.extend(rows)
+                self._rows_by_category[key] = array("q", sorted(bucket))
+        self._search_index = None
+        self._price_index = None
+        self._price_index_by_category = {}
+        self._query_cache.clear()
+
+    def _build_search_index(self):
+        """Builds the name search index from the products currently in the repository.
+
+        Returns:
+            None
+        """
+        table = self._table
+        self._search_index = TokenIndex(
+            (row, table.name(row)) for row in self._row_by_id.values()
+        )
+
+    def _build_price_indexes(self):
+        """Builds the global and per-category price indexes with one sort.
+
+        The rows are sorted by price once; a stable sort over rows in increasing order
+        keeps equal prices in catalog order, and each category index is then filled by
+        walking the sorted rows.
+
+        Returns:
+            None
+        """
+        table = self._table
+        prices = table.prices
+        rows = sorted(self._row_by_id.values(), key=prices.__getitem__)
+        self._price_index = PriceIndex.from_rows(prices, rows)
+        keys = [self._category_key(category) for category in table.categories]
+        rows_by_category: Dict[str, List[int]] = {}
+        codes = table.category_codes
+        for row in rows:
+            key = keys[codes[row]]
+            bucket = rows_by_category.get(key)
+            if bucket is None:
+                bucket = rows_by_category[key] = []
+            bucket.append(row)
+        self._price_index_by_category = {
+            key: PriceIndex.from_rows(prices, bucket)
+            for key, bucket in rows_by_category.items()
+        }
+
+    def _index_price(self, row: int, category: str, price: float):
+        """Adds a row to the price indexes, if they have been built.
+
+        Args:
+            row (int): The row number of the product.
+            category (str): The category of the product.
+            price (float): The price of the product.
+
+        Returns:
+            None
+        """
+        if self._price_index is None:
+            return
+        self._price_index.add(price, row)
+        key = self._category_key(category)
+        index = self._price_index_by_category.get(key)
+        if index is None:
+            index = self._price_index_by_category[key] = PriceIndex()
+        index.add(price, row)
+
+    def _unindex_price(self, row: int, category: str, price: float):
+        """Removes a row from the price indexes, if they have been built.
+
+        Args:
+            row (int): The row number of the product.
+            category (str): The category the row was indexed with.
+            price (float): The price the row was indexed with.
+
+        Returns:
+            None
+        """
+        if self._price_index is None:
+            return
+        self._price_index.remove(price, row)
+        key = self._category_key(category)
+        index = self._price_index_by_category.get(key)
+        if index is not None:
+            index.remove(price, row)
+            if not index:
+                del self._price_index_by_category[key]
+
+    def _link_row(self, row: int):
+        """Adds a row of the product table to every index.
+
+        Args:
+            row (int): The row number of the product.
+
+        Returns:
+            None
+        """
+        table = self._table
+        self._row_by_id[table.product_ids[row]] = row
+        self._index_category(row, table.category(row))
+        self._index_price(row, table.category(row), table.prices[row])
+        self._index_name(row, table.name(row))
 
-    def _load_products(self) -> List[Product]:
+    def _unlink_row(self, row: int):
+        """Removes a row of the product table from every index.
+
+        The row itself keeps its values.
+
+        Args:
+            row (int): The row number of the product.
+
+        Returns:
+            None
+        """
+        table = self._table
+        del self._row_by_id[table.product_ids[row]]
+        self._unindex_category(row, table.category(row))
+        self._unindex_price(row, table.category(row), table.prices[row])
+        self._unindex_name(row, table.name(row))
+
+    def _invalidate_searches(self, name: str):
+        """Discards the cached searches whose query matches a product name.
+
+        Those are exactly the searches whose result gains or loses the product when it
+        is added, removed or renamed.
+
+        Args:
+            name (str): The name of the product.
+
+        Returns:
+            None
+        """
+        tokens = tokenize(name)
+
+        def matches(key: Tuple) -> bool:
+            if key[0] != "search":
+                return False
+            _, terms, prefix = key
+            return all(
+                any(token.startswith(term) if prefix else token == term for token in tokens)
+                for term in terms
+            )
+
+        self._query_cache.discard_if(matches)
+
+    def _index_name(self, row: int, name: str):
+        """Adds a row to the name search index, if it has been built.
+
+        Args:
+            row (int): The row number of the product.
+            name (str): The name of the product.
+
+        Returns:
+            None
+        """
+        if self._search_index is not None:
+            self._search_index.add(row, name)
+            self._invalidate_searches(name)
+
+    def _unindex_name(self, row: int, name: str):
+        """Removes a row from the name search index, if it has been built.
+
+        Args:
+            row (int): The row number of the product.
+            name (str): The name the row was indexed with.
+
+        Returns:
+            None
+        """
+        if self._search_index is not None:
+            self._search_index.remove(row, name)
+            self._invalidate_searches(name)
+
+    @staticmethod
+    def _category_key(category: str) -> str:
+        """Returns the key under which a category is stored in the category index.
+
+        Args:
+            category (str): The category name as written by the user or in the CSV file.
+
+        Returns:
+            str: The case-folded category name.
+        """
+        return category.casefold()
+
+    def _index_category(self, row: int, category: str):
+        """Adds a row to the category index.
+
+        Each category keeps its rows sorted, that is, in catalog order. The first
+        spelling seen for a category is kept as its display name.
+
+        Args:
+            row (int): The row number of the product.
+            category (str): The category of the product.
+
+        Returns:
+            None
+        """
+        key = self._category_key(category)
+        self._query_cache.discard(("category", key))
+        bucket = self._rows_by_category.get(key)
+        if bucket is None:
+            bucket = self._rows_by_category[key] = array("q")
+            self._category_names[key] = category
+        insort(bucket, row)
+
+    def _unindex_category(self, row: int, category: str):
+        """Removes a row from the category index.
+
+        Categories left without products are dropped from the index.
+
+        Args:
+            row (int): The row number of the product.
+            category (str): The category of the product.
+
+        Returns:
+            None
+        """
+        key = self._category_key(category)
+        self._query_cache.discard(("category", key))
+        bucket = self._rows_by_category.get(key)
+        if bucket is None:
+            return
+        position = bisect_left(bucket, row)
+        if position < len(bucket) and bucket[position] == row:
+            del bucket[position]
+        if not bucket:
+            del self._rows_by_category[key]
+            del self._category_names[key]
+
+    def _load_snapshot(self):
+        """Loads the products from the binary snapshot of the CSV file.
+
+        The price and category columns are copied out of the memory-mapped snapshot,
+        while product names are decoded only when they are first read. If the snapshot
+        cannot be built or opened, an error message is printed and the repository is
+        left empty.
+
+        Returns:
+            None
+        """
+        try:
+            snapshot = open_snapshot(self.filename, self.snapshot_filename)
+        except FileNotFoundError:
+            print(f"Error: The file '{self.filename}' was not found.")
+            return
+        except Exception as e:
+            print(f"An error occurred while loading products: {e}")
+            return
+        self._snapshot = snapshot
+        if METRICS.enabled:
+            METRICS.count_bytes("repository.load", read=os.path.getsize(self.snapshot_filename))
+        self._index_table(ProductTable.from_snapshot(snapshot))
+
+    def close(self):
+        """Releases the snapshot backing the repository, if any.
+
+        Every pending product name is decoded first, so the repository keeps working
+        after the snapshot is closed.
+
+        Returns:
+            None
+        """
+        if self._snapshot is None:
+            return
+        self._table.detach()
+        self._snapshot.close()
+        self._snapshot = None
+
+    def _load_products(self) -> ProductTable:
         """Loads products from the CSV file.
 
         In this method, the products are read from the specified CSV file and parsed
-        into a list of Product objects. If the file is not found or another error occurs,
+        into the rows of a ProductTable. If the file is not found or another error occurs,
         an error message is printed.
 
         Returns:
-            List[Product]: A list containing the products loaded from the file.
+            ProductTable: A table containing the products loaded from the file.
         """
-        products = []
+        table = ProductTable()
         try:
-            with open(self.filename, newline="") as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    product = Product(
-                        product_id=row["id"],
-                        name=row["Product"],
-                        category=row["Category"],
-                        price=float(row["Price"]),
-                    )
-                    products.append(product)
+            if METRICS.enabled:
+                METRICS.count_bytes("repository.load", read=os.path.getsize(self.filename))
+            if self.workers > 1 and os.path.getsize(self.filename) >= PARALLEL_MIN_BYTES:
+                table = load_table(self.filename, self.workers)
+            else:
+                for row in read_product_rows(self.filename):
+                    table.append(*row)
         except FileNotFoundError:
             print(f"Error: The file '{self.filename}' was not found.")
         except Exception as e:
             print(f"An error occurred while loading products: {e}")
-        return products
+        return table
+
+    def _replay_journal(self):
+        """Applies the changes recorded in the change journal to the loaded products.
+
+        If the journal cannot be read, an error message is printed and the changes
+        replayed so far are kept.
+
+        Returns:
+            None
+        """
+        try:
+            self.journal.replay(self)
+        except Exception as e:
+            print(f"An error occurred while replaying the change journal: {e}")
 
     def list_all_products(self) -> List[Product]:
         """Returns a list of all products.
@@ -80,13 +610,73 @@ class ProductRepository:
         Returns:
             List[Product]: A list of all products currently loaded in the repository.
         """
-        return self.products
+        return list(self.products)
+
+    def product_rows(self) -> Iterator[Tuple[str, str, str, float, Optional[int]]]:
+        """Yields the products as (id, name, category, price, stock) tuples in load order.
+
+        The values are read straight from the product table, without building a
+        Product for each row, in the same form as read_product_rows.
+
+        Returns:
+            Iterator[Tuple[str, str, str, float, Optional[int]]]: An iterator over the
+                rows of all products currently held by the repository.
+        """
+        table = self._table
+        prices = table.prices
+        for row in list(self._row_by_id.values()):
+            yield (
+                table.product_ids[row],
+                table.name(row),
+                table.category(row),
+                prices[row],
+                table.stock(row),
+            )
+
+    def get_by_id(self, product_id: str) -> Optional[Product]:
+        """Returns the product with the given ID.
+
+        The lookup goes through the ID index, so it takes constant time regardless of
+        the size of the catalog.
+
+        Args:
+            product_id (str): The unique identifier of the product.
+
+        Returns:
+            Optional[Product]: The matching product, or None if there is no such product.
+        """
+        row = self._row_by_id.get(product_id)
+        return None if row is None else self._product(row)
+
+    def rows_of(self, product_ids: List[str]) -> array:
+        """Returns the table rows of several products, for bulk access to the columns.
+
+        Args:
+            product_ids (List[str]): The product IDs.
+
+        Returns:
+            array: The row of each product, or -1 for IDs that are not in the catalog.
+        """
+        row_by_id = self._row_by_id
+        return array("q", [row_by_id.get(product_id, -1) for product_id in product_ids])
+
+    def price_column(self) -> array:
+        """Returns the price column of the product table, indexed by row.
+
+        The column is returned without copying it; it must not be modified.
+
+        Returns:
+            array: The prices, as C doubles.
+        """
+        return self._table.prices
 
     def list_products_by_category(self, category: str) -> List[Product]:
         """Returns a list of products filtered by the specified category.
 
-        This method filters the products by the specified category, performing a case-insensitive
-        comparison to return only the products that belong to that category.
+        The category is looked up case-insensitively in the category index, so the cost
+        of this method depends only on the number of products in that category. The
+        result is cached until a product joins or leaves the category; the products are
+        views, so edits to their name or price show up without invalidating it.
 
         Args:
             category (str): The category to filter the products by.
@@ -94,8 +684,530 @@ class ProductRepository:
         Returns:
             List[Product]: A list of products that match the specified category.
         """
-        return [
-            product
-            for product in self.products
-            if product.category.lower() == category.lower()
-        ]
+        key = ("category", self._category_key(category))
+        products = self._query_cache.get(key)
+        if products is None:
+            bucket = self._rows_by_category.get(key[1])
+            products = [self._product(row) for row in bucket] if bucket else []
+            self._query_cache.put(key, products)
+        return list(products)
+
+    def list_products_page(
+        self, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Product], Optional[str]]:
+        """Returns one page of the catalog, in the order of list_all_products.
+
+        The cursor remembers the row of the last product returned, so the next page
+        resumes from there directly: a page costs the same whatever its position, and
+        products added or removed between pages neither repeat nor shift the listing.
+
+        Args:
+            limit (int): The maximum number of products in the page.
+            cursor (Optional[str]): The cursor returned with the previous page, or None
+                for the first page.
+
+        Returns:
+            Tuple[List[Product], Optional[str]]: The products of the page and the cursor
+                of the next page, which is None after the last page.
+
+        Raises:
+            ValueError: If limit is less than 1 or the cursor is invalid.
+        """
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        table = self._table
+        product_ids = table.product_ids
+        row_by_id = self._row_by_id
+        rows: List[int] = []
+        row = decode_cursor(cursor) + 1
+        # Rows are in catalog order; removed rows and rows replaced by a later row
+        # with the same ID are skipped.
+        while row < len(product_ids):
+            if row_by_id.get(product_ids[row]) == row:
+                if len(rows) == limit:
+                    return [self._product(row) for row in rows], encode_cursor(rows[-1])
+                rows.append(row)
+            row += 1
+        return [self._product(row) for row in rows], None
+
+    def list_products_by_category_page(
+        self, category: str, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Product], Optional[str]]:
+        """Returns one page of a category, in the order of list_products_by_category.
+
+        The start of the page is found by binary search in the category index.
+
+        Args:
+            category (str): The category to filter the products by.
+            limit (int): The maximum number of products in the page.
+            cursor (Optional[str]): The cursor returned with the previous page, or None
+                for the first page.
+
+        Returns:
+            Tuple[List[Product], Optional[str]]: The products of the page and the cursor
+                of the next page, which is None after the last page.
+
+        Raises:
+            ValueError: If limit is less than 1 or the cursor is invalid.
+        """
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        bucket = self._rows_by_category.get(self._category_key(category))
+        if not bucket:
+            return [], None
+        start = bisect_right(bucket, decode_cursor(cursor))
+        rows = bucket[start:start + limit]
+        next_cursor = encode_cursor(rows[-1]) if start + limit < len(bucket) else None
+        return [self._product(row) for row in rows], next_cursor
+
+    def list_categories(self) -> Dict[str, int]:
+        """Returns the categories in the repository with the number of products in each.
+
+        Categories that differ only in case are reported once, under the first spelling
+        that was loaded or added.
+
+        Returns:
+            Dict[str, int]: A mapping from category name to product count.
+        """
+        return {
+            self._category_names[key]: len(bucket)
+            for key, bucket in self._rows_by_category.items()
+        }
+
+    def search_products(
+        self, query: str, prefix: bool = True, limit: Optional[int] = None
+    ) -> List[Product]:
+        """Returns the products whose name contains every word of the query.
+
+        Words are compared case-insensitively through the name search index, so the
+        cost depends on the number of matches rather than on the size of the catalog.
+        With prefix matching, each query word may match the start of a name word, so
+        "gam lap" finds "Gaming Laptop". The sorted matches are cached until a product
+        whose name matches the query is added, removed or renamed.
+
+        Args:
+            query (str): The words to look for, in any order.
+            prefix (bool): Whether query words may match the start of name words.
+            limit (Optional[int]): The maximum number of products to return.
+
+        Returns:
+            List[Product]: The matching products in catalog order.
+        """
+        # AND queries do not depend on word order or repetition.
+        key = ("search", tuple(sorted(tokenize(query))), prefix)
+        rows = self._query_cache.get(key)
+        if rows is None:
+            if self._search_index is None:
+                self._build_search_index()
+            rows = sorted(self._search_index.search(query, prefix))
+            self._query_cache.put(key, rows)
+        if limit is not None:
+            rows = rows[:limit]
+        return [self._product(row) for row in rows]
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Returns the counters of the query result cache.
+
+        Returns:
+            Dict[str, int]: The hits, misses, evictions, invalidations, size and
+                capacity of the cache.
+        """
+        return self._query_cache.stats()
+
+    def _price_index_for(self, category: Optional[str]) -> Optional[PriceIndex]:
+        """Returns the price index of a category, or the global one.
+
+        The price indexes are built on first use.
+
+        Args:
+            category (Optional[str]): The category, or None for the whole catalog.
+
+        Returns:
+            Optional[PriceIndex]: The index, or None if the category has no products.
+        """
+        if self._price_index is None:
+            self._build_price_indexes()
+        if category is None:
+            return self._price_index
+        return self._price_index_by_category.get(self._category_key(category))
+
+    def products_in_price_range(
+        self, low: float, high: float, category: Optional[str] = None
+    ) -> List[Product]:
+        """Returns the products whose price is between low and high, both included.
+
+        The bounds are found by binary search in the price index, so the cost depends on
+        the number of products returned rather than on the size of the catalog.
+
+        Args:
+            low (float): The lowest price.
+            high (float): The highest price.
+            category (Optional[str]): Restricts the search to one category, compared
+                case-insensitively.
+
+        Returns:
+            List[Product]: The matching products, from the cheapest up.
+        """
+        index = self._price_index_for(category)
+        if index is None:
+            return []
+        return [self._product(row) for row in index.between(low, high)]
+
+    def cheapest(self, k: int, category: Optional[str] = None) -> List[Product]:
+        """Returns the k cheapest products.
+
+        Args:
+            k (int): The number of products to return.
+            category (Optional[str]): Restricts the search to one category, compared
+                case-insensitively.
+
+        Returns:
+            List[Product]: At most k products, from the cheapest up.
+        """
+        index = self._price_index_for(category)
+        if index is None:
+            return []
+        return [self._product(row) for row in index.smallest(k)]
+
+    def most_expensive(self, k: int, category: Optional[str] = None) -> List[Product]:
+        """Returns the k most expensive products.
+
+        Args:
+            k (int): The number of products to return.
+            category (Optional[str]): Restricts the search to one category, compared
+                case-insensitively.
+
+        Returns:
+            List[Product]: At most k products, from the most expensive down.
+        """
+        index = self._price_index_for(category)
+        if index is None:
+            return []
+        return [self._product(row) for row in index.largest(k)]
+
+    def add_product(self, product: Product) -> bool:
+        """Adds a product to the repository and indexes it by ID, category and name.
+
+        The product's values are copied into a new row of the repository's table, and a
+        plain product is bound to that row, so it reads and writes the catalog from then on.
+
+        Args:
+            product (Product): The product to add.
+
+        Returns:
+            bool: True if the product was added, False if its ID is already in use.
+
+        Raises:
+            ValueError: If the product's stock is negative or larger than MAX_STOCK.
+        """
+        check_stock(product.stock)
+        if product.product_id in self._row_by_id:
+            return False
+        row = self._table.append(
+            product.product_id, product.name, product.category, product.price, product.stock
+        )
+        product.bind(self._table, row)
+        self._link_row(row)
+        if self._undo_log is not None:
+            self._undo_log.append(("add", product.product_id))
+        return True
+
+    def update_product(
+        self, product_id: str, name: str, category: str, price: float
+    ) -> Optional[Product]:
+        """Updates the name, category and price of an existing product.
+
+        Args:
+            product_id (str): The unique identifier of the product to update.
+            name (str): The updated name of the product.
+            category (str): The updated category of the product.
+            price (float): The updated price of the product.
+
+        Returns:
+            Optional[Product]: The updated product, or None if there is no such product.
+        """
+        row = self._row_by_id.get(product_id)
+        if row is None:
+            return None
+        product = self._product(row)
+        if self._undo_log is not None:
+            self._undo_log.append(
+                ("update", product_id, product.name, product.category, product.price)
+            )
+        category_changed = self._category_key(category) != self._category_key(product.category)
+        if category_changed or float(price) != product.price:
+            # Only this entry moves; the rest of each price index stays sorted.
+            self._unindex_price(row, product.category, product.price)
+            self._index_price(row, category, float(price))
+        if category_changed:
+            self._unindex_category(row, product.category)
+            self._index_category(row, category)
+        if name != product.name:
+            self._unindex_name(row, product.name)
+            self._index_name(row, name)
+        product.category = category
+        product.name = name
+        product.price = price
+        return product
+
+    def set_stock(
+        self, product_id: str, stock: Optional[int], journaled: bool = False
+    ) -> Optional[Product]:
+        """Sets the number of units in stock of a product.
+
+        With journaled set, the new level is queued on the change journal while the
+        product's stock lock is held, like the levels of reserve_stock, so replaying
+        the journal never puts an older level back over a later reservation. It is
+        written once the lock is released.
+
+        Args:
+            product_id (str): The unique identifier of the product.
+            stock (Optional[int]): The new units in stock, or None to stop tracking stock.
+            journaled (bool): Whether to journal the new level.
+
+        Returns:
+            Optional[Product]: The updated product, or None if there is no such product.
+
+        Raises:
+            ValueError: If stock is negative or larger than MAX_STOCK.
+            OSError: If the journal cannot be written; the level is set and its entry
+                stays queued for the next journal write.
+        """
+        check_stock(stock)
+        row = self._row_by_id.get(product_id)
+        if row is None:
+            return None
+        with self._stock_locks.holding([product_id]):
+            if self._undo_log is not None:
+                self._undo_log.append(
+                    ("stock", product_id, self._table.stock(row), stock, journaled)
+                )
+            self._table.set_stock(row, stock)
+            if journaled:
+                queued = self.journal.enqueue(stock_entry(product_id, stock))
+        if journaled:
+            self.journal.write_queued(queued)
+        return self._product(row)
+
+    def _undo_stock(
+        self, product_id: str, old: Optional[int], new: Optional[int], journaled: bool
+    ):
+        """Undoes a set_stock, keeping the units reserved or released since.
+
+        Args:
+            product_id (str): The unique identifier of the product.
+            old (Optional[int]): The stock level before set_stock.
+            new (Optional[int]): The stock level set_stock set.
+            journaled (bool): Whether set_stock journaled the level.
+
+        Returns:
+            None
+        """
+        row = self._row_by_id.get(product_id)
+        if row is None:
+            return
+        with self._stock_locks.holding([product_id]):
+            stock = self._table.stock(row)
+            if old is not None and new is not None and stock is not None:
+                old = min(max(old + stock - new, 0), MAX_STOCK)
+            self._table.set_stock(row, old)
+            if journaled:
+                queued = self.journal.enqueue(stock_entry(product_id, old))
+        if journaled:
+            self.journal.write_queued(queued)
+
+    def reserve_stock(self, lines: Iterable[Tuple[str, int]]) -> Dict[str, int]:
+        """Takes the units of a whole order out of stock, or none of them.
+
+        The stock locks of every product in the order are held while the levels are
+        checked and decremented, so concurrent orders for the same product cannot
+        oversell it, while orders for other products go ahead in parallel. Products
+        that do not track stock are always available. Checkouts do not go through a
+        Manager, so the new levels are journaled here: they are queued before the
+        locks are released, which keeps the journal in the order the levels changed,
+        and written after, so orders never hold a stock lock during journal I/O.
+
+        Args:
+            lines (Iterable[Tuple[str, int]]): The (product_id, quantity) pairs of the
+                order. A product may appear more than once.
+
+        Returns:
+            Dict[str, int]: The new stock level of every product that tracks stock.
+
+        Raises:
+            ValueError: If a product is not in the catalog or has fewer units in stock
+                than ordered; no stock is taken then.
+        """
+        demand: Dict[str, int] = {}
+        for product_id, quantity in lines:
+            demand[product_id] = demand.get(product_id, 0) + quantity
+        return self._change_stock(demand, -1)
+
+    def release_stock(self, lines: Iterable[Tuple[str, int]]) -> Dict[str, int]:
+        """Puts the units of an order reserved with reserve_stock back in stock.
+
+        Args:
+            lines (Iterable[Tuple[str, int]]): The (product_id, quantity) pairs of the
+                order.
+
+        Returns:
+            Dict[str, int]: The new stock level of every product that tracks stock.
+
+        Raises:
+            ValueError: If a product is not in the catalog.
+        """
+        supply: Dict[str, int] = {}
+        for product_id, quantity in lines:
+            supply[product_id] = supply.get(product_id, 0) + quantity
+        return self._change_stock(supply, 1)
+
+    def _change_stock(self, quantities: Dict[str, int], sign: int) -> Dict[str, int]:
+        """Adds or takes quantities to or from the stock of several products at once.
+
+        Args:
+            quantities (Dict[str, int]): The quantity of each product.
+            sign (int): 1 to add the quantities, -1 to take them.
+
+        Returns:
+            Dict[str, int]: The new stock level of every product that tracks stock.
+
+        Raises:
+            ValueError: If a product is not in the catalog, a quantity is negative or
+                larger than MAX_STOCK, or the new level would be negative or larger
+                than MAX_STOCK; no level is changed then.
+            OSError: If the journal cannot be written; the quantities are put back.
+        """
+        for product_id, quantity in quantities.items():
+            if not 0 <= quantity <= MAX_STOCK:
+                raise ValueError(f"Invalid quantity of product {product_id}: {quantity}")
+        table = self._table
+        stocks = table.stocks
+        with self._stock_locks.holding(quantities):
+            rows = []
+            for product_id, quantity in quantities.items():
+                row = self._row_by_id.get(product_id)
+                if row is None:
+                    raise ValueError(f"No product found with ID: {product_id}")
+                stock = table.stock(row)
+                if stock is None:
+                    continue
+                if sign < 0 and stock < quantity:
+                    raise ValueError(
+                        f"Not enough stock of '{table.name(row)}': "
+                        f"{stock} left, {quantity} ordered."
+                    )
+                if sign > 0 and stock + quantity > MAX_STOCK:
+                    raise ValueError(f"Stock of '{table.name(row)}' cannot exceed {MAX_STOCK}.")
+                rows.append((product_id, row, stock))
+            levels = {}
+            for product_id, row, stock in rows:
+                levels[product_id] = stocks[row] = stock + sign * quantities[product_id]
+            if not levels:
+                return levels
+            queued = self.journal.enqueue(
+                *(stock_entry(product_id, level) for product_id, level in levels.items())
+            )
+        try:
+            self.journal.write_queued(queued)
+        except BaseException:
+            # Other orders may have changed the levels since, so undo by the quantity.
+            # The queued entries are written later, followed by these.
+            with self._stock_locks.holding(levels):
+                restored = []
+                for product_id, row, _ in rows:
+                    stock = table.stock(row)
+                    if stock is not None:
+                        stock = min(max(stock - sign * quantities[product_id], 0), MAX_STOCK)
+                        stocks[row] = stock
+                        restored.append(stock_entry(product_id, stock))
+                self.journal.enqueue(*restored)
+            raise
+        return levels
+
+    def remove_product(self, product_id: str) -> Optional[Product]:
+        """Removes a product from the repository and from its indexes.
+
+        The row keeps its values, so views handed out earlier (for example, products
+        already in a shopping cart) stay readable.
+
+        Args:
+            product_id (str): The unique identifier of the product to remove.
+
+        Returns:
+            Optional[Product]: The removed product, or None if there is no such product.
+        """
+        row = self._row_by_id.get(product_id)
+        if row is None:
+            return None
+        self._unlink_row(row)
+        if self._undo_log is not None:
+            self._undo_log.append(("remove", product_id, row))
+        return self._product(row)
+
+    def begin(self):
+        """Starts recording changes so that they can be undone with rollback.
+
+        Returns:
+            None
+
+        Raises:
+            RuntimeError: If a transaction is already in progress.
+        """
+        if self._undo_log is not None:
+            raise RuntimeError("A transaction is already in progress.")
+        self._undo_log = []
+
+    def commit(self):
+        """Keeps the changes made since begin and stops recording them.
+
+        Returns:
+            None
+        """
+        self._undo_log = None
+
+    def rollback(self):
+        """Undoes every change made since begin, newest first.
+
+        Removed products are put back in the rows they came from, so the listing
+        order of the catalog is the same as before the transaction. Stock levels are
+        moved back by the amount set_stock changed them, so units reserved by orders
+        during the transaction stay reserved.
+
+        Returns:
+            None
+        """
+        undo_log, self._undo_log = self._undo_log or [], None
+        restored = False
+        for change in reversed(undo_log):
+            if change[0] == "add":
+                self.remove_product(change[1])
+            elif change[0] == "update":
+                self.update_product(*change[1:])
+            elif change[0] == "stock":
+                self._undo_stock(*change[1:])
+            else:
+                self._link_row(change[2])
+                restored = True
+        if restored:
+            # Rows are indexed in increasing order; re-adding removed rows broke it.
+            self._row_by_id = dict(sorted(self._row_by_id.items(), key=itemgetter(1)))
+
+
+METRICS.register(
+    ProductRepository,
+    {
+        "__init__": "repository.load",
+        "list_all_products": "repository.list_all_products",
+        "get_by_id": "repository.get_by_id",
+        "list_products_by_category": "repository.list_products_by_category",
+        "list_products_page": "repository.list_products_page",
+        "list_products_by_category_page": "repository.list_products_by_category_page",
+        "search_products": "repository.search_products",
+        "add_product": "repository.add_product",
+        "update_product": "repository.update_product",
+        "remove_product": "repository.remove_product",
+        "set_stock": "repository.set_stock",
+        "reserve_stock": "repository.reserve_stock",
+        "release_stock": "repository.release_stock",
+    },
+)
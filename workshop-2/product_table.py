@@ -0,0 +1,333 @@
+"""
+This module contains the ProductTable class which stores product
+data column by column, so the repository does not need one Python
+object per product.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from array import array
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from catalog_snapshot import CatalogSnapshot
+
+# Stored in the stock column of products whose stock is not tracked.
+NO_STOCK = -1
+
+# The largest stock level or quantity the stock column (C long longs) can hold.
+MAX_STOCK = 2**63 - 1
+
+
+def check_stock(stock: Optional[int]):
+    """
+    Checks that a stock level fits the stock column.
+
+    Args:
+        stock (Optional[int]): The units in stock, or None if stock is not tracked.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If stock is negative or larger than MAX_STOCK.
+    """
+    if stock is None:
+        return
+    if stock < 0:
+        raise ValueError("Stock cannot be negative.")
+    if stock > MAX_STOCK:
+        raise ValueError(f"Stock cannot be larger than {MAX_STOCK}.")
+
+
+class ProductTable:
+    """
+    Columnar storage for product data.
+
+    Each product is a row number. Prices are kept in an array of C doubles and
+    categories in an array of unsigned ints that index a table of interned
+    category names, so neither needs a Python object per row. Stock levels are
+    kept in an array of C long longs, with NO_STOCK marking products whose stock
+    is not tracked. IDs and names are kept in plain lists of strings.
+
+    A table opened from a CatalogSnapshot copies the price and category
+    columns out of the snapshot and decodes product names only when they are
+    first read.
+
+    Attributes:
+        product_ids (List[str]): The product ID column.
+        names (List[Optional[str]]): The name column. None marks a name that has
+            not been decoded from the snapshot yet.
+        prices (array): The price column, as C doubles.
+        stocks (array): The stock column, as C long longs; NO_STOCK if untracked.
+        category_codes (array): The category column, as indexes into categories.
+        categories (List[str]): The interned category names.
+
+    Methods:
+        append: Adds a row and returns its number.
+        extend: Adds a block of rows given column by column.
+        name: Returns the name of a row.
+        category: Returns the category name of a row.
+        set_name: Changes the name of a row.
+        set_category: Changes the category of a row.
+        set_price: Changes the price of a row.
+        stock: Returns the stock level of a row.
+        set_stock: Changes the stock level of a row.
+        intern_category: Returns the code of a category name.
+        detach: Decodes every pending name and drops the snapshot.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty ProductTable.
+        """
+        self.product_ids: List[str] = []
+        self.names: List[Optional[str]] = []
+        self.prices = array("d")
+        self.stocks = array("q")
+        self.category_codes = array("I")
+        self.categories: List[str] = []
+        self._category_codes: Dict[str, int] = {}
+        self._snapshot: Optional["CatalogSnapshot"] = None
+
+    @classmethod
+    def from_snapshot(cls, snapshot: "CatalogSnapshot") -> "ProductTable":
+        """
+        Builds a table over the rows of a catalog snapshot.
+
+        The snapshot must stay open until detach is called, because product names
+        are decoded from it on demand.
+
+        Args:
+            snapshot (CatalogSnapshot): The snapshot to read.
+
+        Returns:
+            ProductTable: A table with one row per snapshot row.
+        """
+        table = cls()
+        table.product_ids = snapshot.product_ids()
+        table.names = [None] * len(snapshot)
+        with snapshot.prices.cast("B") as raw_prices:
+            table.prices.frombytes(raw_prices)
+        with snapshot.stocks.cast("B") as raw_stocks:
+            table.stocks.frombytes(raw_stocks)
+        with snapshot.category_codes.cast("B") as raw_codes:
+            table.category_codes.frombytes(raw_codes)
+        for category in snapshot.categories:
+            table.intern_category(category)
+        table._snapshot = snapshot
+        return table
+
+    def __len__(self) -> int:
+        """
+        Returns the number of rows in the table, including rows no longer in use.
+
+        Returns:
+            int: The row count.
+        """
+        return len(self.product_ids)
+
+    def intern_category(self, category: str) -> int:
+        """
+        Returns the code of a category name, assigning a new one if needed.
+
+        Args:
+            category (str): The category name.
+
+        Returns:
+            int: The category code.
+        """
+        code = self._category_codes.get(category)
+        if code is None:
+            code = self._category_codes[category] = len(self.categories)
+            self.categories.append(category)
+        return code
+
+    def append(
+        self,
+        product_id: str,
+        name: str,
+        category: str,
+        price: float,
+        stock: Optional[int] = None,
+    ) -> int:
+        """
+        Adds a row to the table.
+
+        Args:
+            product_id (str): Unique identifier for the product.
+            name (str): Name of the product.
+            category (str): Category to which the product belongs.
+            price (float): Price of the product.
+            stock (Optional[int]): Units in stock, or None if stock is not tracked.
+
+        Returns:
+            int: The number of the new row.
+        """
+        self.product_ids.append(product_id)
+        self.names.append(name)
+        self.prices.append(price)
+        self.stocks.append(NO_STOCK if stock is None else stock)
+        self.category_codes.append(self.intern_category(category))
+        return len(self.product_ids) - 1
+
+    def extend(
+        self,
+        product_ids: List[str],
+        names: List[str],
+        categories: List[str],
+        category_codes: array,
+        prices: array,
+        stocks: Optional[array] = None,
+    ):
+        """
+        Adds a block of rows given column by column.
+
+        Args:
+            product_ids (List[str]): The product IDs of the new rows.
+            names (List[str]): The names of the new rows.
+            categories (List[str]): The category names that category_codes refer to.
+            category_codes (array): The category of each new row, as an index into
+                categories.
+            prices (array): The prices of the new rows, as C doubles.
+            stocks (Optional[array]): The stock levels of the new rows, as C long
+                longs, or None if none of them tracks stock.
+
+        Returns:
+            None
+        """
+        remap = [self.intern_category(category) for category in categories]
+        self.product_ids.extend(product_ids)
+        self.names.extend(names)
+        self.prices.extend(prices)
+        if stocks is None:
+            self.stocks.extend(array("q", [NO_STOCK]) * len(prices))
+        else:
+            self.stocks.extend(stocks)
+        if remap == list(range(len(remap))):
+            self.category_codes.extend(category_codes)
+        else:
+            self.category_codes.extend(array("I", [remap[code] for code in category_codes]))
+
+    def name(self, row: int) -> str:
+        """
+        Returns the name of a row, decoding it from the snapshot on first access.
+
+        Args:
+            row (int): The row number.
+
+        Returns:
+            str: The product name.
+        """
+        name = self.names[row]
+        if name is None:
+            name = self.names[row] = self._snapshot.name(row)
+        return name
+
+    def category(self, row: int) -> str:
+        """
+        Returns the category name of a row.
+
+        Args:
+            row (int): The row number.
+
+        Returns:
+            str: The category name.
+        """
+        return self.categories[self.category_codes[row]]
+
+    def set_name(self, row: int, name: str):
+        """
+        Changes the name of a row.
+
+        Args:
+            row (int): The row number.
+            name (str): The new name.
+
+        Returns:
+            None
+        """
+        self.names[row] = name
+
+    def set_category(self, row: int, category: str):
+        """
+        Changes the category of a row.
+
+        Args:
+            row (int): The row number.
+            category (str): The new category name.
+
+        Returns:
+            None
+        """
+        self.category_codes[row] = self.intern_category(category)
+
+    def set_price(self, row: int, price: float):
+        """
+        Changes the price of a row.
+
+        Args:
+            row (int): The row number.
+            price (float): The new price.
+
+        Returns:
+            None
+        """
+        self.prices[row] = price
+
+    def stock(self, row: int) -> Optional[int]:
+        """
+        Returns the stock level of a row.
+
+        Args:
+            row (int): The row number.
+
+        Returns:
+            Optional[int]: The units in stock, or None if stock is not tracked.
+        """
+        stock = self.stocks[row]
+        return None if stock == NO_STOCK else stock
+
+    def set_stock(self, row: int, stock: Optional[int]):
+        """
+        Changes the stock level of a row.
+
+        Args:
+            row (int): The row number.
+            stock (Optional[int]): The units in stock, or None to stop tracking stock.
+
+        Returns:
+            None
+        """
+        self.stocks[row] = NO_STOCK if stock is None else stock
+
+    def detach(self):
+        """
+        Decodes every pending name and stops reading from the snapshot.
+
+        After this call the snapshot can be closed safely.
+
+        Returns:
+            None
+        """
+        if self._snapshot is None:
+            return
+        for row, name in enumerate(self.names):
+            if name is None:
+                self.names[row] = self._snapshot.name(row)
+        self._snapshot = None
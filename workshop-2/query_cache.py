@@ -0,0 +1,166 @@
+"""
+This module contains the QueryCache class, a bounded LRU cache for
+the results of repository queries that keeps hit, miss and eviction
+counters.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class QueryCache:
+    """
+    Least-recently-used cache of query results.
+
+    Keys are normalized queries and values are their results. When the cache
+    holds capacity entries, storing a new one evicts the entry that was used
+    least recently. The owner of the cache discards the entries a change
+    affects, so results are never stale.
+
+    Attributes:
+        capacity (int): The maximum number of entries; 0 disables the cache.
+        hits (int): The number of lookups that found an entry.
+        misses (int): The number of lookups that found none.
+        evictions (int): The number of entries dropped to make room.
+        invalidations (int): The number of entries discarded because of a change.
+
+    Methods:
+        get: Returns the cached result of a query.
+        put: Stores the result of a query.
+        discard: Drops the entry of one query.
+        discard_if: Drops the entries whose key meets a condition.
+        clear: Drops every entry.
+        stats: Returns the counters and the current size.
+    """
+
+    def __init__(self, capacity: int = 256):
+        """
+        Initializes an empty QueryCache.
+
+        Args:
+            capacity (int): The maximum number of entries; 0 disables the cache.
+        """
+        self.capacity = capacity
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        """
+        Returns the number of cached entries.
+
+        Returns:
+            int: The number of entries.
+        """
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Returns the cached result of a query and marks it as recently used.
+
+        Args:
+            key (Hashable): The normalized query.
+
+        Returns:
+            Optional[Any]: The cached result, or None if there is none.
+        """
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        """
+        Stores the result of a query, evicting the least recently used entry if full.
+
+        Args:
+            key (Hashable): The normalized query.
+            value (Any): The result. It must not be None.
+
+        Returns:
+            None
+        """
+        if self.capacity <= 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, key: Hashable):
+        """
+        Drops the entry of one query, if it is cached.
+
+        Args:
+            key (Hashable): The normalized query.
+
+        Returns:
+            None
+        """
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def discard_if(self, condition: Callable[[Hashable], bool]):
+        """
+        Drops every entry whose key meets a condition.
+
+        Args:
+            condition (Callable[[Hashable], bool]): Tells whether a key must go.
+
+        Returns:
+            None
+        """
+        stale = [key for key in self._entries if condition(key)]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+
+    def clear(self):
+        """
+        Drops every entry. The counters are kept.
+
+        Returns:
+            None
+        """
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the counters and the current size of the cache.
+
+        Returns:
+            Dict[str, int]: The hits, misses, evictions, invalidations, size and
+                capacity.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "size": len(self._entries),
+            "capacity": self.capacity,
+        }
@@ -0,0 +1,170 @@
+"""
+This module contains the TokenIndex class, an inverted index from
+the normalized words of product names to the products that contain
+them, used to search the catalog by name.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import re
+from bisect import bisect_left, insort
+from typing import Dict, Hashable, Iterable, List, Set, Tuple
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Splits a text into case-folded words.
+
+    Any run of letters, digits or underscores is a word, so "4K-Monitor" yields
+    ["4k", "monitor"].
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        List[str]: The distinct words of the text, in order of first appearance.
+    """
+    return list(dict.fromkeys(_WORD.findall(text.casefold())))
+
+
+class TokenIndex:
+    """
+    Inverted index from words to the keys of the texts that contain them.
+
+    Besides the postings (word -> set of keys), the index keeps its vocabulary
+    sorted, so every word that starts with a given prefix is found with one
+    binary search. Queries are AND queries: a key matches when every query
+    word (or, with prefix matching, a word starting with it) is in its text.
+
+    Methods:
+        add: Indexes the words of a text under a key.
+        remove: Removes a key from the postings of the words of a text.
+        search: Returns the keys whose text matches every word of a query.
+    """
+
+    def __init__(self, items: Iterable[Tuple[Hashable, str]] = ()):
+        """
+        Initializes the TokenIndex with an optional initial set of texts.
+
+        Args:
+            items (Iterable[Tuple[Hashable, str]]): (key, text) pairs to index. The
+                vocabulary is sorted once at the end rather than word by word.
+        """
+        self._postings: Dict[str, Set[Hashable]] = {}
+        for key, text in items:
+            for token in tokenize(text):
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = set()
+                postings.add(key)
+        self._vocabulary: List[str] = sorted(self._postings)
+
+    def add(self, key: Hashable, text: str):
+        """
+        Indexes the words of a text under a key.
+
+        Args:
+            key (Hashable): The key returned by search when the text matches.
+            text (str): The text to index.
+
+        Returns:
+            None
+        """
+        for token in tokenize(text):
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                insort(self._vocabulary, token)
+            postings.add(key)
+
+    def remove(self, key: Hashable, text: str):
+        """
+        Removes a key from the postings of the words of a text.
+
+        The text must be the one the key was indexed with. Words left without
+        keys are dropped from the vocabulary.
+
+        Args:
+            key (Hashable): The key to remove.
+            text (str): The text the key was indexed with.
+
+        Returns:
+            None
+        """
+        for token in tokenize(text):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.discard(key)
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+
+    def _postings_for(self, term: str, prefix: bool) -> List[Set[Hashable]]:
+        """
+        Returns the postings of a word, or of every word with that prefix.
+
+        Args:
+            term (str): A normalized query word.
+            prefix (bool): Whether term may be a prefix of the indexed word.
+
+        Returns:
+            List[Set[Hashable]]: The postings found. The sets must not be modified.
+        """
+        if not prefix:
+            postings = self._postings.get(term)
+            return [] if postings is None else [postings]
+        vocabulary = self._vocabulary
+        position = bisect_left(vocabulary, term)
+        found: List[Set[Hashable]] = []
+        while position < len(vocabulary) and vocabulary[position].startswith(term):
+            found.append(self._postings[vocabulary[position]])
+            position += 1
+        return found
+
+    def search(self, query: str, prefix: bool = True) -> Set[Hashable]:
+        """
+        Returns the keys whose text contains every word of the query.
+
+        Query words are processed from the one with the fewest keys up, and each
+        later word only filters the keys found so far, so a short prefix that
+        expands to many words costs little once another word has narrowed the
+        result.
+
+        Args:
+            query (str): The words to look for, in any order.
+            prefix (bool): Whether each query word may match the start of a word,
+                so that "lap" finds "Laptop".
+
+        Returns:
+            Set[Hashable]: The matching keys; empty if the query has no words.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return set()
+        candidates = sorted(
+            (self._postings_for(term, prefix) for term in terms),
+            key=lambda postings: sum(map(len, postings)),
+        )
+        result = set().union(*candidates[0])
+        for postings in candidates[1:]:
+            if not result:
+                break
+            result = set().union(*(result & keys for keys in postings))
+        return result
@@ -1,7 +1,8 @@
 """
 This module contains the ShoppingCart class, which is responsible 
 for managing a shopping cart. It provides functionalities to add 
-products, calculate the total price, and list the items in the cart.
+products, change their quantities, calculate the total price, and 
+list the items in the cart.
 
 Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
 
@@ -21,48 +22,170 @@ You should have received a copy of the GNU General Public License
 along with Workshop-1. If not, see <https://www.gnu.org/licenses/>. 
 """
 
-from typing import List
+import json
+from typing import Dict, List, Optional, Tuple
+from metrics import METRICS
 from product import Product
 
 
+def to_cents(price: float) -> int:
+    """Converts a price to a whole number of cents.
+
+    Args:
+        price (float): The price, in currency units.
+
+    Returns:
+        int: The price rounded to the nearest cent.
+    """
+    return round(price * 100)
+
+
 class ShoppingCart:
     """
     This class manages the shopping cart operations, such as adding product and calculating totals.
+
+    Each product is stored once, with its quantity, and the total is kept up to date in
+    integer cents as lines change, so calculate_total costs the same for any cart and
+    is free of floating-point drift. A line is priced at the price the product had when
+    the line was last changed.
     """
 
-    def __init__(self):
-        """Initializes the ShoppingCart with an empty list of cart items.
+    def __init__(self, verbose: bool = True):
+        """Initializes the ShoppingCart with no items.
 
-        This method sets up the shopping cart by initializing an empty list that will hold
-        the products added to the cart.
+        This method sets up the shopping cart by initializing an empty mapping from
+        product ID to the product and its quantity.
 
         Args:
-            None
+            verbose (bool): Whether add_product prints a message for each product added.
 
         Returns:
             None: This method initializes an empty shopping cart.
         """
-        self.cart_items: List[Product] = []
+        self.verbose = verbose
+        self.cart_items: Dict[str, Tuple[Product, int]] = {}
+        self._line_cents: Dict[str, int] = {}
+        self._total_cents = 0
+
+    def _set_line(self, product: Product, quantity: int):
+        """Replaces the line of a product and updates the running total.
 
-    def add_product(self, product: Product):
+        Args:
+            product (Product): The product of the line.
+            quantity (int): The new quantity; 0 removes the line.
+
+        Returns:
+            None
+        """
+        product_id = product.product_id
+        self._total_cents -= self._line_cents.pop(product_id, 0)
+        if quantity == 0:
+            self.cart_items.pop(product_id, None)
+            return
+        line_cents = to_cents(product.price) * quantity
+        self.cart_items[product_id] = (product, quantity)
+        self._line_cents[product_id] = line_cents
+        self._total_cents += line_cents
+
+    def add_product(self, product: Product, quantity: int = 1):
         """Adds a product to the cart.
 
-        This method takes a product and adds it to the list of items in the cart.
-        It also prints a message indicating that the product was added.
+        This method adds quantity units of the product to the cart; adding a product that
+        is already in the cart increases its quantity. It also prints a message indicating
+        that the product was added.
 
         Args:
             product (Product): The product to be added to the shopping cart.
+            quantity (int): The number of units to add.
 
         Returns:
             None: This method adds the product to the cart and prints a message.
+
+        Raises:
+            ValueError: If quantity is less than 1.
+        """
+        if quantity < 1:
+            raise ValueError("quantity must be at least 1")
+        line = self.cart_items.get(product.product_id)
+        self._set_line(product, quantity + (line[1] if line else 0))
+        if self.verbose:
+            print(f"Added {product.name} to cart.")
+
+    def set_quantity(self, product_id: str, quantity: int) -> bool:
+        """Changes the quantity of a product in the cart.
+
+        Args:
+            product_id (str): The ID of a product in the cart.
+            quantity (int): The new quantity; 0 removes the product.
+
+        Returns:
+            bool: True if the product was in the cart, False otherwise.
+
+        Raises:
+            ValueError: If quantity is negative.
+        """
+        if quantity < 0:
+            raise ValueError("quantity cannot be negative")
+        line = self.cart_items.get(product_id)
+        if line is None:
+            return False
+        self._set_line(line[0], quantity)
+        return True
+
+    def remove_product(self, product_id: str) -> Optional[Product]:
+        """Removes a product from the cart, whatever its quantity.
+
+        Args:
+            product_id (str): The ID of the product to remove.
+
+        Returns:
+            Optional[Product]: The removed product, or None if it was not in the cart.
+        """
+        line = self.cart_items.get(product_id)
+        if line is None:
+            return None
+        self._set_line(line[0], 0)
+        return line[0]
+
+    def clear(self):
+        """Removes every product from the cart.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.cart_items.clear()
+        self._line_cents.clear()
+        self._total_cents = 0
+
+    def quantity(self, product_id: str) -> int:
+        """Returns the quantity of a product in the cart.
+
+        Args:
+            product_id (str): The ID of the product.
+
+        Returns:
+            int: The quantity, or 0 if the product is not in the cart.
         """
-        self.cart_items.append(product)
-        print(f"Added {product.name} to cart.")
+        line = self.cart_items.get(product_id)
+        return line[1] if line else 0
+
+    @property
+    def total_cents(self) -> int:
+        """Returns the total price of the items in the cart, in cents.
+
+        Returns:
+            int: The exact total, in cents.
+        """
+        return self._total_cents
 
     def calculate_total(self) -> float:
         """Calculates the total price of items in the cart.
 
-        This method sums up the prices of all products currently in the shopping cart.
+        The total is kept up to date in cents as items are added, changed and removed,
+        so this method does not walk the cart.
 
         Args:
             None
@@ -70,12 +193,27 @@ class ShoppingCart:
         Returns:
             float: The total price of all items in the cart.
         """
-        return sum(item.price for item in self.cart_items)
+        return self._total_cents / 100
+
+    def line_cents(self, product_id: str) -> int:
+        """Returns the total of one line of the cart, in cents.
+
+        The line is priced at the price the product had when the line was last
+        changed, which is what the cart's total adds up.
+
+        Args:
+            product_id (str): The product ID.
+
+        Returns:
+            int: The line total in cents, or 0 if the product is not in the cart.
+        """
+        return self._line_cents.get(product_id, 0)
 
     def list_cart_items(self) -> List[Product]:
         """Lists all items currently in the cart.
 
-        This method returns a list of all the products currently added to the shopping cart.
+        This method returns each product in the shopping cart once, in the order it was
+        first added; use list_cart_lines to get the quantities as well.
 
         Args:
             None
@@ -83,4 +221,90 @@ class ShoppingCart:
         Returns:
             List[Product]: A list of all products in the shopping cart.
         """
-        return self.cart_items
+        return [product for product, _ in self.cart_items.values()]
+
+    def list_cart_lines(self) -> List[Tuple[Product, int]]:
+        """Lists the products in the cart with their quantities.
+
+        Args:
+            None
+
+        Returns:
+            List[Tuple[Product, int]]: (product, quantity) pairs, in the order the
+                products were first added.
+        """
+        return list(self.cart_items.values())
+
+    def to_dict(self) -> Dict:
+        """Returns the cart as a dictionary that can be serialized to JSON.
+
+        Args:
+            None
+
+        Returns:
+            Dict: The lines of the cart (each product with its quantity), the total and
+                the total in cents.
+        """
+        return {
+            "items": [
+                dict(product.to_dict(), quantity=quantity)
+                for product, quantity in self.cart_items.values()
+            ],
+            "total": self.calculate_total(),
+            "total_cents": self._total_cents,
+        }
+
+    def to_bytes(self) -> bytes:
+        """Serializes the cart into a compact form.
+
+        Only the ID, quantity and line total in cents of each product are kept; the
+        products themselves are looked up again by from_bytes.
+
+        Args:
+            None
+
+        Returns:
+            bytes: The serialized cart.
+        """
+        lines = [
+            [product_id, quantity, self._line_cents[product_id]]
+            for product_id, (_, quantity) in self.cart_items.items()
+        ]
+        return json.dumps(lines, separators=(",", ":")).encode("utf-8")
+
+    @classmethod
+    def from_bytes(cls, data: bytes, product_repo) -> "ShoppingCart":
+        """Rebuilds a cart serialized by to_bytes.
+
+        Each line keeps the total it had when it was serialized, even if the price of
+        the product has changed since. Products that are no longer in the repository
+        are dropped from the cart.
+
+        Args:
+            data (bytes): The serialized cart.
+            product_repo (ProductRepository): The repository the products are read from.
+
+        Returns:
+            ShoppingCart: The restored cart.
+        """
+        cart = cls()
+        for product_id, quantity, line_cents in json.loads(data):
+            product = product_repo.get_by_id(product_id)
+            if product is None:
+                continue
+            cart.cart_items[product_id] = (product, quantity)
+            cart._line_cents[product_id] = line_cents
+            cart._total_cents += line_cents
+        return cart
+
+
+METRICS.register(
+    ShoppingCart,
+    {
+        "add_product": "cart.add_product",
+        "set_quantity": "cart.set_quantity",
+        "remove_product": "cart.remove_product",
+        "calculate_total": "cart.calculate_total",
+        "list_cart_lines": "cart.list_cart_lines",
+    },
+)
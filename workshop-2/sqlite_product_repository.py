@@ -0,0 +1,773 @@
+"""
+This module contains the SqliteProductRepository class which keeps
+the catalog in an SQLite database instead of a CSV file, so that
+reads use indexes and each change is a single-row statement.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from pagination import decode_cursor, encode_cursor
+from product import Product
+from product_repository import read_product_rows
+from product_table import MAX_STOCK, check_stock
+from search_index import tokenize
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    category_key TEXT NOT NULL,
+    price REAL NOT NULL,
+    stock INTEGER
+);
+CREATE INDEX IF NOT EXISTS products_by_category ON products (category_key, seq);
+CREATE INDEX IF NOT EXISTS products_by_price ON products (price, seq);
+CREATE INDEX IF NOT EXISTS products_by_category_price ON products (category_key, price, seq);
+CREATE TABLE IF NOT EXISTS product_tokens (
+    token TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (token, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS product_tokens_by_seq ON product_tokens (seq);
+"""
+
+# Stored in PRAGMA user_version; databases created before product_tokens get it
+# backfilled (version 1) and those created before the stock column get it added
+# (version 2).
+SCHEMA_VERSION = 2
+
+COLUMNS = "id, name, category, price, stock"
+
+
+class SqliteProductRepository:
+    """
+    Manages product data stored in an SQLite database.
+
+    It offers the same methods as ProductRepository, so Client, Manager and
+    main can use either one. Products are listed in insertion order (the seq
+    column); the UNIQUE constraint on id and the (category_key, seq) index
+    serve ID lookups and case-insensitive category listings without a scan.
+    The product_tokens table maps every word of a product name to the
+    product's seq, which serves name searches the same way, and the
+    (price, seq) and (category_key, price, seq) indexes serve price ranges
+    and the cheapest or most expensive products. The stock column is NULL for
+    products that do not track stock.
+
+    Every change is committed as soon as it is made, unless it happens between
+    begin and commit, so Manager does not need to journal or save anything.
+
+    Attributes:
+        filename (str): The path of the SQLite database.
+        persists_changes (bool): Always True: changes are durable once made.
+
+    Methods:
+        import_csv: Loads the products of a CSV file into the database.
+        is_empty: Tells whether the database holds no products.
+        list_all_products: Returns all products.
+        get_by_id: Returns the product with a given ID.
+        list_products_by_category: Returns the products of one category.
+        list_products_page: Returns one page of the catalog.
+        list_products_by_category_page: Returns one page of a category.
+        list_categories: Returns the number of products per category.
+        search_products: Returns the products whose name contains every query word.
+        products_in_price_range: Returns the products within a price range.
+        cheapest: Returns the cheapest products.
+        most_expensive: Returns the most expensive products.
+        add_product: Inserts a product.
+        update_product: Updates the name, category and price of a product.
+        set_stock: Sets the units in stock of a product.
+        reserve_stock: Takes the units of a whole order out of stock, or none of them.
+        release_stock: Puts the units of a reserved order back in stock.
+        remove_product: Deletes a product.
+        begin: Starts a transaction.
+        commit: Commits the current transaction.
+        rollback: Rolls back the current transaction.
+        close: Closes the database connection.
+    """
+
+    persists_changes = True
+
+    def __init__(self, filename: str):
+        """
+        Opens (and if needed creates) the database and its schema.
+
+        Args:
+            filename (str): The path of the SQLite database.
+        """
+        self.filename = filename
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(
+            filename, isolation_level=None, check_same_thread=False
+        )
+        self._connection.executescript(SCHEMA)
+        (version,) = self._connection.execute("PRAGMA user_version").fetchone()
+        if version < SCHEMA_VERSION:
+            with self._savepoint():
+                if version < 1:
+                    self._rebuild_tokens()
+                if version < 2:
+                    self._add_stock_column()
+                self._connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    @staticmethod
+    def _category_key(category: str) -> str:
+        """
+        Returns the value stored in the category_key column for a category.
+
+        The key is computed in Python because SQLite's lower() only folds ASCII.
+
+        Args:
+            category (str): The category name.
+
+        Returns:
+            str: The case-folded category name.
+        """
+        return category.casefold()
+
+    def _query(self, sql: str, parameters: Tuple = ()) -> List[Tuple]:
+        """
+        Runs a query and returns every row.
+
+        Args:
+            sql (str): The SQL statement.
+            parameters (Tuple): The statement parameters.
+
+        Returns:
+            List[Tuple]: The result rows.
+        """
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    @contextmanager
+    def _savepoint(self) -> Iterator[sqlite3.Connection]:
+        """
+        Runs a group of statements atomically, inside or outside a transaction.
+
+        Returns:
+            Iterator[sqlite3.Connection]: A context manager yielding the connection.
+        """
+        with self._lock:
+            self._connection.execute("SAVEPOINT product_change")
+            try:
+                yield self._connection
+            except BaseException:
+                self._connection.execute("ROLLBACK TO product_change")
+                self._connection.execute("RELEASE product_change")
+                raise
+            self._connection.execute("RELEASE product_change")
+
+    def _index_tokens(self, seq: int, name: str):
+        """
+        Stores the words of a product name in the product_tokens table.
+
+        Args:
+            seq (int): The seq of the product.
+            name (str): The name of the product.
+
+        Returns:
+            None
+        """
+        self._connection.executemany(
+            "INSERT OR IGNORE INTO product_tokens (token, seq) VALUES (?, ?)",
+            [(token, seq) for token in tokenize(name)],
+        )
+
+    def _rebuild_tokens(self):
+        """
+        Rebuilds the product_tokens table from the products table.
+
+        Returns:
+            None
+        """
+        self._connection.execute("DELETE FROM product_tokens")
+        self._connection.executemany(
+            "INSERT OR IGNORE INTO product_tokens (token, seq) VALUES (?, ?)",
+            (
+                (token, seq)
+                for seq, name in self._connection.execute("SELECT seq, name FROM products")
+                for token in tokenize(name)
+            ),
+        )
+
+    def _add_stock_column(self):
+        """
+        Adds the stock column to a products table created before it existed.
+
+        Returns:
+            None
+        """
+        columns = [row[1] for row in self._connection.execute("PRAGMA table_info(products)")]
+        if "stock" not in columns:
+            self._connection.execute("ALTER TABLE products ADD COLUMN stock INTEGER")
+
+    @staticmethod
+    def _to_products(
+        rows: Iterable[Tuple[str, str, str, float, Optional[int]]]
+    ) -> List[Product]:
+        """
+        Converts (id, name, category, price, stock) rows into products.
+
+        Args:
+            rows (Iterable[Tuple[str, str, str, float, Optional[int]]]): The result rows.
+
+        Returns:
+            List[Product]: One plain product per row.
+        """
+        return [Product(*row) for row in rows]
+
+    def import_csv(self, csv_filename: str) -> int:
+        """
+        Loads the products of a CSV file into the database in one transaction.
+
+        Products whose ID is already in the database are replaced, so the last
+        occurrence of an ID wins, as in ProductRepository.
+
+        Args:
+            csv_filename (str): The path to the CSV file with the product data.
+
+        Returns:
+            int: The number of product rows written to the database.
+        """
+        rows = (
+            (product_id, name, category, self._category_key(category), price, stock)
+            for product_id, name, category, price, stock in read_product_rows(csv_filename)
+        )
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                cursor = self._connection.executemany(
+                    "INSERT OR REPLACE INTO products"
+                    " (id, name, category, category_key, price, stock)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                # Replaced rows got a new seq, so their words are indexed again.
+                self._rebuild_tokens()
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+            # Only the product rows: total_changes would count the word index as well.
+            return cursor.rowcount
+
+    def is_empty(self) -> bool:
+        """
+        Tells whether the database holds no products.
+
+        Returns:
+            bool: True if there are no products.
+        """
+        return not self._query("SELECT 1 FROM products LIMIT 1")
+
+    @property
+    def products(self) -> List[Product]:
+        """
+        Returns every product in insertion order.
+
+        Returns:
+            List[Product]: A list of all products in the database.
+        """
+        return self._to_products(self._query(f"SELECT {COLUMNS} FROM products ORDER BY seq"))
+
+    def list_all_products(self) -> List[Product]:
+        """
+        Returns a list of all products.
+
+        Returns:
+            List[Product]: A list of all products in the database.
+        """
+        return self.products
+
+    def get_by_id(self, product_id: str) -> Optional[Product]:
+        """
+        Returns the product with the given ID, using the index on id.
+
+        Args:
+            product_id (str): The unique identifier of the product.
+
+        Returns:
+            Optional[Product]: The matching product, or None if there is no such product.
+        """
+        products = self._to_products(
+            self._query(f"SELECT {COLUMNS} FROM products WHERE id = ?", (product_id,))
+        )
+        return products[0] if products else None
+
+    def list_products_by_category(self, category: str) -> List[Product]:
+        """
+        Returns the products of a category, compared case-insensitively.
+
+        Args:
+            category (str): The category to filter the products by.
+
+        Returns:
+            List[Product]: A list of products that match the specified category.
+        """
+        return self._to_products(
+            self._query(
+                f"SELECT {COLUMNS} FROM products WHERE category_key = ? ORDER BY seq",
+                (self._category_key(category),),
+            )
+        )
+
+    def _page(
+        self, condition: str, parameters: Tuple, limit: int, cursor: Optional[str]
+    ) -> Tuple[List[Product], Optional[str]]:
+        """
+        Returns the page of the products meeting a condition that follows a cursor.
+
+        One extra row is read to tell whether another page follows.
+
+        Args:
+            condition (str): An SQL condition, or "1" for none.
+            parameters (Tuple): The parameters of the condition.
+            limit (int): The maximum number of products in the page.
+            cursor (Optional[str]): The cursor of the page, or None for the first one.
+
+        Returns:
+            Tuple[List[Product], Optional[str]]: The products and the next cursor.
+
+        Raises:
+            ValueError: If limit is less than 1 or the cursor is invalid.
+        """
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        rows = self._query(
+            f"SELECT seq, {COLUMNS} FROM products WHERE {condition} AND seq > ?"
+            " ORDER BY seq LIMIT ?",
+            (*parameters, decode_cursor(cursor), limit + 1),
+        )
+        next_cursor = encode_cursor(rows[limit - 1][0]) if len(rows) > limit else None
+        return self._to_products(row[1:] for row in rows[:limit]), next_cursor
+
+    def list_products_page(
+        self, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Product], Optional[str]]:
+        """
+        Returns one page of the catalog in insertion order, seeking on seq.
+
+        Args:
+            limit (int): The maximum number of products in the page.
+            cursor (Optional[str]): The cursor returned with the previous page, or None
+                for the first page.
+
+        Returns:
+            Tuple[List[Product], Optional[str]]: The products of the page and the cursor
+                of the next page, which is None after the last page.
+
+        Raises:
+            ValueError: If limit is less than 1 or the cursor is invalid.
+        """
+        return self._page("1", (), limit, cursor)
+
+    def list_products_by_category_page(
+        self, category: str, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Product], Optional[str]]:
+        """
+        Returns one page of a category, seeking on the (category_key, seq) index.
+
+        Args:
+            category (str): The category to filter the products by.
+            limit (int): The maximum number of products in the page.
+            cursor (Optional[str]): The cursor returned with the previous page, or None
+                for the first page.
+
+        Returns:
+            Tuple[List[Product], Optional[str]]: The products of the page and the cursor
+                of the next page, which is None after the last page.
+
+        Raises:
+            ValueError: If limit is less than 1 or the cursor is invalid.
+        """
+        return self._page(
+            "category_key = ?", (self._category_key(category),), limit, cursor
+        )
+
+    def list_categories(self) -> Dict[str, int]:
+        """
+        Returns the categories with the number of products in each.
+
+        Categories that differ only in case are reported once, under the spelling
+        of their oldest product.
+
+        Returns:
+            Dict[str, int]: A mapping from category name to product count.
+        """
+        # With MIN(), SQLite takes the bare category column from the same row.
+        rows = self._query(
+            "SELECT category, MIN(seq), COUNT(*) FROM products"
+            " GROUP BY category_key ORDER BY MIN(seq)"
+        )
+        return {category: count for category, _, count in rows}
+
+    def search_products(
+        self, query: str, prefix: bool = True, limit: Optional[int] = None
+    ) -> List[Product]:
+        """
+        Returns the products whose name contains every word of the query.
+
+        Each query word is looked up in the primary key of product_tokens, as an
+        exact match or as a range of words starting with it, and the matching seqs
+        are intersected.
+
+        Args:
+            query (str): The words to look for, in any order.
+            prefix (bool): Whether query words may match the start of name words.
+            limit (Optional[int]): The maximum number of products to return.
+
+        Returns:
+            List[Product]: The matching products in insertion order.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        if prefix:
+            # Words are compared as UTF-8 bytes, which sort in code point order.
+            lookup = "SELECT seq FROM product_tokens WHERE token >= ? AND token < ?"
+            parameters = [bound for term in terms for bound in (term, term + "\U0010ffff")]
+        else:
+            lookup = "SELECT seq FROM product_tokens WHERE token = ?"
+            parameters = list(terms)
+        matches = " INTERSECT ".join([lookup] * len(terms))
+        return self._to_products(
+            self._query(
+                f"SELECT {COLUMNS} FROM products WHERE seq IN ({matches})"
+                " ORDER BY seq LIMIT ?",
+                (*parameters, -1 if limit is None else limit),
+            )
+        )
+
+    def _by_price(
+        self, condition: str, parameters: Tuple, category: Optional[str], order: str
+    ) -> List[Product]:
+        """
+        Returns the products that meet a condition, sorted by price through an index.
+
+        Args:
+            condition (str): An SQL condition on the price, or "1" for none.
+            parameters (Tuple): The parameters of the condition, followed by the LIMIT.
+            category (Optional[str]): Restricts the query to one category.
+            order (str): "ASC" or "DESC".
+
+        Returns:
+            List[Product]: The matching products.
+        """
+        if category is not None:
+            condition = f"category_key = ? AND {condition}"
+            parameters = (self._category_key(category), *parameters)
+        return self._to_products(
+            self._query(
+                f"SELECT {COLUMNS} FROM products WHERE {condition}"
+                f" ORDER BY price {order}, seq {order} LIMIT ?",
+                parameters,
+            )
+        )
+
+    def products_in_price_range(
+        self, low: float, high: float, category: Optional[str] = None
+    ) -> List[Product]:
+        """
+        Returns the products whose price is between low and high, both included.
+
+        Args:
+            low (float): The lowest price.
+            high (float): The highest price.
+            category (Optional[str]): Restricts the search to one category, compared
+                case-insensitively.
+
+        Returns:
+            List[Product]: The matching products, from the cheapest up.
+        """
+        return self._by_price("price BETWEEN ? AND ?", (low, high, -1), category, "ASC")
+
+    def cheapest(self, k: int, category: Optional[str] = None) -> List[Product]:
+        """
+        Returns the k cheapest products.
+
+        Args:
+            k (int): The number of products to return.
+            category (Optional[str]): Restricts the search to one category, compared
+                case-insensitively.
+
+        Returns:
+            List[Product]: At most k products, from the cheapest up.
+        """
+        return self._by_price("1", (max(k, 0),), category, "ASC")
+
+    def most_expensive(self, k: int, category: Optional[str] = None) -> List[Product]:
+        """
+        Returns the k most expensive products.
+
+        Args:
+            k (int): The number of products to return.
+            category (Optional[str]): Restricts the search to one category, compared
+                case-insensitively.
+
+        Returns:
+            List[Product]: At most k products, from the most expensive down.
+        """
+        return self._by_price("1", (max(k, 0),), category, "DESC")
+
+    def add_product(self, product: Product) -> bool:
+        """
+        Inserts a product.
+
+        Args:
+            product (Product): The product to add.
+
+        Returns:
+            bool: True if the product was added, False if its ID is already in use.
+
+        Raises:
+            ValueError: If the product's stock is negative or larger than MAX_STOCK.
+        """
+        check_stock(product.stock)
+        try:
+            with self._savepoint() as connection:
+                cursor = connection.execute(
+                    "INSERT INTO products (id, name, category, category_key, price, stock)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        product.product_id,
+                        product.name,
+                        product.category,
+                        self._category_key(product.category),
+                        product.price,
+                        product.stock,
+                    ),
+                )
+                self._index_tokens(cursor.lastrowid, product.name)
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def update_product(
+        self, product_id: str, name: str, category: str, price: float
+    ) -> Optional[Product]:
+        """
+        Updates the name, category and price of a product.
+
+        The words of the name are re-indexed only when the name changes.
+
+        Args:
+            product_id (str): The unique identifier of the product to update.
+            name (str): The updated name of the product.
+            category (str): The updated category of the product.
+            price (float): The updated price of the product.
+
+        Returns:
+            Optional[Product]: The updated product, or None if there is no such product.
+        """
+        with self._savepoint() as connection:
+            current = connection.execute(
+                "SELECT seq, name, stock FROM products WHERE id = ?", (product_id,)
+            ).fetchone()
+            if current is None:
+                return None
+            seq, old_name, stock = current
+            connection.execute(
+                "UPDATE products SET name = ?, category = ?, category_key = ?, price = ?"
+                " WHERE seq = ?",
+                (name, category, self._category_key(category), price, seq),
+            )
+            if name != old_name:
+                connection.execute("DELETE FROM product_tokens WHERE seq = ?", (seq,))
+                self._index_tokens(seq, name)
+        return Product(product_id, name, category, price, stock)
+
+    def set_stock(self, product_id: str, stock: Optional[int]) -> Optional[Product]:
+        """
+        Sets the units in stock of a product.
+
+        Args:
+            product_id (str): The unique identifier of the product.
+            stock (Optional[int]): The new units in stock, or None to stop tracking stock.
+
+        Returns:
+            Optional[Product]: The updated product, or None if there is no such product.
+
+        Raises:
+            ValueError: If stock is negative or larger than MAX_STOCK.
+        """
+        check_stock(stock)
+        with self._savepoint() as connection:
+            connection.execute(
+                "UPDATE products SET stock = ? WHERE id = ?", (stock, product_id)
+            )
+            return self.get_by_id(product_id)
+
+    def reserve_stock(self, lines: Iterable[Tuple[str, int]]) -> Dict[str, int]:
+        """
+        Takes the units of a whole order out of stock, or none of them.
+
+        The levels are checked and decremented inside one savepoint, so a shortage of
+        any product rolls back the whole order. Products that do not track stock are
+        always available.
+
+        Args:
+            lines (Iterable[Tuple[str, int]]): The (product_id, quantity) pairs of the
+                order. A product may appear more than once.
+
+        Returns:
+            Dict[str, int]: The new stock level of every product that tracks stock.
+
+        Raises:
+            ValueError: If a product is not in the database or has fewer units in stock
+                than ordered; no stock is taken then.
+        """
+        return self._change_stock(lines, -1)
+
+    def release_stock(self, lines: Iterable[Tuple[str, int]]) -> Dict[str, int]:
+        """
+        Puts the units of an order reserved with reserve_stock back in stock.
+
+        Args:
+            lines (Iterable[Tuple[str, int]]): The (product_id, quantity) pairs of the
+                order.
+
+        Returns:
+            Dict[str, int]: The new stock level of every product that tracks stock.
+
+        Raises:
+            ValueError: If a product is not in the database.
+        """
+        return self._change_stock(lines, 1)
+
+    def _change_stock(self, lines: Iterable[Tuple[str, int]], sign: int) -> Dict[str, int]:
+        """
+        Adds or takes the quantities of an order to or from the stock, atomically.
+
+        Args:
+            lines (Iterable[Tuple[str, int]]): The (product_id, quantity) pairs.
+            sign (int): 1 to add the quantities, -1 to take them.
+
+        Returns:
+            Dict[str, int]: The new stock level of every product that tracks stock.
+
+        Raises:
+            ValueError: If a product is missing, a quantity is negative or larger than
+                MAX_STOCK, or the new level would be negative or larger than MAX_STOCK;
+                nothing is changed then.
+        """
+        quantities: Dict[str, int] = {}
+        for product_id, quantity in lines:
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        for product_id, quantity in quantities.items():
+            if not 0 <= quantity <= MAX_STOCK:
+                raise ValueError(f"Invalid quantity of product {product_id}: {quantity}")
+        levels = {}
+        with self._savepoint() as connection:
+            for product_id, quantity in quantities.items():
+                current = connection.execute(
+                    "SELECT name, stock FROM products WHERE id = ?", (product_id,)
+                ).fetchone()
+                if current is None:
+                    raise ValueError(f"No product found with ID: {product_id}")
+                name, stock = current
+                if stock is None:
+                    continue
+                if sign < 0 and stock < quantity:
+                    raise ValueError(
+                        f"Not enough stock of '{name}': {stock} left, {quantity} ordered."
+                    )
+                if sign > 0 and stock + quantity > MAX_STOCK:
+                    raise ValueError(f"Stock of '{name}' cannot exceed {MAX_STOCK}.")
+                levels[product_id] = stock + sign * quantity
+                connection.execute(
+                    "UPDATE products SET stock = ? WHERE id = ?",
+                    (levels[product_id], product_id),
+                )
+        return levels
+
+    def remove_product(self, product_id: str) -> Optional[Product]:
+        """
+        Deletes a product and the words of its name.
+
+        Args:
+            product_id (str): The unique identifier of the product to remove.
+
+        Returns:
+            Optional[Product]: The removed product, or None if there is no such product.
+        """
+        with self._savepoint() as connection:
+            product = self.get_by_id(product_id)
+            if product is not None:
+                connection.execute(
+                    "DELETE FROM product_tokens WHERE seq ="
+                    " (SELECT seq FROM products WHERE id = ?)",
+                    (product_id,),
+                )
+                connection.execute("DELETE FROM products WHERE id = ?", (product_id,))
+        return product
+
+    def begin(self):
+        """
+        Starts a transaction; changes are kept private until commit.
+
+        The connection stays reserved for the calling thread until commit or
+        rollback, so other threads cannot slip statements into the transaction.
+
+        Returns:
+            None
+        """
+        self._lock.acquire()
+        try:
+            self._connection.execute("BEGIN")
+        except BaseException:
+            self._lock.release()
+            raise
+
+    def commit(self):
+        """
+        Commits the current transaction.
+
+        Returns:
+            None
+        """
+        try:
+            self._connection.execute("COMMIT")
+        finally:
+            self._lock.release()
+
+    def rollback(self):
+        """
+        Rolls back the current transaction.
+
+        Returns:
+            None
+        """
+        try:
+            self._connection.execute("ROLLBACK")
+        finally:
+            self._lock.release()
+
+    def close(self):
+        """
+        Closes the database connection.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,148 @@
+"""
+This module contains the StreamingProductRepository class which
+answers product queries by streaming the CSV file instead of
+loading it, so catalogs larger than memory can be browsed.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from typing import Dict, Iterator, List, Optional
+from product import Product
+from product_repository import read_product_batches, read_products
+
+
+class StreamingProductRepository:
+    """
+    Serves read-only product queries as single passes over a CSV file.
+
+    Unlike ProductRepository, this class keeps no products in memory between
+    calls. Every query opens the file and filters it row by row, so memory use
+    stays bounded no matter how large the catalog is. The price is that each
+    query costs a full read of the file. Changes still pending in the change
+    journal are not visible until a Manager compacts them into the file.
+
+    Attributes:
+        filename (str): The path to the CSV file with the product data.
+        batch_size (int): The number of products per batch in iter_batches.
+
+    Methods:
+        list_all_products: Streams every product in the file.
+        list_products_by_category: Streams the products of one category.
+        get_by_id: Finds a product by ID, stopping at the first match.
+        list_categories: Counts the products per category in one pass.
+        iter_batches: Streams the products in lists of batch_size items.
+    """
+
+    def __init__(self, filename: str, batch_size: int = 1000):
+        """
+        Initializes the StreamingProductRepository without reading the file.
+
+        Args:
+            filename (str): The path to the CSV file with the product data.
+            batch_size (int): The number of products per batch in iter_batches.
+        """
+        self.filename = filename
+        self.batch_size = batch_size
+
+    def _stream(self) -> Iterator[Product]:
+        """
+        Streams the products in the file, reporting read errors like ProductRepository.
+
+        Returns:
+            Iterator[Product]: An iterator over the products in file order.
+        """
+        try:
+            yield from read_products(self.filename)
+        except FileNotFoundError:
+            print(f"Error: The file '{self.filename}' was not found.")
+        except Exception as e:
+            print(f"An error occurred while loading products: {e}")
+
+    def list_all_products(self) -> Iterator[Product]:
+        """
+        Streams every product in the file.
+
+        Returns:
+            Iterator[Product]: A single-pass iterator over all products.
+        """
+        return self._stream()
+
+    def list_products_by_category(self, category: str) -> Iterator[Product]:
+        """
+        Streams the products that belong to the given category.
+
+        The comparison is case-insensitive, as in ProductRepository.
+
+        Args:
+            category (str): The category to filter the products by.
+
+        Returns:
+            Iterator[Product]: A single-pass iterator over the matching products.
+        """
+        key = category.casefold()
+        return (
+            product
+            for product in self._stream()
+            if product.category.casefold() == key
+        )
+
+    def get_by_id(self, product_id: str) -> Optional[Product]:
+        """
+        Returns the first product with the given ID.
+
+        Args:
+            product_id (str): The unique identifier of the product.
+
+        Returns:
+            Optional[Product]: The matching product, or None if there is no such product.
+        """
+        return next(
+            (product for product in self._stream() if product.product_id == product_id),
+            None,
+        )
+
+    def list_categories(self) -> Dict[str, int]:
+        """
+        Counts the products per category in a single pass over the file.
+
+        Memory use is bounded by the number of distinct categories.
+
+        Returns:
+            Dict[str, int]: A mapping from category name to product count.
+        """
+        names: Dict[str, str] = {}
+        counts: Dict[str, int] = {}
+        for product in self._stream():
+            key = product.category.casefold()
+            names.setdefault(key, product.category)
+            counts[key] = counts.get(key, 0) + 1
+        return {names[key]: count for key, count in counts.items()}
+
+    def iter_batches(self) -> Iterator[List[Product]]:
+        """
+        Streams the products in lists of at most batch_size items.
+
+        Returns:
+            Iterator[List[Product]]: An iterator over the batches in file order.
+        """
+        try:
+            yield from read_product_batches(self.filename, self.batch_size)
+        except FileNotFoundError:
+            print(f"Error: The file '{self.filename}' was not found.")
+        except Exception as e:
+            print(f"An error occurred while loading products: {e}")
@@ -0,0 +1,88 @@
+"""
+This module contains the StripedLock class, a fixed set of locks that
+keys are hashed onto so that work on unrelated keys runs in parallel
+while work on the same key is serialized.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Hashable, Iterable, Iterator
+
+
+class StripedLock:
+    """
+    A fixed number of locks shared by any number of keys.
+
+    Each key maps to one stripe, so two threads contend only when their keys
+    share a stripe. holding locks every stripe of a group of keys in
+    increasing stripe order; since every caller takes stripes in the same
+    order, threads locking overlapping groups cannot deadlock.
+
+    Attributes:
+        stripes (int): The number of locks.
+
+    Methods:
+        stripe: Returns the stripe a key maps to.
+        holding: Locks the stripes of several keys for the duration of a block.
+    """
+
+    def __init__(self, stripes: int = 64):
+        """
+        Initializes the StripedLock.
+
+        Args:
+            stripes (int): The number of locks.
+        """
+        self.stripes = max(stripes, 1)
+        self._locks = [threading.Lock() for _ in range(self.stripes)]
+
+    def stripe(self, key: Hashable) -> int:
+        """
+        Returns the stripe a key maps to.
+
+        Args:
+            key (Hashable): The key.
+
+        Returns:
+            int: The index of the key's lock.
+        """
+        return hash(key) % self.stripes
+
+    @contextmanager
+    def holding(self, keys: Iterable[Hashable]) -> Iterator[None]:
+        """
+        Locks the stripes of several keys, each once, until the block ends.
+
+        Args:
+            keys (Iterable[Hashable]): The keys to lock.
+
+        Returns:
+            Iterator[None]: A context manager holding the locks.
+        """
+        locks = [self._locks[index] for index in sorted({self.stripe(key) for key in keys})]
+        acquired = 0
+        try:
+            for lock in locks:
+                lock.acquire()
+                acquired += 1
+            yield
+        finally:
+            for lock in reversed(locks[:acquired]):
+                lock.release()
@@ -0,0 +1,143 @@
+"""
+This module contains the WriteBehindFlusher class which persists
+the catalog from a background thread, coalescing bursts of changes
+into a single save so that edits never wait on the disk.
+
+Author: Santiago Andrés Benavides Coral <sabenavidesc@udistrital.edu.co>
+
+This file is part of workshop-1.
+
+Workshop-1 is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop-1 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop-1. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import threading
+from typing import Callable
+
+
+class WriteBehindFlusher:
+    """
+    Runs a save callback in a background thread after changes are reported.
+
+    Every call to mark_dirty bumps a change counter. The background thread
+    waits for the first change, then waits interval seconds more so that
+    further changes are coalesced, and calls save once for all of them. If
+    save fails, the changes stay pending and are retried after the next
+    interval.
+
+    Attributes:
+        interval (float): The number of seconds to wait before saving a change.
+
+    Methods:
+        mark_dirty: Reports a change that must be saved.
+        flush: Saves pending changes in the calling thread and waits for it.
+        close: Flushes pending changes and stops the background thread.
+    """
+
+    def __init__(self, save: Callable[[], bool], interval: float):
+        """
+        Initializes the WriteBehindFlusher and starts its background thread.
+
+        Args:
+            save (Callable[[], bool]): The function that persists the current state.
+                It must return True on success.
+            interval (float): The number of seconds to wait before saving a change.
+        """
+        self.interval = interval
+        self._save = save
+        self._condition = threading.Condition()
+        self._save_lock = threading.Lock()
+        self._changes = 0
+        self._saved_changes = 0
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="write-behind-flusher", daemon=True
+        )
+        self._thread.start()
+
+    def mark_dirty(self):
+        """
+        Reports a change that must be saved. Returns immediately.
+
+        Returns:
+            None
+        """
+        with self._condition:
+            self._changes += 1
+            self._condition.notify_all()
+
+    def _run(self):
+        """
+        Waits for changes and saves them until the flusher is closed.
+
+        Returns:
+            None
+        """
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._closed or self._changes != self._saved_changes
+                )
+                if self._closed:
+                    return
+                # Debounce: let more changes pile up before paying for a save.
+                self._condition.wait_for(lambda: self._closed, timeout=self.interval)
+                if self._closed:
+                    return
+            self._save_pending()
+
+    def _save_pending(self) -> bool:
+        """
+        Saves the pending changes, if any. Only one save runs at a time.
+
+        Returns:
+            bool: True if there is nothing left to save, False if the save failed.
+        """
+        with self._save_lock:
+            with self._condition:
+                target = self._changes
+                if target == self._saved_changes:
+                    return True
+            # The state is captured after target is read, so it includes every
+            # change counted so far.
+            saved = self._save()
+            with self._condition:
+                if saved:
+                    self._saved_changes = max(self._saved_changes, target)
+                self._condition.notify_all()
+            return saved
+
+    def flush(self) -> bool:
+        """
+        Saves the pending changes in the calling thread and waits for the save.
+
+        This is a synchronous barrier: when it returns True, every change reported
+        before the call is on disk.
+
+        Returns:
+            bool: True if every pending change was saved, False if the save failed.
+        """
+        return self._save_pending()
+
+    def close(self) -> bool:
+        """
+        Flushes pending changes and stops the background thread.
+
+        Returns:
+            bool: True if every pending change was saved, False if the save failed.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        return self._save_pending()